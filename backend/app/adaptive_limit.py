@@ -0,0 +1,224 @@
+# backend/app/adaptive_limit.py
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any, Deque, Tuple
+from .providers import ProviderError
+
+logger = logging.getLogger(__name__)
+
+# Non-streamed completions shorter than this are mostly prompt processing,
+# so their time per output token says nothing about provider load
+MIN_TIMED_TOKENS = 16
+
+class ThrottleSaturated(ProviderError):
+    """Raised when no local slot for a provider frees up within the queue timeout"""
+
+class CallTiming:
+    """Latency sample for one provider call, comparable across short and long completions"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.first_token_at: Optional[float] = None
+        self.output_tokens = 0
+
+    def first_token(self):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+
+    def sample(self) -> Optional[Tuple[str, float]]:
+        """(signal, seconds): time to first token when streamed, else time per output token"""
+        if self.first_token_at is not None:
+            return "ttft", self.first_token_at - self.start
+        if self.output_tokens >= MIN_TIMED_TOKENS:
+            return "per_token", (time.monotonic() - self.start) / self.output_tokens
+        return None
+
+class AdaptiveLimit:
+    """AIMD concurrency limit for one provider/model pair.
+
+    Until the first decrease the limit grows by 1 per successful call (slow
+    start); after that each call completed within the latency tolerance adds
+    1/limit (about +1 per round of calls). A 429/503, a timeout or a call far
+    slower than usual multiplies the limit by the backoff ratio, at most once
+    per cooldown, so a burst of failures from one overloaded moment counts
+    once. Retry-After pauses new calls until it has passed. Latency is
+    compared per signal (time to first token, or time per output token), so
+    a long completion is not mistaken for an overloaded provider.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        backoff_ratio: float,
+        latency_tolerance: float,
+        cooldown: float = 1.0
+    ):
+        self.name = name
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency_ewma: Dict[str, float] = {}
+        self.successes = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.slow = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._unblock: Optional[asyncio.TimerHandle] = None
+
+    def _has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit) and time.monotonic() >= self.blocked_until
+
+    async def acquire(self, timeout: float):
+        """Wait (in arrival order) for a slot under the current limit"""
+        if not self._waiters and self._has_capacity():
+            self.in_flight += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, timeout)
+        except BaseException:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up: hand the slot on
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self._has_capacity():
+            future = self._waiters.popleft()
+            if not future.done():
+                self.in_flight += 1
+                future.set_result(None)
+        delay = self.blocked_until - time.monotonic()
+        if self._waiters and delay > 0 and self._unblock is None:
+            self._unblock = asyncio.get_running_loop().call_later(delay, self._on_unblocked)
+
+    def _on_unblocked(self):
+        self._unblock = None
+        self._wake()
+
+    def on_success(self, sample: Optional[Tuple[str, float]] = None):
+        self.successes += 1
+        signal, latency = sample or (None, 0.0)
+        usual = self.latency_ewma.get(signal)
+        if usual is not None and latency > usual * self.latency_tolerance:
+            self.slow += 1
+            self._decrease()
+        else:
+            step = 1 if self.decreases == 0 else 1 / self.limit
+            self.limit = min(self.maximum, self.limit + step)
+        if signal is not None:
+            self.latency_ewma[signal] = latency if usual is None else 0.9 * usual + 0.1 * latency
+        self._wake()
+
+    def on_error(self, error: ProviderError):
+        if error.throttled:
+            self.throttled += 1
+            if error.retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + error.retry_after)
+            self._decrease()
+        elif error.timed_out:
+            self.timeouts += 1
+            self._decrease()
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.decreases += 1
+        previous = self.limit
+        self.limit = max(self.minimum, self.limit * self.backoff_ratio)
+        logger.info(f"Provider concurrency for {self.name} reduced {previous:.1f} -> {self.limit:.1f}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "blocked_for": max(0.0, round(self.blocked_until - time.monotonic(), 2)),
+            "latency_ewma": {signal: round(value, 4) for signal, value in self.latency_ewma.items()},
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "slow": self.slow,
+            "decreases": self.decreases
+        }
+
+class ProviderThrottle:
+    """Adaptive concurrency limits keyed by provider and model"""
+
+    def __init__(
+        self,
+        initial: int,
+        minimum: int,
+        maximum: int,
+        backoff_ratio: float,
+        latency_tolerance: float,
+        queue_timeout: float
+    ):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.queue_timeout = queue_timeout
+        self._limits: Dict[str, AdaptiveLimit] = {}
+
+    def limit_for(self, provider: str, model: str) -> AdaptiveLimit:
+        key = f"{provider}:{model}"
+        limit = self._limits.get(key)
+        if limit is None:
+            limit = self._limits[key] = AdaptiveLimit(
+                key, self.initial, self.minimum, self.maximum, self.backoff_ratio, self.latency_tolerance
+            )
+        return limit
+
+    @asynccontextmanager
+    async def slot(self, provider: str, model: str):
+        """Hold a slot for one provider call and feed its outcome back into the limit.
+
+        Yields a CallTiming: the caller marks the first streamed token, or
+        sets output_tokens for a non-streamed completion.
+        """
+        limit = self.limit_for(provider, model)
+        try:
+            await limit.acquire(self.queue_timeout)
+        except asyncio.TimeoutError:
+            # Our own queue is full, not the provider: answer 429 but keep it out of the provider's health
+            raise ThrottleSaturated(provider, f"no capacity for {model} within {self.queue_timeout:.0f}s", 429)
+
+        timing = CallTiming()
+        try:
+            yield timing
+        except ProviderError as e:
+            limit.on_error(e)
+            raise
+        else:
+            limit.on_success(timing.sample())
+        finally:
+            limit.release()
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Current limit and outcome counters per provider/model"""
+        return {key: limit.stats() for key, limit in self._limits.items()}
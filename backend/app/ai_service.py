@@ -1,15 +1,25 @@
 # backend/app/ai_service.py
-import openai
-from transformers import pipeline
 import asyncio
-from typing import Optional, Dict, List, Any
+from contextvars import ContextVar
+from typing import Optional, Dict, List, Any, AsyncIterator, Callable, Iterable, Set, Tuple
 from .config import settings
-import redis
-import json
+from .providers import openai_provider, anthropic_provider, ProviderError
+from .inference import inference_executor, InferenceError, ModelUnavailable
+from .microbatch import local_batcher
+from .singleflight import SingleFlight
+from .cache import GenerationCache, CacheCodec
+from .prompt_match import NearDuplicateIndex, PUNCTUATION_SENSITIVE_TYPES, canonicalize_prompt, canonical_params, simhash
+from .cache_policy import CachePolicy, cache_policy_for
+from .adaptive_limit import ProviderThrottle
+from .circuit_breaker import CircuitBreakers, is_provider_unavailable
+from .hedging import Hedger
+from . import tokenizer
+from .tokenizer import ContextLengthExceeded
+from .summarize import MapReduceSummarizer
 import hashlib
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 import uuid
 from enum import Enum
 import aiofiles
@@ -19,17 +29,40 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize Redis for caching
-redis_client = redis.from_url(settings.REDIS_URL)
+# Cached generations: in-process LRU in front of Redis
+generation_cache = GenerationCache(
+    settings.LOCAL_CACHE_MAX_MB * 2**20,
+    settings.CACHE_INVALIDATION_CHANNEL,
+    local_enabled=settings.LOCAL_CACHE_ENABLED,
+    codec=CacheCodec(
+        settings.CACHE_COMPRESSION,
+        settings.CACHE_COMPRESS_THRESHOLD_BYTES,
+        settings.CACHE_WRITE_FORMAT
+    )
+)
 
-# Initialize OpenAI
-openai.api_key = settings.OPENAI_API_KEY
+# Opt-in near-duplicate prompt matching for deterministic generations
+near_duplicates = NearDuplicateIndex(
+    settings.NEAR_DUPLICATE_THRESHOLDS,
+    settings.NEAR_DUPLICATE_MAX_TEMPERATURE,
+    enabled=settings.NEAR_DUPLICATE_ENABLED
+)
 
-# Initialize local models
-summarizer = None
-code_generator = None
-text_generator = None
-image_generator = None
+# Coalesces identical in-flight generations (keyed on the cache key)
+single_flight = SingleFlight(
+    settings.SINGLE_FLIGHT_LOCK_TTL_MS,
+    settings.SINGLE_FLIGHT_WAIT_TIMEOUT,
+    settings.SINGLE_FLIGHT_POLL_INTERVAL_MS / 1000
+)
+
+# Background refreshes of stale cache entries (held so they are not garbage collected)
+_refresh_tasks: Set[asyncio.Task] = set()
+
+# Receives text deltas while a generation runs under generate_content_stream
+_token_sink: ContextVar[Optional[Callable[[str], None]]] = ContextVar("token_sink", default=None)
+
+# Per-generation call state: the hedge deadline in; the answering model and token counts out
+_generation_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar("generation_context", default=None)
 
 class ContentType(str, Enum):
     TEXT = "text"
@@ -63,24 +96,70 @@ class AIModel(str, Enum):
     LOCAL_CODE = "local-code"
     LOCAL_SUMMARY = "local-summary"
 
-def init_local_models():
-    """Initialize local AI models for fallback and offline capabilities"""
-    global summarizer, code_generator, text_generator, image_generator
-    try:
-        logger.info("Initializing local AI models...")
-        summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-        code_generator = pipeline("text-generation", model="Salesforce/codegen-350M-mono")
-        text_generator = pipeline("text-generation", model="gpt2")
-        logger.info("Local models initialized successfully")
-    except Exception as e:
-        logger.error(f"Failed to initialize local models: {e}")
-        # Continue without local models
+# Local pipelines that can stand in for a failing provider: (model, pipeline, output key)
+LOCAL_FALLBACKS = {
+    ContentType.TEXT: (AIModel.LOCAL_TEXT, "text_generator", "generated_text"),
+    ContentType.CODE: (AIModel.LOCAL_CODE, "code_generator", "generated_text"),
+    ContentType.SUMMARY: (AIModel.LOCAL_SUMMARY, "summarizer", "summary_text"),
+}
+
+def get_provider(model: str) -> str:
+    """Map a model name to the provider that serves it"""
+    if model.startswith("gpt"):
+        return "openai"
+    if model.startswith("claude"):
+        return "anthropic"
+    return "local"
+
+# Clients for hosted models, by provider name
+hosted_providers = {openai_provider.name: openai_provider, anthropic_provider.name: anthropic_provider}
+
+def is_hosted(model: str) -> bool:
+    return get_provider(model) in hosted_providers
+
+# Adaptive (AIMD) concurrency per provider and model for remote calls
+provider_throttle = ProviderThrottle(
+    settings.PROVIDER_INITIAL_CONCURRENCY,
+    settings.PROVIDER_MIN_CONCURRENCY,
+    settings.PROVIDER_MAX_CONCURRENCY,
+    settings.PROVIDER_BACKOFF_RATIO,
+    settings.PROVIDER_LATENCY_TOLERANCE,
+    settings.PROVIDER_QUEUE_TIMEOUT
+)
+
+# Circuit breaker, retries and retry budget per provider and model for remote calls
+circuit_breakers = CircuitBreakers(
+    settings.PROVIDER_MAX_RETRIES,
+    settings.PROVIDER_RETRY_BASE_DELAY_MS / 1000,
+    settings.PROVIDER_RETRY_MAX_DELAY_MS / 1000,
+    settings.PROVIDER_RETRY_BUDGET_RATIO,
+    settings.PROVIDER_RETRY_BUDGET_MIN,
+    settings.PROVIDER_RETRY_BUDGET_WINDOW,
+    settings.BREAKER_FAILURE_RATIO,
+    settings.BREAKER_MIN_CALLS,
+    settings.BREAKER_WINDOW_CALLS,
+    settings.BREAKER_WINDOW,
+    settings.BREAKER_OPEN_SECONDS,
+    settings.BREAKER_HALF_OPEN_CALLS
+)
+
+# Opt-in hedging: a backup model races a primary whose first token is late
+hedger = Hedger(settings.HEDGE_DEADLINES_MS, settings.HEDGE_BACKUP_MODELS, enabled=settings.HEDGING_ENABLED)
+
+# Map-reduce summarization of long documents; chunk summaries share the generation cache
+summarizer = MapReduceSummarizer(
+    settings.SUMMARY_CHUNK_TOKENS,
+    settings.SUMMARY_CHUNK_SUMMARY_TOKENS,
+    settings.SUMMARY_CONCURRENCY,
+    settings.SUMMARY_CACHE_TTL,
+    cache=generation_cache
+)
 
 class AIService:
     @staticmethod
     def get_cache_key(prompt: str, content_type: str, model: str, **kwargs) -> str:
-        """Generate cache key for content generation"""
-        content = f"{prompt}:{content_type}:{model}:{json.dumps(kwargs, sort_keys=True)}"
+        """Generate cache key for content generation from the canonical prompt and parameters"""
+        content = f"{canonicalize_prompt(prompt, content_type)}:{content_type}:{model}:{canonical_params(kwargs)}"
         return hashlib.md5(content.encode()).hexdigest()
     
     @staticmethod
@@ -100,71 +179,171 @@ class AIService:
         
         logger.info(f"Starting content generation - ID: {generation_id}, Type: {content_type}, Model: {model}")
         
+        params = {"max_tokens": max_tokens, "temperature": temperature, "language": language, "style": style, **kwargs}
+        cache_key = AIService.get_cache_key(prompt, content_type, model, **params)
+        policy = cache_policy_for(content_type, temperature)
+        generate = lambda: AIService._generate_uncached(
+            cache_key, generation_id, start_time, policy, prompt, content_type, model,
+            max_tokens, temperature, language, style, **kwargs
+        )
+        if not policy.cache:
+            return await generate()
+        
         # Check cache first
-        cache_key = AIService.get_cache_key(prompt, content_type, model, **kwargs)
-        cached_result = redis_client.get(cache_key)
+        cached = await generation_cache.get(cache_key)
         
-        if cached_result:
-            result = json.loads(cached_result)
-            logger.info(f"Cache hit for generation {generation_id}")
-            return result["content"], result["model"], result.get("metadata", {})
+        if cached:
+            if time.time() >= cached.get("fresh_until", float("inf")):
+                # Serve the stale entry now and refresh it for the next caller
+                generation_cache.stale_hits += 1
+                AIService._refresh_in_background(cache_key, generate)
+                logger.info(f"Stale cache hit for generation {generation_id}, refreshing")
+            else:
+                logger.info(f"Cache hit for generation {generation_id}")
+            return AIService._unpack_cached(cached)
+        
+        # Fall back to a cached result for a near-identical prompt, if enabled for this type
+        threshold = near_duplicates.threshold_for(content_type, temperature)
+        if threshold is not None:
+            scope = hashlib.md5(f"{content_type}:{model}:{canonical_params(params)}".encode()).hexdigest()
+            fingerprint = simhash(canonicalize_prompt(prompt, content_type), exact=content_type in PUNCTUATION_SENSITIVE_TYPES)
+            cached_result = await AIService._read_near_duplicate(scope, fingerprint, threshold)
+            if cached_result:
+                logger.info(f"Near-duplicate cache hit for generation {generation_id}")
+                return cached_result
+        
+        # Identical concurrent requests share a single provider call
+        result = await single_flight.run(cache_key, generate, lambda: AIService._read_cache(cache_key))
+        
+        if threshold is not None:
+            try:
+                await near_duplicates.add(scope, fingerprint, cache_key, policy.ttl + policy.stale_ttl)
+            except Exception as e:
+                logger.warning(f"Failed to index prompt fingerprint: {e}")
+        return result
+    
+    @staticmethod
+    def _refresh_in_background(cache_key: str, generate: Callable[[], Any]):
+        """Regenerate a stale entry once per key (across pods) without holding up the caller"""
+        async def refresh():
+            # The task inherits the caller's context; don't stream into its response
+            _token_sink.set(None)
+            try:
+                await single_flight.run(cache_key, generate, lambda: AIService._read_fresh_cache(cache_key))
+                generation_cache.refreshes += 1
+            except Exception as e:
+                logger.warning(f"Background refresh of {cache_key} failed: {e}")
         
+        task = asyncio.create_task(refresh())
+        _refresh_tasks.add(task)
+        task.add_done_callback(_refresh_tasks.discard)
+    
+    @staticmethod
+    async def _read_near_duplicate(scope: str, fingerprint: int, threshold: float) -> Optional[tuple[str, str, Dict[str, Any]]]:
+        """Return the cached generation of the closest near-identical prompt, if any"""
         try:
-            # Rate limiting check
-            await AIService._check_rate_limit()
-            
-            # Generate content based on type
-            if content_type == ContentType.TEXT:
-                content = await AIService._generate_text(prompt, model, max_tokens, temperature, style, language)
-            elif content_type == ContentType.CODE:
-                content = await AIService._generate_code(prompt, model, max_tokens, temperature, **kwargs)
-            elif content_type == ContentType.SUMMARY:
-                content = await AIService._generate_summary(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.EMAIL:
-                content = await AIService._generate_email(prompt, model, max_tokens, temperature, style)
-            elif content_type == ContentType.BLOG_POST:
-                content = await AIService._generate_blog_post(prompt, model, max_tokens, temperature, style)
-            elif content_type == ContentType.SOCIAL_MEDIA:
-                content = await AIService._generate_social_media(prompt, model, max_tokens, temperature, **kwargs)
-            elif content_type == ContentType.AD_COPY:
-                content = await AIService._generate_ad_copy(prompt, model, max_tokens, temperature, **kwargs)
-            elif content_type == ContentType.PRODUCT_DESCRIPTION:
-                content = await AIService._generate_product_description(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.TRANSLATION:
-                content = await AIService._generate_translation(prompt, model, max_tokens, language, **kwargs)
-            elif content_type == ContentType.CREATIVE_WRITING:
-                content = await AIService._generate_creative_writing(prompt, model, max_tokens, temperature, style)
-            elif content_type == ContentType.TECHNICAL_DOCUMENTATION:
-                content = await AIService._generate_technical_docs(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.MARKETING_COPY:
-                content = await AIService._generate_marketing_copy(prompt, model, max_tokens, temperature, style)
-            elif content_type == ContentType.NEWS_ARTICLE:
-                content = await AIService._generate_news_article(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.REVIEW:
-                content = await AIService._generate_review(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.FAQ:
-                content = await AIService._generate_faq(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.TUTORIAL:
-                content = await AIService._generate_tutorial(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.PRESENTATION:
-                content = await AIService._generate_presentation(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.PROPOSAL:
-                content = await AIService._generate_proposal(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.REPORT:
-                content = await AIService._generate_report(prompt, model, max_tokens, temperature)
-            elif content_type == ContentType.ANALYSIS:
-                content = await AIService._generate_analysis(prompt, model, max_tokens, temperature)
-            else:
-                raise ValueError(f"Unknown content type: {content_type}")
+            match = await near_duplicates.lookup(scope, fingerprint, threshold)
+        except Exception as e:
+            logger.warning(f"Near-duplicate lookup failed: {e}")
+            return None
+        if match is None:
+            return None
+        cached_result = await AIService._read_cache(match[0])
+        if cached_result:
+            near_duplicates.hits += 1
+        return cached_result
+    
+    @staticmethod
+    async def _read_cache(cache_key: str) -> Optional[tuple[str, str, Dict[str, Any]]]:
+        """Return a cached generation as (content, model, metadata), if present"""
+        result = await generation_cache.get(cache_key)
+        if result is None:
+            return None
+        return AIService._unpack_cached(result)
+    
+    @staticmethod
+    async def _read_fresh_cache(cache_key: str) -> Optional[tuple[str, str, Dict[str, Any]]]:
+        """Like _read_cache, but ignores entries that are past their fresh period"""
+        result = await generation_cache.get(cache_key)
+        if result is None or time.time() >= result.get("fresh_until", float("inf")):
+            return None
+        return AIService._unpack_cached(result)
+    
+    @staticmethod
+    def _unpack_cached(result: Dict[str, Any]) -> tuple[str, str, Dict[str, Any]]:
+        return result["content"], result["model"], result.get("metadata", {})
+    
+    @staticmethod
+    async def _generate_uncached(
+        cache_key: str,
+        generation_id: str,
+        start_time: float,
+        policy: CachePolicy,
+        prompt: str,
+        content_type: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        language: str,
+        style: str,
+        **kwargs
+    ) -> tuple[str, str, Dict[str, Any]]:
+        """Call the model for a cache miss and cache the result as the policy allows"""
+        try:
+            fallback = None
+            generation = {"hedge_deadline": hedger.deadline_for(content_type), "prompt_tokens": 0, "completion_tokens": 0}
+            context_token = _generation_context.set(generation)
+            sink = _token_sink.get()
+            sink_token = None
+            if sink is not None:
+                # Note when the client has seen tokens: a local model cannot continue a remote partial answer
+                def streamed(text: str):
+                    generation["tokens_sent"] = True
+                    sink(text)
+                sink_token = _token_sink.set(streamed)
+            try:
+                content = await AIService._generate_for_type(
+                    prompt, content_type, model, max_tokens, temperature, language, style, **kwargs
+                )
+                if generation.get("hedged"):
+                    generation["primary"] = model
+                    model = generation["model"]
+            except ProviderError as e:
+                # Only an unavailable provider is worth a local stand-in; 4xx rejections are the caller's to see
+                if (
+                    not settings.PROVIDER_LOCAL_FALLBACK
+                    or content_type not in LOCAL_FALLBACKS
+                    or not is_provider_unavailable(e)
+                    or generation.get("tokens_sent")
+                ):
+                    raise
+                logger.warning(f"Provider failed for generation {generation_id}, falling back to a local model: {e}")
+                fallback = {"from_model": model, "reason": str(e)}
+                model = LOCAL_FALLBACKS[content_type][0].value
+                try:
+                    content = await AIService._generate_local_fallback(prompt, content_type, max_tokens, temperature)
+                except InferenceError as local_error:
+                    logger.error(f"Local fallback failed for generation {generation_id}: {local_error}")
+                    raise e
+            finally:
+                _generation_context.reset(context_token)
+                if sink_token is not None:
+                    _token_sink.reset(sink_token)
             
             # Calculate generation time
             generation_time = time.time() - start_time
             
+            # Provider calls report the tokens they sent and received; count the rest here
+            prompt_tokens = generation["prompt_tokens"] or tokenizer.count_tokens(prompt, model)
+            completion_tokens = generation["completion_tokens"] or tokenizer.count_tokens(content, model)
+            
             # Prepare metadata
             metadata = {
                 "generation_id": generation_id,
                 "generation_time": generation_time,
-                "tokens_used": len(content.split()),
+                "tokens_used": prompt_tokens + completion_tokens,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
                 "timestamp": datetime.utcnow().isoformat(),
                 "parameters": {
                     "temperature": temperature,
@@ -174,155 +353,331 @@ class AIService:
                     **kwargs
                 }
             }
+            if fallback:
+                metadata["fallback"] = fallback
+            if generation.get("hedged"):
+                metadata["hedge"] = {"primary": generation["primary"], "backup": generation["backup"], "winner": model}
             
-            # Cache the result with metadata
-            cache_data = {
-                "content": content,
-                "model": model,
-                "metadata": metadata
-            }
-            redis_client.setex(
-                cache_key,
-                3600,  # 1 hour TTL
-                json.dumps(cache_data)
-            )
+            # Cache the result with metadata; Redis keeps it through the stale window.
+            # Degraded fallback output is not cached, so recovery is picked up at once
+            if policy.cache and not fallback:
+                cache_data = {
+                    "content": content,
+                    "model": model,
+                    "metadata": metadata,
+                    "fresh_until": time.time() + policy.ttl
+                }
+                await generation_cache.set(
+                    cache_key,
+                    cache_data,
+                    policy.ttl + policy.stale_ttl
+                )
             
             logger.info(f"Content generation completed - ID: {generation_id}, Time: {generation_time:.2f}s")
             return content, model, metadata
             
+        except (ProviderError, ContextLengthExceeded, InferenceError) as e:
+            # Keep the type so the API can answer 503/413 instead of a bare 500
+            logger.error(f"Content generation failed - ID: {generation_id}, Error: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Content generation failed - ID: {generation_id}, Error: {str(e)}")
             raise Exception(f"AI generation failed: {str(e)}")
     
     @staticmethod
-    async def _check_rate_limit():
-        """Check and enforce rate limiting"""
-        # Simple rate limiting - can be enhanced with more sophisticated logic
-        current_time = time.time()
-        rate_limit_key = "rate_limit"
+    async def _generate_for_type(
+        prompt: str,
+        content_type: str,
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        language: str,
+        style: str,
+        **kwargs
+    ) -> str:
+        """Dispatch to the generator for a content type"""
+        if content_type == ContentType.TEXT:
+            content = await AIService._generate_text(prompt, model, max_tokens, temperature, style, language)
+        elif content_type == ContentType.CODE:
+            content = await AIService._generate_code(prompt, model, max_tokens, temperature, **kwargs)
+        elif content_type == ContentType.SUMMARY:
+            content = await AIService._generate_summary(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.EMAIL:
+            content = await AIService._generate_email(prompt, model, max_tokens, temperature, style)
+        elif content_type == ContentType.BLOG_POST:
+            content = await AIService._generate_blog_post(prompt, model, max_tokens, temperature, style)
+        elif content_type == ContentType.SOCIAL_MEDIA:
+            content = await AIService._generate_social_media(prompt, model, max_tokens, temperature, **kwargs)
+        elif content_type == ContentType.AD_COPY:
+            content = await AIService._generate_ad_copy(prompt, model, max_tokens, temperature, **kwargs)
+        elif content_type == ContentType.PRODUCT_DESCRIPTION:
+            content = await AIService._generate_product_description(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.TRANSLATION:
+            content = await AIService._generate_translation(prompt, model, max_tokens, language, **kwargs)
+        elif content_type == ContentType.CREATIVE_WRITING:
+            content = await AIService._generate_creative_writing(prompt, model, max_tokens, temperature, style)
+        elif content_type == ContentType.TECHNICAL_DOCUMENTATION:
+            content = await AIService._generate_technical_docs(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.MARKETING_COPY:
+            content = await AIService._generate_marketing_copy(prompt, model, max_tokens, temperature, style)
+        elif content_type == ContentType.NEWS_ARTICLE:
+            content = await AIService._generate_news_article(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.REVIEW:
+            content = await AIService._generate_review(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.FAQ:
+            content = await AIService._generate_faq(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.TUTORIAL:
+            content = await AIService._generate_tutorial(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.PRESENTATION:
+            content = await AIService._generate_presentation(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.PROPOSAL:
+            content = await AIService._generate_proposal(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.REPORT:
+            content = await AIService._generate_report(prompt, model, max_tokens, temperature)
+        elif content_type == ContentType.ANALYSIS:
+            content = await AIService._generate_analysis(prompt, model, max_tokens, temperature)
+        else:
+            raise ValueError(f"Unknown content type: {content_type}")
+        return content
+    
+    @staticmethod
+    async def _generate_local_fallback(prompt: str, content_type: str, max_tokens: int, temperature: float) -> str:
+        """Generate with the local pipeline that stands in for the provider (raises InferenceError if unavailable)"""
+        _, pipeline, output_key = LOCAL_FALLBACKS[content_type]
+        if pipeline == "summarizer":
+            return await AIService._summarize_local(prompt, max_tokens)
+        result = await AIService._run_local(
+            pipeline, prompt, max_length=max_tokens, temperature=temperature, do_sample=True
+        )
+        return result[0][output_key]
+    
+    @staticmethod
+    async def generate_content_stream(**kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """Run generate_content, yielding token events as they arrive and a final done event"""
+        queue: asyncio.Queue = asyncio.Queue()
         
-        # Get current request count
-        current_count = redis_client.get(rate_limit_key)
-        if current_count is None:
-            redis_client.setex(rate_limit_key, 60, 1)  # 1 minute window
+        # The task copies the current context, so the sink is only visible to this generation
+        sink_token = _token_sink.set(queue.put_nowait)
+        try:
+            task = asyncio.create_task(AIService.generate_content(**kwargs))
+        finally:
+            _token_sink.reset(sink_token)
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        
+        try:
+            streamed = False
+            while (text := await queue.get()) is not None:
+                streamed = True
+                yield {"event": "token", "text": text}
+            
+            content, model_used, metadata = task.result()
+            if not streamed:
+                # Cache hits and non-streaming handlers deliver the whole text at once
+                yield {"event": "token", "text": content}
+            yield {"event": "done", "content": content, "model": model_used, "metadata": metadata}
+        finally:
+            if not task.done():
+                task.cancel()
+    
+    @staticmethod
+    async def _chat_completion(model: str, system_prompt: str, user_prompt: str, max_tokens: int, temperature: float) -> str:
+        """Run a chat completion through the shared pooled provider client, hedged if enabled"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        # Reject (or trim) requests that cannot fit before paying for a round-trip
+        messages, max_tokens, prompt_tokens = tokenizer.fit_to_context(
+            messages, model, max_tokens, settings.MIN_COMPLETION_TOKENS, settings.CONTEXT_OVERFLOW == "trim"
+        )
+        sink = _token_sink.get()
+        generation = _generation_context.get()
+        deadline = generation["hedge_deadline"] if generation else None
+        backup = hedger.backup_for(model) if deadline is not None else None
+        # A backup that is not a configured hosted model (e.g. a local one) is not raced
+        backup_provider = hosted_providers.get(get_provider(backup)) if backup is not None else None
+        if backup_provider is None or not backup_provider.api_key:
+            text = await AIService._call_provider(model, messages, max_tokens, temperature, sink)
+            answered_by = model
         else:
-            count = int(current_count)
-            if count >= 100:  # 100 requests per minute
-                raise Exception("Rate limit exceeded. Please try again later.")
-            redis_client.incr(rate_limit_key)
+            # Hedged calls always stream, to see when the first token arrives
+            text, answered_by, hedged = await hedger.race(
+                model,
+                backup,
+                deadline,
+                lambda name, on_delta: AIService._call_provider(name, messages, max_tokens, temperature, on_delta),
+                sink
+            )
+            if hedged:
+                generation.update(hedged=True, backup=backup, model=answered_by)
+        
+        if generation is not None:
+            # Completion tokens are counted by _call_provider for the call that answered
+            generation["prompt_tokens"] += prompt_tokens
+        return text
+    
+    @staticmethod
+    async def _call_provider(
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float,
+        on_delta: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Call the provider serving a model behind its breaker and throttle, streaming to on_delta if given.
+
+        The answer's completion tokens are added to the current generation's count.
+        """
+        provider = hosted_providers[get_provider(model)]
+        parts = []
+        
+        async def attempt() -> Tuple[str, int]:
+            # Concurrency adapts to the provider's 429s, timeouts and latency
+            async with provider_throttle.slot(provider.name, model) as timing:
+                if on_delta is None:
+                    text = await provider.chat_completion(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=temperature
+                    )
+                    timing.output_tokens = tokenizer.count_tokens(text, model)
+                    return text, timing.output_tokens
+                
+                async for delta in provider.stream_chat_completion(
+                    model=model,
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature
+                ):
+                    timing.first_token()
+                    parts.append(delta)
+                    on_delta(delta)
+                text = "".join(parts)
+                return text, tokenizer.count_tokens(text, model)
+        
+        # A stream that already sent tokens to the client cannot be retried
+        text, completion_tokens = await circuit_breakers.call(provider.name, model, attempt, can_retry=lambda: not parts)
+        generation = _generation_context.get()
+        if generation is not None:
+            generation["completion_tokens"] += completion_tokens
+        return text
+    
+    @staticmethod
+    async def _run_local(name: str, prompt: str, **kwargs) -> List[Dict[str, Any]]:
+        """Run a local pipeline, micro-batched unless the caller is streaming tokens"""
+        sink = _token_sink.get()
+        if sink is not None or not settings.MICROBATCH_ENABLED:
+            return await inference_executor.run(name, prompt, on_token=sink, **kwargs)
+        return await local_batcher.submit(name, prompt, **kwargs)
     
     @staticmethod
     async def _generate_text(prompt: str, model: str, max_tokens: int, temperature: float = 0.7, style: str = "professional", language: str = "en") -> str:
         """Generate general text content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a helpful AI assistant that generates {style} content in {language}. Provide clear, engaging, and well-structured responses."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
         else:
             # Use local model as fallback
-            if text_generator:
-                result = text_generator(prompt, max_length=max_tokens, temperature=temperature, do_sample=True)
+            try:
+                result = await AIService._run_local(
+                    "text_generator", prompt, max_length=max_tokens, temperature=temperature, do_sample=True
+                )
                 return result[0]['generated_text']
-            return "Local text generation model not available"
+            except ModelUnavailable:
+                return "Local text generation model not available"
     
     @staticmethod
     async def _generate_code(prompt: str, model: str, max_tokens: int, temperature: float = 0.7, language: str = "python", **kwargs) -> str:
         """Generate code content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are an expert {language} developer. Generate clean, well-commented, and efficient code. Follow best practices and include proper error handling."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
         else:
             # Use local code generation model
-            if code_generator:
-                result = code_generator(prompt, max_length=max_tokens, temperature=temperature, do_sample=True)
+            try:
+                result = await AIService._run_local(
+                    "code_generator", prompt, max_length=max_tokens, temperature=temperature, do_sample=True
+                )
                 return result[0]['generated_text']
-            return "Code generation model not available"
+            except ModelUnavailable:
+                return "Code generation model not available"
     
     @staticmethod
     async def _generate_summary(prompt: str, model: str, max_tokens: int = 150, temperature: float = 0.3) -> str:
-        """Generate summary content"""
+        """Generate summary content, map-reducing documents longer than one chunk"""
         if len(prompt.split()) < 50:
             return "Text too short for summarization. Please provide at least 50 words."
         
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a summarization expert. Create concise, accurate summaries that capture the key points and main ideas. Maintain the original tone and context."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Summarize the following text:\n\n{prompt}"}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
+            
+            async def leaf(text: str, limit: int) -> str:
+                return await AIService._chat_completion(model, system_prompt, f"Summarize the following text:\n\n{text}", limit, temperature)
+            
+            return await summarizer.summarize(
+                prompt, model, max_tokens, leaf,
+                lambda text: tokenizer.count_tokens(text, model),
+                settings.SUMMARY_CHUNK_TOKENS,
+                AIService._without_streaming(leaf),
+                {"temperature": temperature, "system": system_prompt}
             )
-            return response.choices[0].message.content
         else:
             # Use local summarization model
-            if summarizer:
-                result = summarizer(prompt, max_length=max_tokens, min_length=30, do_sample=False)
-                return result[0]['summary_text']
-            return "Summarization model not available"
+            try:
+                return await AIService._summarize_local(prompt, max_tokens)
+            except ModelUnavailable:
+                return "Summarization model not available"
+    
+    @staticmethod
+    async def _summarize_local(prompt: str, max_tokens: int) -> str:
+        """Summarize with the local model, in chunks it can take (bart-large-cnn reads ~1024 tokens)"""
+        async def leaf(text: str, limit: int) -> str:
+            result = await AIService._run_local(
+                "summarizer", text, max_length=limit, min_length=min(30, limit // 2), do_sample=False
+            )
+            return result[0]['summary_text']
+        
+        model = AIModel.LOCAL_SUMMARY.value
+        return await summarizer.summarize(
+            prompt, model, max_tokens, leaf,
+            lambda text: tokenizer.count_tokens(text, model),
+            settings.SUMMARY_LOCAL_CHUNK_TOKENS,
+            AIService._without_streaming(leaf),
+            {"do_sample": False}
+        )
+    
+    @staticmethod
+    def _without_streaming(leaf: Callable[[str, int], Any]) -> Callable[[str, int], Any]:
+        """Wrap a summary step so chunk and intermediate summaries are not streamed to the client"""
+        async def run(text: str, limit: int) -> str:
+            token = _token_sink.set(None)
+            try:
+                return await leaf(text, limit)
+            finally:
+                _token_sink.reset(token)
+        return run
     
     @staticmethod
     async def _generate_email(prompt: str, model: str, max_tokens: int, temperature: float, style: str) -> str:
         """Generate email content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a professional email writer. Generate {style} emails that are clear, engaging, and appropriate for business communication. Include proper greeting and closing."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Email generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Email generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_blog_post(prompt: str, model: str, max_tokens: int, temperature: float, style: str) -> str:
         """Generate blog post content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a professional blog writer. Create engaging, well-structured blog posts in a {style} style. Include an attention-grabbing headline, clear sections, and a compelling conclusion."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Blog post generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Blog post generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_social_media(prompt: str, model: str, max_tokens: int, temperature: float, platform: str = "twitter") -> str:
         """Generate social media content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             platform_guidelines = {
                 "twitter": "Keep it under 280 characters, use hashtags strategically, and make it engaging",
                 "facebook": "Write engaging posts that encourage interaction and sharing",
@@ -331,291 +686,193 @@ class AIService:
             }
             
             system_prompt = f"You are a social media expert. Generate {platform} content that is {platform_guidelines.get(platform, 'engaging and appropriate')}."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Social media generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Social media generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_ad_copy(prompt: str, model: str, max_tokens: int, temperature: float, ad_type: str = "display") -> str:
         """Generate advertising copy"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a professional copywriter specializing in {ad_type} advertising. Create compelling, persuasive ad copy that drives action and converts prospects into customers."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Ad copy generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Ad copy generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_product_description(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate product descriptions"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a professional product copywriter. Create compelling product descriptions that highlight key features, benefits, and unique selling points. Use persuasive language that drives sales."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Product description generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Product description generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_translation(prompt: str, model: str, max_tokens: int, target_language: str, source_language: str = "auto") -> str:
         """Generate translations"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a professional translator. Translate the given text from {source_language} to {target_language}. Maintain the original tone, style, and meaning while ensuring natural, fluent output."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=0.3
-            )
-            return response.choices[0].message.content
-        return "Translation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, 0.3)
+        return "Translation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_creative_writing(prompt: str, model: str, max_tokens: int, temperature: float, genre: str = "general") -> str:
         """Generate creative writing content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a creative writing expert specializing in {genre}. Create engaging, original content that captivates readers with vivid descriptions, compelling characters, and immersive storytelling."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Creative writing requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Creative writing requires GPT or Claude models"
     
     @staticmethod
     async def _generate_technical_docs(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate technical documentation"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a technical writing expert. Create clear, comprehensive technical documentation that is easy to understand and follow. Include code examples, step-by-step instructions, and troubleshooting tips."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Technical documentation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Technical documentation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_marketing_copy(prompt: str, model: str, max_tokens: int, temperature: float, campaign_type: str = "general") -> str:
         """Generate marketing copy"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = f"You are a marketing copywriter specializing in {campaign_type} campaigns. Create persuasive, compelling copy that resonates with target audiences and drives desired actions."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Marketing copy requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Marketing copy requires GPT or Claude models"
     
     @staticmethod
     async def _generate_news_article(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate news articles"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a professional journalist. Write objective, well-researched news articles that follow journalistic standards. Include proper structure with headline, lead, body, and conclusion."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "News article generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "News article generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_review(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate product/service reviews"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a professional reviewer. Write honest, balanced reviews that provide valuable insights to potential customers. Include both positive and negative aspects when appropriate."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Review generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Review generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_faq(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate FAQ content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a customer service expert. Create comprehensive FAQ sections that address common questions and concerns. Provide clear, helpful answers that reduce support burden."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "FAQ generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "FAQ generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_tutorial(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate tutorial content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are an educational content creator. Write step-by-step tutorials that are easy to follow and understand. Include clear instructions, examples, and troubleshooting tips."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Tutorial generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Tutorial generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_presentation(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate presentation content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a presentation expert. Create engaging presentation content with clear structure, compelling points, and visual suggestions. Include speaker notes and slide transitions."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Presentation generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Presentation generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_proposal(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate business proposals"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a business proposal expert. Create professional, persuasive proposals that clearly outline objectives, methodology, timeline, and value proposition."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Proposal generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Proposal generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_report(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate business reports"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a business analyst. Create comprehensive reports with executive summary, key findings, analysis, and recommendations. Use data-driven insights and professional formatting."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Report generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Report generation requires GPT or Claude models"
     
     @staticmethod
     async def _generate_analysis(prompt: str, model: str, max_tokens: int, temperature: float) -> str:
         """Generate analytical content"""
-        if model.startswith("gpt"):
+        if is_hosted(model):
             system_prompt = "You are a data analyst and researcher. Provide thorough analysis with insights, trends, patterns, and actionable recommendations based on the given information."
-            response = await asyncio.to_thread(
-                openai.ChatCompletion.create,
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature
-            )
-            return response.choices[0].message.content
-        return "Analysis generation requires GPT models"
+            return await AIService._chat_completion(model, system_prompt, prompt, max_tokens, temperature)
+        return "Analysis generation requires GPT or Claude models"
+    
+    @staticmethod
+    async def _generate_batch_item(request: Dict[str, Any]) -> Dict[str, Any]:
+        """One batch item; failures are reported in the result instead of raised"""
+        try:
+            # Provider calls are bounded by provider_throttle, local ones by the inference pool
+            content, model_used, metadata = await AIService.generate_content(**request)
+            return {
+                "success": True,
+                "content": content,
+                "model": model_used,
+                "metadata": metadata
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "request": request
+            }
     
     @staticmethod
     async def generate_batch_content(requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Generate multiple content pieces in batch"""
-        results = []
-        for request in requests:
-            try:
-                content, model, metadata = await AIService.generate_content(**request)
-                results.append({
-                    "success": True,
-                    "content": content,
-                    "model": model,
-                    "metadata": metadata
-                })
-            except Exception as e:
-                results.append({
-                    "success": False,
-                    "error": str(e),
-                    "request": request
-                })
-        return results
+        """Generate multiple content pieces concurrently, keeping results in input order"""
+        batch_slots = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+        
+        async def run(request: Dict[str, Any]) -> Dict[str, Any]:
+            async with batch_slots:
+                return await AIService._generate_batch_item(request)
+        
+        # gather preserves input order, so wall time tracks the slowest item
+        return list(await asyncio.gather(*(run(request) for request in requests)))
+    
+    @staticmethod
+    async def generate_batch_stream(
+        requests: Iterable[Dict[str, Any]],
+        group_size: int,
+        group_wait: float
+    ) -> AsyncIterator[List[Tuple[int, Dict[str, Any]]]]:
+        """Generate a batch, yielding (input index, result) pairs as items finish.
+        
+        Finished items are grouped: a group is yielded once it has group_size
+        items or its first item has waited group_wait seconds. Requests are
+        pulled lazily and only BATCH_CONCURRENCY items are in flight, so memory
+        does not grow with the batch. Closing the iterator cancels the rest.
+        """
+        loop = asyncio.get_running_loop()
+        pending = enumerate(requests)
+        in_flight: Dict[asyncio.Task, int] = {}
+        group: List[Tuple[int, Dict[str, Any]]] = []
+        deadline = None
+        
+        def refill():
+            for index, request in pending:
+                in_flight[asyncio.create_task(AIService._generate_batch_item(request))] = index
+                if len(in_flight) >= settings.BATCH_CONCURRENCY:
+                    return
+        
+        try:
+            refill()
+            while in_flight:
+                timeout = None if deadline is None else max(0.0, deadline - loop.time())
+                done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    group.append((in_flight.pop(task), task.result()))
+                refill()
+                if group and deadline is None:
+                    deadline = loop.time() + group_wait
+                if group and (len(group) >= group_size or loop.time() >= deadline or not in_flight):
+                    yield group
+                    group, deadline = [], None
+        finally:
+            for task in in_flight:
+                task.cancel()
     
     @staticmethod
     async def optimize_prompt(prompt: str, content_type: str) -> str:
@@ -14,6 +14,7 @@ from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import logging
 from . import models, schemas, database
+from .rate_limit import rate_limiter, rate_limit_headers
 from .config import settings
 
 logger = logging.getLogger(__name__)
@@ -112,10 +113,7 @@ async def get_current_user(
     if user is None or not user.is_active:
         raise credentials_exception
     
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
-    
+    # last_login is set by /token; writing it here cost a commit on every request
     return user
 
 async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
@@ -278,34 +276,13 @@ def verify_password_reset_token(db: Session, token: str):
         return True
     return False
 
-def check_rate_limit(db: Session, user_id: int, endpoint: str, limit: int = 100, window_minutes: int = 60):
-    """Check if user has exceeded rate limit for an endpoint"""
-    window_start = datetime.utcnow() - timedelta(minutes=window_minutes)
-    
-    # Clean old rate limit records
-    db.query(models.RateLimit).filter(
-        models.RateLimit.window_start < window_start
-    ).delete()
-    
-    # Check current rate limit
-    current_count = db.query(models.RateLimit).filter(
-        and_(
-            models.RateLimit.user_id == user_id,
-            models.RateLimit.endpoint == endpoint,
-            models.RateLimit.window_start >= window_start
+async def check_rate_limit(user_id: int, endpoint: str, limit: int = 100, window_minutes: int = 60) -> schemas.RateLimitInfo:
+    """Count a request against the user's limit for an endpoint; raises 429 when it is exceeded"""
+    allowed, info, retry_after = await rate_limiter.hit(user_id, endpoint, limit, window_minutes)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={**rate_limit_headers(info), "Retry-After": str(retry_after)}
         )
-    ).count()
-    
-    if current_count >= limit:
-        return False
-    
-    # Record this request
-    rate_limit = models.RateLimit(
-        user_id=user_id,
-        endpoint=endpoint,
-        request_count=1
-    )
-    db.add(rate_limit)
-    db.commit()
-    
-    return True
\ No newline at end of file
+    return info
@@ -0,0 +1,251 @@
+# backend/app/cache.py
+import asyncio
+import json
+import logging
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import msgpack
+import zstandard
+from .redis_pool import get_redis, pipelined
+
+logger = logging.getLogger(__name__)
+
+# Binary entries start with 0xc1, a byte that never begins msgpack or JSON, then
+# a format version and a compression codec; anything else is a legacy JSON entry
+FRAME_MAGIC = 0xC1
+FRAME_VERSION = 1
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+class CacheCodec:
+    """Versioned msgpack framing for cache entries, compressed above a size threshold"""
+
+    def __init__(self, compression: str = "zstd", threshold_bytes: int = 1024, write_format: str = "binary"):
+        if compression not in CODECS:
+            raise ValueError(f"Unknown cache compression {compression!r}")
+        self.codec = CODECS[compression]
+        self.threshold_bytes = threshold_bytes
+        # "json" keeps writing the legacy format while older pods are still rolling out
+        self.write_format = write_format
+        self._zstd_compressor = zstandard.ZstdCompressor(level=3)
+        self._zstd_decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, value: Any) -> Tuple[bytes, int]:
+        """Serialize a value; also returns its uncompressed size"""
+        if self.write_format == "json":
+            raw = json.dumps(value).encode()
+            return raw, len(raw)
+
+        packed = msgpack.packb(value, use_bin_type=True)
+        codec = self.codec if len(packed) >= self.threshold_bytes else CODEC_NONE
+        if codec == CODEC_ZSTD:
+            body = self._zstd_compressor.compress(packed)
+        elif codec == CODEC_ZLIB:
+            body = zlib.compress(packed)
+        else:
+            body = packed
+        return bytes((FRAME_MAGIC, FRAME_VERSION, codec)) + body, len(packed)
+
+    def decode(self, raw: bytes) -> Tuple[Any, int]:
+        """Deserialize a binary or legacy JSON entry; also returns its uncompressed size"""
+        if not raw or raw[0] != FRAME_MAGIC:
+            return json.loads(raw), len(raw)
+
+        version, codec = raw[1], raw[2]
+        if version != FRAME_VERSION:
+            raise ValueError(f"Unsupported cache entry version {version}")
+        body = raw[3:]
+        if codec == CODEC_ZSTD:
+            packed = self._zstd_decompressor.decompress(body)
+        elif codec == CODEC_ZLIB:
+            packed = zlib.decompress(body)
+        else:
+            packed = body
+        return msgpack.unpackb(packed, raw=False), len(packed)
+
+class LocalLRU:
+    """Size-bounded in-process cache whose entries expire like their Redis copies"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, _, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl: float):
+        if size > self.max_bytes or ttl <= 0:
+            return
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, size, value)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._remove(key)
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[1]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class GenerationCache:
+    """Two-tier cache for generation results: an in-process LRU in front of Redis.
+
+    Local entries expire with the remaining Redis TTL. Writes and invalidations
+    are announced on a pub/sub channel so other pods drop their local copies.
+    """
+
+    def __init__(
+        self,
+        local_max_bytes: int,
+        channel: str,
+        local_enabled: bool = True,
+        codec: Optional[CacheCodec] = None,
+        redis_client=None
+    ):
+        self._redis = redis_client
+        self.codec = codec or CacheCodec()
+        self.local = LocalLRU(local_max_bytes)
+        self.channel = channel
+        self.local_enabled = local_enabled
+        self.local_hits = 0
+        self.local_misses = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.invalidations_received = 0
+        self._origin = uuid.uuid4().hex
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, checking this process before Redis.
+
+        Local hits return the same decoded object to every caller, so treat it as read-only.
+        """
+        if self.local_enabled:
+            value = self.local.get(key)
+            if value is not None:
+                self.local_hits += 1
+                return value
+            self.local_misses += 1
+
+        def build(pipe):
+            pipe.get(key)
+            pipe.pttl(key)
+        raw, ttl_ms = await pipelined(build, self.redis)
+        if raw is None:
+            self.redis_misses += 1
+            return None
+
+        try:
+            value, size = self.codec.decode(raw)
+        except Exception as e:
+            # Treat unreadable entries (e.g. a newer format mid-rollout) as misses
+            logger.warning(f"Failed to decode cache entry {key}: {e}")
+            self.redis_misses += 1
+            return None
+        self.redis_hits += 1
+        if self.local_enabled and ttl_ms and ttl_ms > 0:
+            self.local.set(key, value, size, ttl_ms / 1000)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int):
+        """Store a value in both tiers and drop stale copies on other pods"""
+        raw, size = self.codec.encode(value)
+
+        def build(pipe):
+            pipe.setex(key, ttl, raw)
+            if self.local_enabled:
+                pipe.publish(self.channel, f"{self._origin}:{key}")
+        await pipelined(build, self.redis)
+        if self.local_enabled:
+            self.local.set(key, value, size, ttl)
+
+    async def invalidate(self, key: str):
+        """Remove a value from Redis and from every pod's local tier"""
+        self.local.delete(key)
+
+        def build(pipe):
+            pipe.delete(key)
+            pipe.publish(self.channel, f"{self._origin}:{key}")
+        await pipelined(build, self.redis)
+
+    def _on_invalidation(self, message: Dict[str, Any]):
+        origin, _, key = message["data"].decode().partition(":")
+        if origin != self._origin:
+            self.invalidations_received += 1
+            self.local.delete(key)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    self._on_invalidation(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Until resubscribed, local entries still expire with their Redis TTL
+                logger.warning(f"Cache invalidation listener disconnected: {e}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    def start_listener(self):
+        """Subscribe to invalidations from other pods (idempotent)"""
+        if self._listener is None and self.local_enabled:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per tier and local tier memory use"""
+        return {
+            "local": {
+                "enabled": self.local_enabled,
+                "hits": self.local_hits,
+                "misses": self.local_misses,
+                "entries": len(self.local),
+                "size_bytes": self.local.size_bytes,
+                "max_bytes": self.local.max_bytes,
+                "evictions": self.local.evictions,
+                "invalidations_received": self.invalidations_received
+            },
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses
+            },
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes
+        }
@@ -0,0 +1,48 @@
+# backend/app/cache_policy.py
+from typing import Dict, NamedTuple
+from .config import settings
+
+class CachePolicy(NamedTuple):
+    """How a generation is cached"""
+    cache: bool
+    ttl: int  # seconds the entry is served as fresh
+    stale_ttl: int  # further seconds it is served stale while being refreshed in the background
+
+NO_CACHE = CachePolicy(False, 0, 0)
+
+def temperature_band(temperature: float) -> str:
+    if temperature <= 0.3:
+        return "low"
+    if temperature <= 0.8:
+        return "medium"
+    return "high"
+
+def _policy(ttl_factor: float, stale_factor: float) -> CachePolicy:
+    """Policy with TTLs scaled from settings.CACHE_TTL"""
+    return CachePolicy(True, int(settings.CACHE_TTL * ttl_factor), int(settings.CACHE_TTL * stale_factor))
+
+# Temperature band -> policy for content types without an entry below
+DEFAULT_POLICIES: Dict[str, CachePolicy] = {
+    "low": _policy(6, 1),
+    "medium": _policy(1, 0.25),
+    "high": _policy(0.25, 0),
+}
+
+# Content type -> temperature band -> policy
+CACHE_POLICIES: Dict[str, Dict[str, CachePolicy]] = {
+    # Near-deterministic: the same input should keep producing the same output
+    "summary": {"low": _policy(24, 6), "medium": _policy(12, 3), "high": _policy(1, 0.25)},
+    "translation": {"low": _policy(24, 6), "medium": _policy(24, 6), "high": _policy(24, 6)},
+    "code": {"low": _policy(6, 1), "medium": _policy(1, 0.25), "high": NO_CACHE},
+    "technical_documentation": {"low": _policy(6, 1), "medium": _policy(2, 0.5), "high": _policy(0.25, 0)},
+    # Variety is the point: repeating a prompt should not replay the same text for long
+    "creative_writing": {"low": _policy(1, 0.25), "medium": _policy(0.25, 0), "high": NO_CACHE},
+    "social_media": {"low": _policy(1, 0.25), "medium": _policy(0.25, 0), "high": NO_CACHE},
+    "ad_copy": {"low": _policy(1, 0.25), "medium": _policy(0.25, 0), "high": NO_CACHE},
+    "marketing_copy": {"low": _policy(1, 0.25), "medium": _policy(0.25, 0), "high": NO_CACHE},
+}
+
+def cache_policy_for(content_type: str, temperature: float) -> CachePolicy:
+    """Cache policy for a content type at a sampling temperature"""
+    band = temperature_band(temperature)
+    return CACHE_POLICIES.get(content_type, DEFAULT_POLICIES)[band]
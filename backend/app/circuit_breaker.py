@@ -0,0 +1,266 @@
+# backend/app/circuit_breaker.py
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Callable, Awaitable, TypeVar
+from .providers import ProviderError
+from .adaptive_limit import ThrottleSaturated
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitOpenError(ProviderError):
+    """Raised without calling the provider while its circuit is open"""
+
+def is_provider_failure(error: ProviderError) -> bool:
+    """Whether an error says the provider is unhealthy (and is worth retrying)"""
+    if isinstance(error, (CircuitOpenError, ThrottleSaturated)):
+        return False
+    return error.timed_out or error.status_code is None or error.status_code == 429 or error.status_code >= 500
+
+def is_provider_unavailable(error: ProviderError) -> bool:
+    """Whether a call failed because the provider is down or saturated, not because of the request itself"""
+    return isinstance(error, (CircuitOpenError, ThrottleSaturated)) or is_provider_failure(error)
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker for one provider/model pair.
+
+    Opens once at least min_calls of the last window_calls outcomes (no older
+    than window seconds) fail at failure_ratio or more; counting calls rather
+    than only time keeps a burst of healthy traffic from hiding an outage.
+    While open every call is rejected; after open_seconds up to
+    half_open_calls probes go through, and the circuit closes once they all
+    succeed or reopens on the first failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_ratio: float,
+        min_calls: int,
+        window_calls: int,
+        window: float,
+        open_seconds: float,
+        half_open_calls: int
+    ):
+        self.name = name
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self._outcomes: Deque[tuple[float, bool]] = deque(maxlen=window_calls)
+        self._probes = 0
+        self._probe_successes = 0
+
+    def _transition(self, state: str):
+        logger.warning(f"Circuit for {self.name}: {self.state} -> {state}")
+        self.state = state
+        if state == OPEN:
+            self.opened += 1
+            self.opened_at = time.monotonic()
+        self._outcomes.clear()
+        self._probes = 0
+        self._probe_successes = 0
+
+    def before_call(self):
+        """Admit a call or raise CircuitOpenError"""
+        if self.state == OPEN:
+            remaining = self.opened_at + self.open_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, "circuit open", 503, retry_after=remaining)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                self.rejected += 1
+                raise CircuitOpenError(self.name, "circuit half-open, probe in flight", 503, retry_after=1.0)
+            self._probes += 1
+
+    def after_call(self, ok: Optional[bool]):
+        """Record an admitted call's outcome (None when it was abandoned, e.g. cancelled)"""
+        if self.state == HALF_OPEN:
+            if ok is None:
+                self._probes -= 1
+            elif not ok:
+                self._transition(OPEN)
+            else:
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._transition(CLOSED)
+            return
+        if ok is None or self.state != CLOSED:
+            return
+
+        now = time.monotonic()
+        self._outcomes.append((now, ok))
+        while self._outcomes and self._outcomes[0][0] < now - self.window:
+            self._outcomes.popleft()
+        if not ok and len(self._outcomes) >= self.min_calls:
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if failures / len(self._outcomes) >= self.failure_ratio:
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        failures = sum(1 for _, success in self._outcomes if not success)
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": failures,
+            "open_for": max(0.0, round(self.opened_at + self.open_seconds - time.monotonic(), 2)) if self.state == OPEN else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+class RetryBudget:
+    """Caps retries at a fraction of recent calls (plus a small floor) over a sliding window"""
+
+    def __init__(self, ratio: float, min_retries: int, window: float):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self.exhausted = 0
+        self._calls: Deque[float] = deque()
+        self._retries: Deque[float] = deque()
+
+    def _trim(self, now: float):
+        for events in (self._calls, self._retries):
+            while events and events[0] < now - self.window:
+                events.popleft()
+
+    def record_call(self):
+        self._calls.append(time.monotonic())
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget if there is room"""
+        now = time.monotonic()
+        self._trim(now)
+        if len(self._retries) >= self.min_retries + self.ratio * len(self._calls):
+            self.exhausted += 1
+            return False
+        self._retries.append(now)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        return {"recent_calls": len(self._calls), "recent_retries": len(self._retries), "exhausted": self.exhausted}
+
+class CircuitBreakers:
+    """Circuit breaker, retries with jittered backoff and a retry budget, per provider and model"""
+
+    def __init__(
+        self,
+        max_retries: int,
+        base_delay: float,
+        max_delay: float,
+        budget_ratio: float,
+        budget_min_retries: int,
+        budget_window: float,
+        failure_ratio: float,
+        min_calls: int,
+        window_calls: int,
+        window: float,
+        open_seconds: float,
+        half_open_calls: int
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.budget_min_retries = budget_min_retries
+        self.budget_window = budget_window
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.window_calls = window_calls
+        self.window = window
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.retries = 0
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._budgets: Dict[str, RetryBudget] = {}
+
+    def breaker_for(self, provider: str, model: str) -> CircuitBreaker:
+        key = f"{provider}:{model}"
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = self._breakers[key] = CircuitBreaker(
+                key, self.failure_ratio, self.min_calls, self.window_calls, self.window,
+                self.open_seconds, self.half_open_calls
+            )
+        return breaker
+
+    def _budget_for(self, provider: str, model: str) -> RetryBudget:
+        key = f"{provider}:{model}"
+        budget = self._budgets.get(key)
+        if budget is None:
+            budget = self._budgets[key] = RetryBudget(self.budget_ratio, self.budget_min_retries, self.budget_window)
+        return budget
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """Full-jitter exponential delay, never shorter than Retry-After; None if that is too long"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            if retry_after > self.max_delay:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    async def call(
+        self,
+        provider: str,
+        model: str,
+        attempt: Callable[[], Awaitable[T]],
+        can_retry: Optional[Callable[[], bool]] = None
+    ) -> T:
+        """Run attempt() behind the breaker, retrying provider failures while the budget allows"""
+        breaker = self.breaker_for(provider, model)
+        budget = self._budget_for(provider, model)
+        budget.record_call()
+        retry = 0
+        while True:
+            breaker.before_call()
+            try:
+                result = await attempt()
+            except ThrottleSaturated:
+                # Never reached the provider: neither a success nor a failure
+                breaker.after_call(None)
+                raise
+            except ProviderError as e:
+                failed = is_provider_failure(e)
+                breaker.after_call(not failed)
+                if not failed or retry >= self.max_retries or (can_retry is not None and not can_retry()):
+                    raise
+                delay = self._backoff(retry, e.retry_after)
+                if delay is None or not budget.try_spend():
+                    raise
+                retry += 1
+                self.retries += 1
+                logger.info(f"Retrying {provider}:{model} in {delay:.2f}s after: {e}")
+                await asyncio.sleep(delay)
+            except BaseException:
+                breaker.after_call(None)
+                raise
+            else:
+                breaker.after_call(True)
+                return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and retry budget per provider/model"""
+        return {
+            "retries": self.retries,
+            "circuits": {
+                key: {**breaker.stats(), "retry_budget": self._budget_for(*key.split(":", 1)).stats()}
+                for key, breaker in self._breakers.items()
+            }
+        }
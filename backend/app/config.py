@@ -18,10 +18,124 @@ class Settings:
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+    OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
+    
+    # Provider HTTP Client
+    PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "100"))
+    PROVIDER_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("PROVIDER_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    PROVIDER_KEEPALIVE_EXPIRY = float(os.getenv("PROVIDER_KEEPALIVE_EXPIRY", "30"))  # seconds
+    PROVIDER_CONNECT_TIMEOUT = float(os.getenv("PROVIDER_CONNECT_TIMEOUT", "5"))  # seconds
+    PROVIDER_READ_TIMEOUT = float(os.getenv("PROVIDER_READ_TIMEOUT", "60"))  # seconds
+    
+    # Provider Throttling (adaptive concurrency per provider/model)
+    PROVIDER_INITIAL_CONCURRENCY = int(os.getenv("PROVIDER_INITIAL_CONCURRENCY", "8"))
+    PROVIDER_MIN_CONCURRENCY = int(os.getenv("PROVIDER_MIN_CONCURRENCY", "1"))
+    PROVIDER_MAX_CONCURRENCY = int(os.getenv("PROVIDER_MAX_CONCURRENCY", "64"))
+    PROVIDER_BACKOFF_RATIO = float(os.getenv("PROVIDER_BACKOFF_RATIO", "0.75"))  # limit multiplier on 429/timeout
+    PROVIDER_LATENCY_TOLERANCE = float(os.getenv("PROVIDER_LATENCY_TOLERANCE", "3"))  # x average latency counts as overload
+    PROVIDER_QUEUE_TIMEOUT = float(os.getenv("PROVIDER_QUEUE_TIMEOUT", "30"))  # max wait for a slot
+    
+    # Provider Resilience (retries, circuit breaker, local fallback)
+    PROVIDER_MAX_RETRIES = int(os.getenv("PROVIDER_MAX_RETRIES", "2"))
+    PROVIDER_RETRY_BASE_DELAY_MS = int(os.getenv("PROVIDER_RETRY_BASE_DELAY_MS", "200"))
+    PROVIDER_RETRY_MAX_DELAY_MS = int(os.getenv("PROVIDER_RETRY_MAX_DELAY_MS", "5000"))  # longer Retry-After is not retried
+    PROVIDER_RETRY_BUDGET_RATIO = float(os.getenv("PROVIDER_RETRY_BUDGET_RATIO", "0.2"))  # retries per call
+    PROVIDER_RETRY_BUDGET_MIN = int(os.getenv("PROVIDER_RETRY_BUDGET_MIN", "10"))  # retries always allowed per window
+    PROVIDER_RETRY_BUDGET_WINDOW = float(os.getenv("PROVIDER_RETRY_BUDGET_WINDOW", "10"))  # seconds
+    BREAKER_FAILURE_RATIO = float(os.getenv("BREAKER_FAILURE_RATIO", "0.5"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    BREAKER_WINDOW_CALLS = int(os.getenv("BREAKER_WINDOW_CALLS", "20"))  # most recent outcomes considered
+    BREAKER_WINDOW = float(os.getenv("BREAKER_WINDOW", "30"))  # seconds of outcomes considered
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+    PROVIDER_LOCAL_FALLBACK = os.getenv("PROVIDER_LOCAL_FALLBACK", "true").lower() == "true"
+    
+    # Context Budgeting (offline token counts before provider calls)
+    CONTEXT_OVERFLOW = os.getenv("CONTEXT_OVERFLOW", "reject")  # "reject" or "trim" oversize requests
+    MIN_COMPLETION_TOKENS = int(os.getenv("MIN_COMPLETION_TOKENS", "64"))  # completion budget kept when trimming
+    
+    # Summarization (map-reduce over chunks for long documents)
+    SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))  # per chunk for hosted models
+    SUMMARY_LOCAL_CHUNK_TOKENS = int(os.getenv("SUMMARY_LOCAL_CHUNK_TOKENS", "900"))  # bart-large-cnn reads ~1024
+    SUMMARY_CHUNK_SUMMARY_TOKENS = int(os.getenv("SUMMARY_CHUNK_SUMMARY_TOKENS", "200"))
+    SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))  # chunk summaries in flight per document
+    SUMMARY_CACHE_TTL = int(os.getenv("SUMMARY_CACHE_TTL", "86400"))  # seconds chunk summaries are kept
+    
+    # Async Jobs (POST /generate?async=true, run by python -m app.worker)
+    JOB_PRIORITIES = [p.strip() for p in os.getenv("JOB_PRIORITIES", "high,normal,low").split(",") if p.strip()]  # highest first
+    JOB_DEFAULT_PRIORITY = os.getenv("JOB_DEFAULT_PRIORITY", "normal")
+    JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "120"))  # seconds a claimed job is leased
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))  # deliveries before a job whose lease keeps expiring fails
+    JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "86400"))  # seconds finished job status is kept
+    JOB_QUEUE_MAX_DEPTH = int(os.getenv("JOB_QUEUE_MAX_DEPTH", "10000"))  # waiting jobs before enqueue returns 503; 0 = unbounded
+    JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "8"))  # jobs run at once per worker process
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1"))  # idle wait; keep below REDIS_SOCKET_TIMEOUT
+    JOB_SHUTDOWN_GRACE = float(os.getenv("JOB_SHUTDOWN_GRACE", "25"))  # seconds to finish running jobs on SIGTERM
+    
+    # Hedged Requests (backup model when the primary's first token is late)
+    HEDGING_ENABLED = os.getenv("HEDGING_ENABLED", "false").lower() == "true"
+    HEDGE_DEADLINES_MS = {
+        name.strip(): float(value)
+        for name, value in (item.split(":") for item in os.getenv(
+            "HEDGE_DEADLINES_MS", "summary:3000,code:4000,translation:2500,default:2000"
+        ).split(",") if item.strip())
+    }
+    HEDGE_BACKUP_MODELS = {
+        primary.strip(): backup.strip()
+        for primary, backup in (item.split(":", 1) for item in os.getenv(
+            "HEDGE_BACKUP_MODELS",
+            "gpt-3.5-turbo:claude-3-sonnet-20240229,gpt-4:claude-3-opus-20240229,gpt-4-turbo-preview:claude-3-opus-20240229"
+        ).split(",") if item.strip())
+    }
+    
+    # Local Inference
+    INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))  # worker processes per API process
+    INFERENCE_MAX_PENDING = int(os.getenv("INFERENCE_MAX_PENDING", "16"))  # queued + running requests
+    INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", "120"))  # seconds per request
+    # Loaded weights per worker; models larger than this on their own are refused. At int8 gpt2 needs
+    # ~240 MiB and fits a 512Mi pod; bart-large-cnn needs ~775 MiB (int8) or ~1.5 GiB (fp32)
+    MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "384"))
+    # int8 (dynamic quantization), fp32 (twice the memory) or onnx (int8 ONNX Runtime, needs optimum[onnxruntime])
+    INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "int8")
+    INFERENCE_INTRA_OP_THREADS = int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0"))  # per worker; 0 = CPU limit / workers
+    INFERENCE_INTER_OP_THREADS = int(os.getenv("INFERENCE_INTER_OP_THREADS", "1"))
+    INFERENCE_ONNX_CACHE_DIR = os.getenv("INFERENCE_ONNX_CACHE_DIR", "/tmp/onnx-models")  # exported int8 models
+    # Local models to load in the background after startup, e.g. "text_generator,summarizer"
+    WARMUP_MODELS = [name.strip() for name in os.getenv("WARMUP_MODELS", "").split(",") if name.strip()]
+    MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "true").lower() == "true"
+    MICROBATCH_WINDOW_MS = float(os.getenv("MICROBATCH_WINDOW_MS", "10"))  # max wait to fill a batch
+    MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", "8"))  # max requests per batch
     
     # Caching
     REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+    REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))  # per worker process
+    REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+    REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "2"))
     CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))  # 1 hour
+    CACHE_WRITE_FORMAT = os.getenv("CACHE_WRITE_FORMAT", "binary")  # "json" = legacy format during rollout
+    CACHE_COMPRESSION = os.getenv("CACHE_COMPRESSION", "zstd")  # zstd, zlib or none
+    CACHE_COMPRESS_THRESHOLD_BYTES = int(os.getenv("CACHE_COMPRESS_THRESHOLD_BYTES", "1024"))
+    LOCAL_CACHE_ENABLED = os.getenv("LOCAL_CACHE_ENABLED", "true").lower() == "true"
+    LOCAL_CACHE_MAX_MB = int(os.getenv("LOCAL_CACHE_MAX_MB", "64"))  # per worker process
+    CACHE_INVALIDATION_CHANNEL = os.getenv("CACHE_INVALIDATION_CHANNEL", "generation-cache-invalidate")
+    NEAR_DUPLICATE_ENABLED = os.getenv("NEAR_DUPLICATE_ENABLED", "false").lower() == "true"
+    # Minimum SimHash similarity per content type, "default" for other low-temperature types
+    NEAR_DUPLICATE_THRESHOLDS = {
+        name.strip(): float(value)
+        for name, value in (item.split(":") for item in os.getenv(
+            "NEAR_DUPLICATE_THRESHOLDS", "summary:0.95,translation:0.98,default:0.97"
+        ).split(",") if item.strip())
+    }
+    NEAR_DUPLICATE_MAX_TEMPERATURE = float(os.getenv("NEAR_DUPLICATE_MAX_TEMPERATURE", "0.3"))
+    SINGLE_FLIGHT_LOCK_TTL_MS = int(os.getenv("SINGLE_FLIGHT_LOCK_TTL_MS", "60000"))  # cross-pod leader lock
+    SINGLE_FLIGHT_WAIT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_WAIT_TIMEOUT", "60"))  # seconds followers wait
+    SINGLE_FLIGHT_POLL_INTERVAL_MS = int(os.getenv("SINGLE_FLIGHT_POLL_INTERVAL_MS", "100"))
+    
+    # Batch Generation
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))  # in-flight items per batch
+    BATCH_COMMIT_SIZE = int(os.getenv("BATCH_COMMIT_SIZE", "10"))  # streamed batches: rows per commit
+    BATCH_COMMIT_WAIT_MS = float(os.getenv("BATCH_COMMIT_WAIT_MS", "200"))  # max wait to fill a commit group
     
     # Email Configuration
     SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
@@ -0,0 +1,144 @@
+# backend/app/cpu_inference.py
+import logging
+import os
+import platform
+import shutil
+from typing import Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Local model backends: fp32 PyTorch, dynamic int8 PyTorch, or int8 ONNX Runtime
+BACKENDS = ("fp32", "int8", "onnx")
+
+# optimum model class per pipeline task, for the ONNX Runtime backend
+ORT_MODEL_CLASSES = {
+    "text-generation": "ORTModelForCausalLM",
+    "summarization": "ORTModelForSeq2SeqLM",
+}
+
+def cpu_limit() -> float:
+    """CPUs this container may use: its cgroup CPU quota, else the CPUs it may run on"""
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as cpu_max:
+            quota, period = cpu_max.read().split()
+        if quota != "max":
+            return int(quota) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as q, open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as p:
+                quota, period = int(q.read()), int(p.read())
+            if quota > 0:
+                return quota / period
+        except (OSError, ValueError):
+            pass
+    return float(len(os.sched_getaffinity(0)))
+
+def thread_settings(workers: int, intra_op: int = 0, inter_op: int = 0) -> Tuple[int, int]:
+    """(intra-op, inter-op) threads per inference worker; 0 derives them from the CPU limit.
+
+    PyTorch and ONNX Runtime default to one thread per host core. Under a pod
+    CPU limit of a core or two that oversubscribes the quota and the pod is
+    throttled for most of every period, so each worker gets its share of the
+    limit instead. Generation runs one op after another, so one inter-op
+    thread is enough.
+    """
+    if intra_op <= 0:
+        intra_op = max(1, int(cpu_limit() // max(1, workers)))
+    if inter_op <= 0:
+        inter_op = 1
+    return intra_op, inter_op
+
+def configure_threads(intra_op: int, inter_op: int):
+    """Apply thread counts in this process; call before torch runs anything"""
+    for name in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[name] = str(intra_op)
+    import torch
+    torch.set_num_threads(intra_op)
+    torch.set_num_interop_threads(inter_op)
+
+def _conv1d_to_linear(model):
+    """Swap GPT-2's Conv1D layers (transposed linear) for nn.Linear so dynamic quantization covers them"""
+    import torch
+    from transformers.pytorch_utils import Conv1D
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, Conv1D):
+                linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+                linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+                linear.bias = child.bias
+                setattr(parent, name, linear)
+
+def quantize_int8(model):
+    """Dynamic int8 quantization in place: linear weights stored as int8, activations quantized per call"""
+    import torch
+    if "fbgemm" not in torch.backends.quantized.supported_engines:
+        # ARM nodes
+        torch.backends.quantized.engine = "qnnpack"
+    _conv1d_to_linear(model)
+    # A head tied to the input embedding stays fp32; quantizing it would keep both copies
+    tied = getattr(model.config, "tie_word_embeddings", False)
+    targets = {
+        name for name, module in model.named_modules()
+        if isinstance(module, torch.nn.Linear) and not (tied and name.endswith("lm_head"))
+    }
+    torch.ao.quantization.quantize_dynamic(model, targets, dtype=torch.qint8, inplace=True)
+    return model
+
+def _quantization_config():
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    if platform.machine() in ("aarch64", "arm64"):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            vnni = "avx512_vnni" in cpuinfo.read()
+    except OSError:
+        vnni = False
+    if vnni:
+        return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+
+def _export_int8(model_class, model: str, target_dir: str):
+    """Export a model to ONNX and quantize every graph to int8 under target_dir"""
+    from optimum.onnxruntime import ORTQuantizer
+    staging = f"{target_dir}.{os.getpid()}"
+    export_dir = os.path.join(staging, "fp32")
+    quantized_dir = os.path.join(staging, "int8")
+    model_class.from_pretrained(model, export=True).save_pretrained(export_dir)
+    config = _quantization_config()
+    for file_name in sorted(f for f in os.listdir(export_dir) if f.endswith(".onnx")):
+        # No suffix: the quantized graphs keep the names from_pretrained looks for
+        ORTQuantizer.from_pretrained(export_dir, file_name=file_name).quantize(config, save_dir=quantized_dir, file_suffix="")
+    for file_name in os.listdir(export_dir):
+        if not file_name.endswith(".onnx") and not os.path.exists(os.path.join(quantized_dir, file_name)):
+            shutil.copy(os.path.join(export_dir, file_name), quantized_dir)
+    try:
+        os.makedirs(os.path.dirname(target_dir), exist_ok=True)
+        os.rename(quantized_dir, target_dir)
+    except OSError:
+        # Another worker finished the same export first
+        if not os.path.isdir(target_dir):
+            raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+def load_onnx_pipeline(task: str, model: str, threads: Tuple[int, int], cache_dir: str) -> Any:
+    """Pipeline backed by an int8 ONNX Runtime model, exported and quantized once into cache_dir.
+
+    Raises ImportError when optimum[onnxruntime] is not installed.
+    """
+    import onnxruntime
+    import optimum.onnxruntime
+    from transformers import AutoTokenizer, pipeline
+    if task not in ORT_MODEL_CLASSES:
+        raise ValueError(f"No ONNX Runtime model class for task {task}")
+    model_class = getattr(optimum.onnxruntime, ORT_MODEL_CLASSES[task])
+    target_dir = os.path.join(cache_dir, model.replace("/", "--"), "int8")
+    if not os.path.isdir(target_dir):
+        logger.info(f"Exporting {model} to int8 ONNX in {target_dir}")
+        _export_int8(model_class, model, target_dir)
+    options = onnxruntime.SessionOptions()
+    options.intra_op_num_threads, options.inter_op_num_threads = threads
+    ort_model = model_class.from_pretrained(target_dir, session_options=options)
+    return pipeline(task, model=ort_model, tokenizer=AutoTokenizer.from_pretrained(model))
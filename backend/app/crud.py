@@ -0,0 +1,96 @@
+# backend/app/crud.py
+from sqlalchemy import insert, update, case, func
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Any, List, Tuple
+from . import models, schemas
+
+def content_values(
+    user_id: int,
+    request: schemas.GenerateRequest,
+    generated_content: str,
+    model_used: str,
+    metadata: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Column values for a generated Content row"""
+    # Create title from prompt
+    title = request.prompt[:50] + "..." if len(request.prompt) > 50 else request.prompt
+    return {
+        "title": title,
+        "content_type": request.content_type,
+        "input_text": request.prompt,
+        "generated_content": generated_content,
+        "model_used": model_used,
+        "status": models.ContentStatus.GENERATED,
+        "tags": request.tags,
+        "content_metadata": metadata,
+        "generation_time": metadata.get("generation_time"),
+        "tokens_used": metadata.get("tokens_used"),
+        "temperature": request.temperature,
+        "language": request.language,
+        "style": request.style,
+        "user_id": user_id
+    }
+
+def record_generations(db: Session, user_id: int, generations: int, tokens_used: int, generation_time: float):
+    """Add generations to the user's analytics in one UPDATE (no read, no commit)"""
+    analytics = models.UserAnalytics
+    db.execute(
+        update(analytics)
+        .where(analytics.user_id == user_id)
+        .values(
+            total_generations=func.coalesce(analytics.total_generations, 0) + generations,
+            total_tokens_used=func.coalesce(analytics.total_tokens_used, 0) + tokens_used,
+            last_generation_date=datetime.utcnow(),
+            # Running average as before: halfway between the old average and the new time
+            average_generation_time=case(
+                (func.coalesce(analytics.average_generation_time, 0) == 0, generation_time),
+                else_=(analytics.average_generation_time + generation_time) / 2
+            )
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def save_generated_content(
+    db: Session,
+    user: models.User,
+    request: schemas.GenerateRequest,
+    generated_content: str,
+    model_used: str,
+    metadata: Dict[str, Any]
+) -> models.Content:
+    """Persist a finished generation and update the user's analytics in one transaction.
+
+    The row comes back from INSERT ... RETURNING and is detached before the
+    commit, so it is returned as written without a reload.
+    """
+    db_content = db.scalars(
+        insert(models.Content).returning(models.Content),
+        [content_values(user.id, request, generated_content, model_used, {**request.metadata, **metadata})]
+    ).one()
+    record_generations(db, user.id, 1, metadata.get("tokens_used") or 0, metadata.get("generation_time") or 0)
+    db.expunge(db_content)
+    db.commit()
+    return db_content
+
+def save_batch_contents(
+    db: Session,
+    user_id: int,
+    items: List[Tuple[schemas.GenerateRequest, Dict[str, Any]]]
+) -> List[int]:
+    """Bulk-insert successful batch results ((request, result) pairs) in one transaction; returns their ids in order"""
+    if not items:
+        return []
+    rows = [
+        content_values(user_id, request, result["content"], result["model"], result["metadata"])
+        for request, result in items
+    ]
+    # One multi-row INSERT ... RETURNING per few hundred rows instead of a statement per row
+    content_ids = list(db.scalars(
+        insert(models.Content).returning(models.Content.id, sort_by_parameter_order=True),
+        rows
+    ))
+    times = [row["generation_time"] or 0 for row in rows]
+    record_generations(db, user_id, len(rows), sum(row["tokens_used"] or 0 for row in rows), sum(times) / len(times))
+    db.commit()
+    return content_ids
@@ -0,0 +1,111 @@
+# backend/app/hedging.py
+import asyncio
+import logging
+from typing import Optional, Dict, Any, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# call(model, on_delta) runs one streaming completion, passing each text delta to on_delta
+StreamCall = Callable[[str, Callable[[str], None]], Awaitable[str]]
+
+class Hedger:
+    """Races a backup model against a primary that is slow to produce its first token.
+
+    The primary runs alone until the content type's deadline. If it has not
+    streamed a token by then, the backup model is started too; whichever
+    produces a token first wins and the other request is cancelled. A
+    primary that fails before the deadline is not hedged (its error is
+    raised for the retry/fallback path to handle).
+    """
+
+    def __init__(self, deadlines_ms: Dict[str, float], backups: Dict[str, str], enabled: bool = False):
+        self.deadlines_ms = deadlines_ms
+        self.backups = backups
+        self.enabled = enabled
+        self.calls = 0
+        self.hedged = 0
+        self.backup_wins = 0
+        self.cancelled = 0
+
+    def deadline_for(self, content_type: str) -> Optional[float]:
+        """First-token deadline in seconds for a content type, or None when hedging is off"""
+        if not self.enabled:
+            return None
+        deadline_ms = self.deadlines_ms.get(content_type, self.deadlines_ms.get("default"))
+        return deadline_ms / 1000 if deadline_ms is not None else None
+
+    def backup_for(self, model: str) -> Optional[str]:
+        return self.backups.get(model)
+
+    async def race(
+        self,
+        primary: str,
+        backup: str,
+        deadline: float,
+        call: StreamCall,
+        sink: Optional[Callable[[str], None]] = None
+    ) -> tuple[str, str, bool]:
+        """Run the hedged completion; returns (text, model that answered, whether a backup was sent)"""
+        self.calls += 1
+        winner: Optional[str] = None
+        first_token = asyncio.Event()
+
+        def relay(label: str) -> Callable[[str], None]:
+            def on_delta(delta: str):
+                nonlocal winner
+                if winner is None:
+                    winner = label
+                    first_token.set()
+                if winner == label and sink is not None:
+                    sink(delta)
+            return on_delta
+
+        tasks = {"primary": asyncio.create_task(call(primary, relay("primary")))}
+        waiter = asyncio.create_task(first_token.wait())
+        try:
+            done, _ = await asyncio.wait({tasks["primary"], waiter}, timeout=deadline, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                self.hedged += 1
+                logger.info(f"No first token from {primary} within {deadline:.2f}s, hedging with {backup}")
+                tasks["backup"] = asyncio.create_task(call(backup, relay("backup")))
+
+            # Wait until one request streams a token, or finishes without streaming any
+            pending = set(tasks.values())
+            error: Optional[BaseException] = None
+            while winner is None and pending:
+                done, pending = await asyncio.wait(pending | {waiter}, return_when=asyncio.FIRST_COMPLETED)
+                pending.discard(waiter)
+                for label, task in tasks.items():
+                    if task in done and winner is None:
+                        if task.exception() is None:
+                            winner = label
+                        else:
+                            error = task.exception()
+            if winner is None:
+                raise error
+
+            for label, task in tasks.items():
+                if label != winner and not task.done():
+                    task.cancel()
+                    self.cancelled += 1
+            if winner == "backup":
+                self.backup_wins += 1
+            return await tasks[winner], primary if winner == "primary" else backup, "backup" in tasks
+        finally:
+            waiter.cancel()
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # mark a losing failure as handled
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedge rate and outcomes for this worker"""
+        return {
+            "enabled": self.enabled,
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "backup_wins": self.backup_wins,
+            "cancelled": self.cancelled
+        }
@@ -0,0 +1,257 @@
+# backend/app/inference.py
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from typing import Optional, Dict, List, Any, Callable, Tuple
+from .config import settings
+from .model_registry import ModelRegistry, ModelTooLarge, estimate_model_bytes, load_pipeline
+from .cpu_inference import configure_threads, thread_settings
+
+logger = logging.getLogger(__name__)
+
+# Local pipelines served by the worker processes: name -> (task, model)
+LOCAL_PIPELINES: Dict[str, Tuple[str, str]] = {
+    "summarizer": ("summarization", "facebook/bart-large-cnn"),
+    "code_generator": ("text-generation", "Salesforce/codegen-350M-mono"),
+    "text_generator": ("text-generation", "gpt2"),
+}
+
+# Parameter counts, to size each model against the memory budget before its first load
+LOCAL_PIPELINE_PARAMS: Dict[str, int] = {
+    "summarizer": 406_000_000,
+    "code_generator": 357_000_000,
+    "text_generator": 124_000_000,
+}
+
+def size_hints(backend: str) -> Dict[str, int]:
+    """Expected weight bytes per local pipeline on a backend, before any has loaded"""
+    return {name: estimate_model_bytes(params, backend) for name, params in LOCAL_PIPELINE_PARAMS.items()}
+
+class InferenceError(Exception):
+    """Base error for local inference failures"""
+
+class ModelUnavailable(InferenceError):
+    """Raised when a local pipeline failed to load in the worker (or cannot fit its memory budget)"""
+
+class InferenceQueueFull(InferenceError):
+    """Raised when too many local inference requests are already pending"""
+
+class InferenceTimeout(InferenceError):
+    """Raised when a local inference request exceeds its deadline"""
+
+# Worker process state (populated by _init_worker in each pool process)
+_worker_registry: Optional[ModelRegistry] = None
+_worker_cancelled = None
+
+def _init_worker(cancelled, model_stats, budget_bytes: int, backend: str, threads: Tuple[int, int], onnx_cache_dir: str):
+    """Set up the per-process model registry; models load on first use"""
+    global _worker_registry, _worker_cancelled
+    _worker_cancelled = cancelled
+    pid = os.getpid()
+    configure_threads(*threads)
+
+    def publish(stats: Dict[str, Any]):
+        model_stats[pid] = {**stats, "backend": backend, "intra_op_threads": threads[0], "inter_op_threads": threads[1]}
+
+    loader = partial(load_pipeline, backend=backend, threads=threads, onnx_cache_dir=onnx_cache_dir)
+    _worker_registry = ModelRegistry(LOCAL_PIPELINES, budget_bytes, loader=loader, on_change=publish, size_hints=size_hints(backend))
+    publish(_worker_registry.stats())
+
+def _generation_hooks(generator, request_id: str, token_queue) -> Dict[str, Any]:
+    """Build generate() kwargs for cooperative cancellation and token streaming"""
+    from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+    class CancelledCriteria(StoppingCriteria):
+        def __call__(self, input_ids, scores, **kwargs) -> bool:
+            return request_id in _worker_cancelled
+
+    class QueueStreamer(TextStreamer):
+        def on_finalized_text(self, text: str, stream_end: bool = False):
+            if text:
+                token_queue.put(text)
+
+    hooks: Dict[str, Any] = {"stopping_criteria": StoppingCriteriaList([CancelledCriteria()])}
+    if token_queue is not None:
+        hooks["streamer"] = QueueStreamer(generator.tokenizer, skip_special_tokens=True)
+    return hooks
+
+def _run_pipeline(name: str, request_id: str, inputs: Any, kwargs: Dict[str, Any], token_queue=None):
+    """Worker entry point: run one pipeline call"""
+    try:
+        try:
+            generator = _worker_registry.get(name)
+        except ModelTooLarge as e:
+            raise ModelUnavailable(str(e))
+        if generator is None:
+            raise ModelUnavailable(f"Local model {name} not available")
+        if request_id in _worker_cancelled:
+            return None
+        return generator(inputs, **kwargs, **_generation_hooks(generator, request_id, token_queue))
+    finally:
+        if token_queue is not None:
+            token_queue.put(None)
+
+def _warm_models(names: List[str]) -> List[str]:
+    """Worker entry point: load the given models ahead of traffic"""
+    loaded = []
+    for name in names:
+        try:
+            if _worker_registry.get(name) is not None:
+                loaded.append(name)
+        except ModelTooLarge as e:
+            logger.error(f"Not warming {name}: {e}")
+    return loaded
+
+class InferenceExecutor:
+    """Runs local pipelines in a pool of worker processes, off the event loop"""
+
+    def __init__(
+        self,
+        workers: int,
+        max_pending: int,
+        timeout: float,
+        memory_budget_bytes: int,
+        backend: str = "fp32",
+        intra_op_threads: int = 0,
+        inter_op_threads: int = 1,
+        onnx_cache_dir: str = "/tmp/onnx-models"
+    ):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.memory_budget_bytes = memory_budget_bytes
+        self.backend = backend
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.onnx_cache_dir = onnx_cache_dir
+        self.pending = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._cancelled = None
+        self._model_stats = None
+
+    def start(self):
+        """Create the worker pool, or replace it if a worker died (idempotent otherwise)"""
+        if self._pool is not None:
+            if not getattr(self._pool, "_broken", False):
+                return
+            logger.error("Local inference pool is broken (a worker died), starting a new one")
+            self.shutdown()
+        context = multiprocessing.get_context("spawn")
+        threads = thread_settings(self.workers, self.intra_op_threads, self.inter_op_threads)
+        self._manager = context.Manager()
+        self._cancelled = self._manager.dict()
+        self._model_stats = self._manager.dict()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self._cancelled, self._model_stats, self.memory_budget_bytes, self.backend, threads, self.onnx_cache_dir)
+        )
+        logger.info(
+            f"Local inference pool started with {self.workers} worker(s), {self.backend} backend, "
+            f"{threads[0]} intra-op / {threads[1]} inter-op threads each"
+        )
+
+    def shutdown(self):
+        """Stop the worker pool, dropping queued requests"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
+            self._pool = None
+            self._manager = None
+            self._cancelled = None
+            self._model_stats = None
+
+    async def warmup(self, names: List[str]):
+        """Load models in every worker in the background so first requests skip the cold load"""
+        self.start()
+        names = [name for name in names if name in LOCAL_PIPELINES]
+        start = time.perf_counter()
+        try:
+            # One task per worker; each takes long enough that idle workers pick up one apiece
+            loaded = await asyncio.gather(*(
+                asyncio.wrap_future(self._pool.submit(_warm_models, names)) for _ in range(self.workers)
+            ))
+            logger.info(f"Warmed local models {loaded} in {time.perf_counter() - start:.1f}s")
+        except Exception as e:
+            logger.error(f"Local model warmup failed: {e}")
+
+    def health(self) -> str:
+        """Worker pool state for health checks; never starts the pool"""
+        if self._pool is None:
+            # Not started yet: it starts on the first local call or warmup
+            return "healthy"
+        if getattr(self._pool, "_broken", False):
+            return "unhealthy: local inference pool is broken"
+        if self.pending >= self.max_pending:
+            return f"degraded: local inference queue is full ({self.max_pending} pending)"
+        return "healthy"
+
+    def model_stats(self) -> Dict[int, Dict[str, Any]]:
+        """Model registry counters reported by each worker process, keyed by pid"""
+        if self._model_stats is None:
+            return {}
+        return dict(self._model_stats)
+
+    async def run(
+        self,
+        name: str,
+        inputs: Any,
+        timeout: Optional[float] = None,
+        on_token: Optional[Callable[[str], None]] = None,
+        **kwargs
+    ):
+        """Run a pipeline call in the pool, optionally streaming decoded text to on_token"""
+        if self.pending >= self.max_pending:
+            raise InferenceQueueFull(f"Local inference queue is full ({self.max_pending} pending)")
+        self.start()
+
+        request_id = uuid.uuid4().hex
+        token_queue = self._manager.Queue() if on_token else None
+        cancelled = self._cancelled
+
+        async def pump():
+            while (text := await asyncio.to_thread(token_queue.get)) is not None:
+                on_token(text)
+
+        pump_task = None
+        try:
+            self.pending += 1
+            future = self._pool.submit(_run_pipeline, name, request_id, inputs, kwargs, token_queue)
+            future.add_done_callback(lambda _: cancelled.pop(request_id, None))
+            pump_task = asyncio.create_task(pump()) if token_queue is not None else None
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. OOM-killed); the next call starts a new pool
+            raise InferenceError(f"Local inference worker for {name} crashed: {e}")
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Queued requests are dropped; running ones stop at their next generated token
+            if not future.cancel():
+                cancelled[request_id] = True
+            if isinstance(e, asyncio.TimeoutError):
+                raise InferenceTimeout(f"Local inference for {name} timed out")
+            raise
+        finally:
+            self.pending -= 1
+            if pump_task is not None:
+                # Release the pump if the worker never got to run the request
+                token_queue.put(None)
+                await asyncio.gather(pump_task, return_exceptions=True)
+
+inference_executor = InferenceExecutor(
+    settings.INFERENCE_WORKERS,
+    settings.INFERENCE_MAX_PENDING,
+    settings.INFERENCE_TIMEOUT,
+    settings.MODEL_MEMORY_BUDGET_MB * 2**20,
+    settings.INFERENCE_BACKEND,
+    settings.INFERENCE_INTRA_OP_THREADS,
+    settings.INFERENCE_INTER_OP_THREADS,
+    settings.INFERENCE_ONNX_CACHE_DIR
+)
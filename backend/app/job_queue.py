@@ -0,0 +1,493 @@
+# backend/app/job_queue.py
+import asyncio
+import json
+import logging
+import uuid
+from typing import Optional, Dict, List, Any, AsyncIterator, Awaitable, Callable, Set
+from .config import settings
+from .redis_pool import get_redis, pipelined
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+TERMINAL = (SUCCEEDED, FAILED)
+
+# Server time in ms, shared by the scripts below so every pod agrees on ages and leases
+NOW_MS = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+"""
+
+# Check the depth cap and queue the job in one step, so concurrent enqueues
+# cannot all pass the check and overshoot it. Returns false when the queue is full.
+# KEYS: job hash, priority queue, wake-up list, counters, queues by priority.
+# ARGV: max depth (0: unbounded), id, then field/value pairs
+ENQUEUE_SCRIPT = NOW_MS + """
+local max_depth = tonumber(ARGV[1])
+if max_depth > 0 then
+    local depth = 0
+    for i = 5, #KEYS do
+        depth = depth + redis.call('ZCARD', KEYS[i])
+    end
+    if depth >= max_depth then
+        return false
+    end
+end
+redis.call('HSET', KEYS[1], 'enqueued_at', now, unpack(ARGV, 3))
+redis.call('ZADD', KEYS[2], now, ARGV[2])
+redis.call('LPUSH', KEYS[3], 1)
+redis.call('LTRIM', KEYS[3], 0, 99)
+redis.call('HINCRBY', KEYS[4], 'enqueued', 1)
+return now
+"""
+
+# Requeue jobs whose lease ran out (the worker died or stalled), then pop the
+# oldest job of the highest non-empty priority and lease it for the visibility
+# timeout. A redelivered job keeps its original enqueue time, so it goes back
+# to the head of its queue.
+# KEYS: inflight, counters, queues by priority. ARGV: visibility ms, max attempts, result ttl, prefix
+CLAIM_SCRIPT = NOW_MS + """
+local prefix = ARGV[4]
+for _, id in ipairs(redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'LIMIT', 0, 100)) do
+    redis.call('ZREM', KEYS[1], id)
+    local job = prefix .. ':job:' .. id
+    if tonumber(redis.call('HGET', job, 'attempts') or '0') >= tonumber(ARGV[2]) then
+        redis.call('HSET', job, 'status', 'failed', 'finished_at', now,
+            'error', redis.call('HGET', job, 'error') or 'Job exceeded its visibility timeout on every attempt')
+        redis.call('EXPIRE', job, ARGV[3])
+        redis.call('HINCRBY', KEYS[2], 'failed', 1)
+        redis.call('PUBLISH', prefix .. ':events:' .. id, 'failed')
+    elseif redis.call('EXISTS', job) == 1 then
+        local queue = prefix .. ':queue:' .. redis.call('HGET', job, 'priority')
+        redis.call('ZADD', queue, redis.call('HGET', job, 'enqueued_at'), id)
+        redis.call('HSET', job, 'status', 'queued')
+        redis.call('HINCRBY', KEYS[2], 'redelivered', 1)
+        redis.call('PUBLISH', prefix .. ':events:' .. id, 'queued')
+    end
+end
+for i = 3, #KEYS do
+    local popped = redis.call('ZPOPMIN', KEYS[i])
+    if popped[1] then
+        local id = popped[1]
+        local job = prefix .. ':job:' .. id
+        redis.call('HINCRBY', job, 'attempts', 1)
+        redis.call('HSET', job, 'status', 'running', 'started_at', now)
+        redis.call('ZADD', KEYS[1], now + tonumber(ARGV[1]), id)
+        redis.call('PUBLISH', prefix .. ':events:' .. id, 'running')
+        return {id, redis.call('HGETALL', job)}
+    end
+end
+return false
+"""
+
+# Only the worker holding the current lease (same attempt, still in flight) may act on a job
+OWNS_LEASE = """
+if redis.call('HGET', KEYS[2], 'attempts') ~= ARGV[2] or not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+"""
+
+# KEYS: inflight, job hash. ARGV: id, attempt, visibility ms
+EXTEND_SCRIPT = NOW_MS + OWNS_LEASE + """
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+return 1
+"""
+
+# KEYS: inflight, job hash, counters. ARGV: id, attempt, status, result ttl, events channel, then field/value pairs
+FINISH_SCRIPT = NOW_MS + OWNS_LEASE + """
+redis.call('ZREM', KEYS[1], ARGV[1])
+if ARGV[3] == 'succeeded' then
+    redis.call('HDEL', KEYS[2], 'error')
+end
+redis.call('HSET', KEYS[2], 'status', ARGV[3], 'finished_at', now, unpack(ARGV, 6))
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+redis.call('HINCRBY', KEYS[3], ARGV[3], 1)
+redis.call('PUBLISH', ARGV[5], ARGV[3])
+return 1
+"""
+
+# Hand a job back without counting the attempt (worker shutting down).
+# KEYS: inflight, job hash, priority queue. ARGV: id, attempt, events channel
+RELEASE_SCRIPT = OWNS_LEASE + """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('ZADD', KEYS[3], redis.call('HGET', KEYS[2], 'enqueued_at'), ARGV[1])
+redis.call('HINCRBY', KEYS[2], 'attempts', -1)
+redis.call('HSET', KEYS[2], 'status', 'queued')
+redis.call('PUBLISH', ARGV[3], 'queued')
+return 1
+"""
+
+# Give a job back for another attempt after a transient failure: its lease is cut
+# short to the delay, so the claim reaper requeues it then (or fails it with the
+# recorded error once every attempt is used).
+# KEYS: inflight, job hash. ARGV: id, attempt, delay ms, error, events channel
+RETRY_SCRIPT = NOW_MS + OWNS_LEASE + """
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[3]), ARGV[1])
+redis.call('HSET', KEYS[2], 'status', 'queued', 'error', ARGV[4])
+redis.call('PUBLISH', ARGV[5], 'queued')
+return 1
+"""
+
+class JobQueueFull(Exception):
+    """Raised when the queue already holds its maximum number of waiting jobs"""
+
+def _decode_job(job_id: str, fields: Dict[str, str]) -> Dict[str, Any]:
+    """Job hash fields -> job dict (times in epoch ms, payload parsed)"""
+    job: Dict[str, Any] = {"id": job_id, **fields}
+    for name in ("user_id", "attempts", "enqueued_at", "started_at", "finished_at", "content_id"):
+        if job.get(name) is not None:
+            job[name] = int(job[name])
+    job["payload"] = json.loads(job.get("payload", "{}"))
+    return job
+
+class JobQueue:
+    """Priority job queue in Redis with visibility timeouts.
+
+    Each priority is a sorted set of job ids scored by enqueue time; workers
+    always take the oldest job of the highest non-empty priority. A claimed
+    job is leased for the visibility timeout (workers extend the lease while
+    they run it); a lease that runs out puts the job back at the head of its
+    queue, so a crashed worker delays its jobs instead of losing them. Jobs
+    run at least once, up to max_attempts times.
+    """
+
+    def __init__(
+        self,
+        priorities: List[str],
+        visibility_timeout: float,
+        max_attempts: int,
+        result_ttl: int,
+        max_depth: int,
+        redis_client=None,
+        prefix: str = "jobs"
+    ):
+        self._redis = redis_client
+        self.priorities = priorities
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.result_ttl = result_ttl
+        self.max_depth = max_depth
+        self.prefix = prefix
+        self.rejected = 0
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+        self._listener: Optional[asyncio.Task] = None
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _queue_key(self, priority: str) -> str:
+        return f"{self.prefix}:queue:{priority}"
+
+    def _events_channel(self, job_id: str) -> str:
+        return f"{self.prefix}:events:{job_id}"
+
+    async def depth(self) -> int:
+        """Jobs waiting across all priorities"""
+        return sum(await pipelined(
+            lambda pipe: [pipe.zcard(self._queue_key(p)) for p in self.priorities], self.redis
+        ))
+
+    async def enqueue(self, user_id: int, payload: Dict[str, Any], priority: str) -> Dict[str, Any]:
+        """Queue a job; returns the job dict"""
+        if priority not in self.priorities:
+            raise ValueError(f"Unknown job priority {priority!r}; expected one of {', '.join(self.priorities)}")
+
+        job_id = uuid.uuid4().hex
+        fields = {
+            "status": QUEUED,
+            "priority": priority,
+            "user_id": str(user_id),
+            "attempts": "0",
+            "payload": json.dumps(payload)
+        }
+        enqueued_at = await self.redis.eval(
+            ENQUEUE_SCRIPT, 4 + len(self.priorities),
+            self._job_key(job_id), self._queue_key(priority), f"{self.prefix}:notify", f"{self.prefix}:counters",
+            *[self._queue_key(p) for p in self.priorities],
+            self.max_depth, job_id, *[item for pair in fields.items() for item in pair]
+        )
+        if enqueued_at is None:
+            self.rejected += 1
+            raise JobQueueFull(f"Job queue is full ({self.max_depth} waiting)")
+        return _decode_job(job_id, {**fields, "enqueued_at": enqueued_at})
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        fields = await self.redis.hgetall(self._job_key(job_id))
+        if not fields:
+            return None
+        return _decode_job(job_id, {k.decode(): v.decode() for k, v in fields.items()})
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """Lease the next job, or None when every queue is empty"""
+        claimed = await self.redis.eval(
+            CLAIM_SCRIPT, 2 + len(self.priorities),
+            f"{self.prefix}:inflight", f"{self.prefix}:counters", *[self._queue_key(p) for p in self.priorities],
+            int(self.visibility_timeout * 1000), self.max_attempts, self.result_ttl, self.prefix
+        )
+        if not claimed:
+            return None
+        job_id, flat = claimed
+        fields = {flat[i].decode(): flat[i + 1].decode() for i in range(0, len(flat), 2)}
+        return _decode_job(job_id.decode(), fields)
+
+    async def wait_for_work(self, timeout: float):
+        """Block until a job is enqueued somewhere (or timeout)"""
+        await self.redis.blpop(f"{self.prefix}:notify", timeout=timeout)
+
+    async def extend(self, job: Dict[str, Any]) -> bool:
+        """Renew the job's lease; False if it was lost (timed out and redelivered)"""
+        return bool(await self.redis.eval(
+            EXTEND_SCRIPT, 2, f"{self.prefix}:inflight", self._job_key(job["id"]),
+            job["id"], job["attempts"], int(self.visibility_timeout * 1000)
+        ))
+
+    async def _finish(self, job: Dict[str, Any], status: str, fields: Dict[str, Any]) -> bool:
+        return bool(await self.redis.eval(
+            FINISH_SCRIPT, 3, f"{self.prefix}:inflight", self._job_key(job["id"]), f"{self.prefix}:counters",
+            job["id"], job["attempts"], status, self.result_ttl, self._events_channel(job["id"]),
+            *[item for name, value in fields.items() for item in (name, str(value))]
+        ))
+
+    async def complete(self, job: Dict[str, Any], **fields) -> bool:
+        """Mark the job succeeded with result fields; False if the lease was lost"""
+        return await self._finish(job, SUCCEEDED, fields)
+
+    async def fail(self, job: Dict[str, Any], error: str) -> bool:
+        """Mark the job failed; False if the lease was lost"""
+        return await self._finish(job, FAILED, {"error": error})
+
+    async def retry(self, job: Dict[str, Any], error: str, delay: float) -> bool:
+        """Redeliver the job after delay seconds, counting this attempt; False if the lease was lost"""
+        return bool(await self.redis.eval(
+            RETRY_SCRIPT, 2, f"{self.prefix}:inflight", self._job_key(job["id"]),
+            job["id"], job["attempts"], int(delay * 1000), error, self._events_channel(job["id"])
+        ))
+
+    async def release(self, job: Dict[str, Any]) -> bool:
+        """Put an unfinished job back at the head of its queue without counting the attempt"""
+        return bool(await self.redis.eval(
+            RELEASE_SCRIPT, 3, f"{self.prefix}:inflight", self._job_key(job["id"]), self._queue_key(job["priority"]),
+            job["id"], job["attempts"], self._events_channel(job["id"])
+        ))
+
+    async def watch(self, job_id: str, poll_interval: float) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the job now and after every status change until it finishes (or disappears).
+
+        Changes arrive over pub/sub on one shared subscription per process; the
+        job is also re-read every poll_interval in case a message was missed.
+        """
+        changed = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(changed)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+        try:
+            while True:
+                changed.clear()
+                job = await self.get(job_id)
+                yield job
+                if job is None or job["status"] in TERMINAL:
+                    return
+                try:
+                    await asyncio.wait_for(changed.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(changed)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    async def _listen(self):
+        pattern = self._events_channel("*")
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.psubscribe(pattern)
+                async for message in pubsub.listen():
+                    job_id = message["channel"].decode().rpartition(":")[2]
+                    for changed in self._watchers.get(job_id, ()):
+                        changed.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Watchers keep polling until resubscribed
+                logger.warning(f"Job event listener disconnected: {e}")
+            finally:
+                await pubsub.aclose()
+            await asyncio.sleep(1)
+
+    async def stop_listener(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def stats(self) -> Dict[str, Any]:
+        """Depth and oldest-job age per priority, jobs in flight and lifetime counters (all workers)"""
+        def build(pipe):
+            pipe.time()
+            for priority in self.priorities:
+                pipe.zcard(self._queue_key(priority))
+                pipe.zrange(self._queue_key(priority), 0, 0, withscores=True)
+            pipe.zcard(f"{self.prefix}:inflight")
+            pipe.hgetall(f"{self.prefix}:counters")
+        replies = await pipelined(build, self.redis)
+        seconds, micros = replies[0]
+        now_ms = seconds * 1000 + micros // 1000
+        queues = {}
+        for i, priority in enumerate(self.priorities):
+            depth, oldest = replies[1 + 2 * i], replies[2 + 2 * i]
+            queues[priority] = {
+                "depth": depth,
+                "oldest_age_seconds": round((now_ms - oldest[0][1]) / 1000, 3) if oldest else 0.0
+            }
+        counters = {k.decode(): int(v) for k, v in replies[-1].items()}
+        return {
+            "queues": queues,
+            "depth": sum(q["depth"] for q in queues.values()),
+            "inflight": replies[-2],
+            "enqueued": counters.get("enqueued", 0),
+            "succeeded": counters.get(SUCCEEDED, 0),
+            "failed": counters.get(FAILED, 0),
+            "redelivered": counters.get("redelivered", 0),
+            "rejected": self.rejected
+        }
+
+class JobWorker:
+    """Runs queued jobs with up to `concurrency` at a time in this process.
+
+    handler(job) returns the result fields stored on success; an exception
+    fails the job, unless retryable(exception) says it is transient and
+    attempts remain, in which case the job is redelivered after a backoff
+    (the error's retry_after when it has one). Leases are renewed every third of the visibility timeout
+    while a job runs. On stop(), no new jobs are claimed; jobs still running
+    after the grace period are cancelled and released back to the queue.
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        handler: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        concurrency: int,
+        poll_interval: float,
+        retryable: Optional[Callable[[Exception], bool]] = None
+    ):
+        self.queue = queue
+        self.handler = handler
+        self.retryable = retryable
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.processed = 0
+        self.retried = 0
+        self.lost_leases = 0
+        self._running: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self._stopping = asyncio.Event()
+
+    async def run(self):
+        """Claim and run jobs until stop()"""
+        stopping = asyncio.create_task(self._stopping.wait())
+        try:
+            while not self._stopping.is_set():
+                if len(self._running) >= self.concurrency:
+                    await asyncio.wait([stopping, *self._running], return_when=asyncio.FIRST_COMPLETED)
+                    continue
+                try:
+                    job = await self.queue.claim()
+                    if job is None:
+                        await self._idle(stopping)
+                        continue
+                except Exception as e:
+                    logger.warning(f"Job claim failed: {e}")
+                    await asyncio.wait([stopping], timeout=self.poll_interval)
+                    continue
+                task = asyncio.create_task(self._process(job))
+                self._running[task] = job
+                task.add_done_callback(lambda done: self._running.pop(done, None))
+        finally:
+            stopping.cancel()
+
+    async def _idle(self, stopping: asyncio.Task):
+        """Wait for an enqueue notification, the poll interval or stop(), whichever comes first"""
+        waiting = asyncio.create_task(self.queue.wait_for_work(self.poll_interval))
+        await asyncio.wait([stopping, waiting], return_when=asyncio.FIRST_COMPLETED)
+        if not waiting.done():
+            waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        if not waiting.cancelled() and waiting.exception() is not None:
+            raise waiting.exception()
+
+    def stop(self):
+        self._stopping.set()
+
+    async def drain(self, grace: float):
+        """Wait up to grace seconds for running jobs, then release the rest back to the queue"""
+        if self._running:
+            await asyncio.wait(list(self._running), timeout=grace)
+        unfinished = dict(self._running)
+        for task in unfinished:
+            task.cancel()
+        await asyncio.gather(*unfinished, return_exceptions=True)
+        for job in unfinished.values():
+            try:
+                await self.queue.release(job)
+            except Exception as e:
+                logger.warning(f"Could not release job {job['id']}; it is redelivered after its visibility timeout: {e}")
+
+    async def _heartbeat(self, job: Dict[str, Any]):
+        while True:
+            await asyncio.sleep(self.queue.visibility_timeout / 3)
+            try:
+                if not await self.queue.extend(job):
+                    return
+            except Exception as e:
+                logger.warning(f"Lease renewal for job {job['id']} failed: {e}")
+
+    async def _process(self, job: Dict[str, Any]):
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            try:
+                result = await self.handler(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if self.retryable is not None and self.retryable(e) and job["attempts"] < self.queue.max_attempts:
+                    delay = getattr(e, "retry_after", None) or min(2 ** job["attempts"], self.queue.visibility_timeout)
+                    logger.warning(f"Job {job['id']} hit a transient error on attempt {job['attempts']}, retrying in {delay:.1f}s: {e}")
+                    finished = await self.queue.retry(job, error, delay)
+                    self.retried += 1
+                else:
+                    logger.error(f"Job {job['id']} failed on attempt {job['attempts']}: {e}")
+                    finished = await self.queue.fail(job, error)
+            else:
+                finished = await self.queue.complete(job, **result)
+            self.processed += 1
+            if not finished:
+                # Its lease ran out and another worker has (or had) the job
+                self.lost_leases += 1
+                logger.warning(f"Job {job['id']} finished after losing its lease")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Could not record the result of job {job['id']}: {e}")
+        finally:
+            heartbeat.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"running": len(self._running), "processed": self.processed, "retried": self.retried, "lost_leases": self.lost_leases}
+
+job_queue = JobQueue(
+    settings.JOB_PRIORITIES,
+    settings.JOB_VISIBILITY_TIMEOUT,
+    settings.JOB_MAX_ATTEMPTS,
+    settings.JOB_RESULT_TTL,
+    settings.JOB_QUEUE_MAX_DEPTH
+)
@@ -1,9 +1,9 @@
 # backend/app/main.py
-from fastapi import FastAPI, Depends, HTTPException, status, Request, BackgroundTasks, Query
+from fastapi import FastAPI, Depends, HTTPException, status, Request, Response, BackgroundTasks, Query
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, StreamingResponse, JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import desc, func, and_, or_
 from datetime import datetime, timedelta
@@ -12,36 +12,54 @@ import uvicorn
 import logging
 import os
 import json
+import math
 import io
 import zipfile
-from reportlab.lib.pagesizes import letter
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
 import asyncio
+from contextlib import asynccontextmanager
 
-from . import models, schemas, auth, database, ai_service
+from . import models, schemas, auth, database, ai_service, providers, inference, redis_pool, tokenizer, crud
+from .job_queue import job_queue, JobQueueFull
+from .rate_limit import rate_limiter, rate_limit_headers
 from .config import settings
-from .database import engine
 
 # Configure logging
 logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
-# Initialize AI models
-ai_service.init_local_models()
+# Database tables are created by the migration step (python -m app.migrate), not at import
 
 # Create upload directory
 os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Manage process-wide resources for the lifetime of the server"""
+    warmup_task = None
+    # One asyncio Redis pool for the cache, rate limiting and health checks
+    redis_pool.get_redis()
+    # Drop local cache entries when other pods overwrite or invalidate them
+    ai_service.generation_cache.start_listener()
+    if settings.WARMUP_MODELS:
+        # Runs once the server is accepting traffic; loading happens in the worker processes
+        warmup_task = asyncio.create_task(inference.inference_executor.warmup(settings.WARMUP_MODELS))
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    # Release pooled provider connections and local inference workers
+    await providers.close_http_client()
+    inference.inference_executor.shutdown()
+    await ai_service.generation_cache.stop_listener()
+    await job_queue.stop_listener()
+    await redis_pool.close_redis()
+
 app = FastAPI(
     title="IntelliContent API",
     version="1.0.0",
     description="AI-powered content generation platform",
     docs_url="/docs" if settings.DEBUG else None,
-    redoc_url="/redoc" if settings.DEBUG else None
+    redoc_url="/redoc" if settings.DEBUG else None,
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -70,19 +88,13 @@ async def health_check():
     
     try:
         # Check Redis
-        import redis
-        redis_client = redis.from_url(settings.REDIS_URL)
-        redis_client.ping()
+        await redis_pool.get_redis().ping()
         redis_status = "healthy"
     except Exception as e:
         redis_status = f"unhealthy: {str(e)}"
     
-    try:
-        # Check AI service
-        ai_service.init_local_models()
-        ai_status = "healthy"
-    except Exception as e:
-        ai_status = f"unhealthy: {str(e)}"
+    # Report the local inference pool as it is; starting it is left to first use and warmup
+    ai_status = inference.inference_executor.health()
     
     overall_status = "healthy" if all(
         status == "healthy" for status in [db_status, redis_status, ai_status]
@@ -231,6 +243,7 @@ async def reset_password(
 
 @app.post("/token", response_model=schemas.Token)
 async def login(
+    response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
     request: Request = None,
     db: Session = Depends(database.get_db)
@@ -245,11 +258,8 @@ async def login(
         )
     
     # Check rate limiting
-    if not auth.check_rate_limit(db, user.id, "login", 5, 15):  # 5 attempts per 15 minutes
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Too many login attempts"
-        )
+    rate_limit = await auth.check_rate_limit(user.id, "login", 5, 15)  # 5 attempts per 15 minutes
+    response.headers.update(rate_limit_headers(rate_limit))
     
     # Create tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -258,7 +268,8 @@ async def login(
     )
     refresh_token = auth.create_refresh_token(data={"sub": user.username})
     
-    # Create session
+    # Create session (its commit also saves last_login)
+    user.last_login = datetime.utcnow()
     session_token = auth.create_verification_token()
     auth.create_user_session(db, user.id, request, session_token)
     
@@ -360,20 +371,27 @@ async def revoke_session(
     return {"message": "Session revoked successfully"}
 
 # Content generation endpoints
-@app.post("/generate", response_model=schemas.Content)
+def sse(event: str, data: Dict[str, Any]) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.post("/generate", response_model=schemas.Content, responses={202: {"model": schemas.Job}})
 async def generate_content(
     request: schemas.GenerateRequest,
+    response: Response,
     background_tasks: BackgroundTasks,
+    run_async: bool = Query(False, alias="async"),
+    priority: str = Query(settings.JOB_DEFAULT_PRIORITY),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    """Generate AI content with enhanced features"""
+    """Generate AI content with enhanced features; with ?async=true queue it and return the job (202)"""
     # Check rate limiting
-    if not auth.check_rate_limit(db, current_user.id, "generate", 50, 60):  # 50 requests per hour
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded"
-        )
+    rate_limit = await auth.check_rate_limit(current_user.id, "generate", 50, 60)  # 50 requests per hour
+    response.headers.update(rate_limit_headers(rate_limit))
+    
+    if run_async:
+        return await enqueue_generation(request, priority, current_user, rate_limit_headers(rate_limit))
     
     try:
         # Generate content using AI service
@@ -388,67 +406,178 @@ async def generate_content(
             **request.metadata
         )
         
-        # Create title from prompt
-        title = request.prompt[:50] + "..." if len(request.prompt) > 50 else request.prompt
-        
-        # Save to database
-        db_content = models.Content(
-            title=title,
-            content_type=request.content_type,
-            input_text=request.prompt,
-            generated_content=generated_content,
-            model_used=model_used,
-            status=models.ContentStatus.GENERATED,
-            tags=request.tags,
-            metadata={**request.metadata, **metadata},
-            generation_time=metadata.get("generation_time"),
-            tokens_used=metadata.get("tokens_used"),
-            temperature=request.temperature,
-            language=request.language,
-            style=request.style,
-            user_id=current_user.id
-        )
-        db.add(db_content)
-        db.commit()
-        db.refresh(db_content)
-        
-        # Update user analytics
-        analytics = db.query(models.UserAnalytics).filter(
-            models.UserAnalytics.user_id == current_user.id
-        ).first()
-        if analytics:
-            analytics.total_generations += 1
-            analytics.total_tokens_used += metadata.get("tokens_used", 0)
-            analytics.last_generation_date = datetime.utcnow()
-            
-            # Calculate average generation time
-            if analytics.average_generation_time:
-                analytics.average_generation_time = (
-                    analytics.average_generation_time + metadata.get("generation_time", 0)
-                ) / 2
-            else:
-                analytics.average_generation_time = metadata.get("generation_time", 0)
-            
-            db.commit()
-        
-        return db_content
+        return crud.save_generated_content(db, current_user, request, generated_content, model_used, metadata)
         
+    except tokenizer.ContextLengthExceeded as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except providers.ProviderError as e:
+        logger.error(f"Content generation failed: {str(e)}")
+        headers = {"Retry-After": str(math.ceil(e.retry_after))} if e.retry_after else None
+        raise HTTPException(status_code=503 if e.throttled or e.timed_out else 502, detail=str(e), headers=headers)
+    except inference.InferenceError as e:
+        # Local pool full, too slow or restarting after a crash: worth retrying shortly
+        logger.error(f"Content generation failed: {str(e)}")
+        retry_after = "5" if isinstance(e, inference.InferenceQueueFull) else "30"
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": retry_after})
     except Exception as e:
         logger.error(f"Content generation failed: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def enqueue_generation(
+    request: schemas.GenerateRequest,
+    priority: str,
+    user: models.User,
+    headers: Dict[str, str]
+) -> JSONResponse:
+    """Queue a generation for the job workers and answer 202 with the job"""
+    if priority not in settings.JOB_PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {', '.join(settings.JOB_PRIORITIES)}")
+    if priority == settings.JOB_PRIORITIES[0] and user.role != models.UserRole.ADMIN:
+        raise HTTPException(status_code=403, detail=f"{priority} priority is reserved for admins")
+    try:
+        job = await job_queue.enqueue(user.id, request.model_dump(), priority)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=job_status(job).model_dump(mode="json"),
+        headers={"Location": f"/jobs/{job['id']}", **headers}
+    )
+
+def job_status(job: Dict[str, Any], content: Optional[models.Content] = None) -> schemas.Job:
+    """Job dict from the queue -> API schema"""
+    def timestamp(ms: Optional[int]) -> Optional[datetime]:
+        return datetime.utcfromtimestamp(ms / 1000) if ms is not None else None
+    return schemas.Job(
+        id=job["id"],
+        status=job["status"],
+        priority=job["priority"],
+        attempts=job["attempts"],
+        created_at=timestamp(job["enqueued_at"]),
+        started_at=timestamp(job.get("started_at")),
+        finished_at=timestamp(job.get("finished_at")),
+        content_id=job.get("content_id"),
+        error=job.get("error"),
+        content=schemas.Content.model_validate(content) if content is not None else None
+    )
+
+def job_content(db: Session, job: Dict[str, Any]) -> Optional[models.Content]:
+    if job.get("content_id") is None:
+        return None
+    return db.query(models.Content).filter(
+        models.Content.id == job["content_id"],
+        models.Content.user_id == job["user_id"]
+    ).first()
+
+async def get_user_job(job_id: str, user: models.User) -> Dict[str, Any]:
+    job = await job_queue.get(job_id)
+    if job is None or job["user_id"] != user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}", response_model=schemas.Job)
+async def get_job(
+    job_id: str,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Poll an async generation job; includes the content once it succeeded"""
+    job = await get_user_job(job_id, current_user)
+    return job_status(job, job_content(db, job))
+
+@app.get("/jobs/{job_id}/events")
+async def get_job_events(
+    job_id: str,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Follow an async generation job as Server-Sent Events until it finishes"""
+    await get_user_job(job_id, current_user)
+    
+    async def event_stream():
+        last_status = None
+        # Changes are pushed; the job is also re-read (and a keep-alive sent) every 15s
+        async for job in job_queue.watch(job_id, 15):
+            if job is None:
+                yield sse("error", {"detail": "Job expired"})
+                return
+            if job["status"] == last_status:
+                # Keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            last_status = job["status"]
+            if job["status"] == schemas.JobStatus.SUCCEEDED:
+                yield sse("done", job_status(job, job_content(db, job)).model_dump(mode="json"))
+            elif job["status"] == schemas.JobStatus.FAILED:
+                yield sse("failed", job_status(job).model_dump(mode="json"))
+            else:
+                yield sse("status", job_status(job).model_dump(mode="json"))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/generate/stream")
+async def generate_content_stream(
+    request: schemas.GenerateRequest,
+    current_user: models.User = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db)
+):
+    """Stream generated content as Server-Sent Events, then persist it"""
+    # Check rate limiting (shares the /generate budget)
+    rate_limit = await auth.check_rate_limit(current_user.id, "generate", 50, 60)  # 50 requests per hour
+    
+    async def event_stream():
+        # Flush headers and a first event right away so time-to-first-byte is not tied to the model
+        yield sse("start", {"model": request.model, "content_type": request.content_type})
+        try:
+            async for event in ai_service.AIService.generate_content_stream(
+                prompt=request.prompt,
+                content_type=request.content_type,
+                model=request.model,
+                max_tokens=request.max_tokens,
+                temperature=request.temperature,
+                language=request.language,
+                style=request.style,
+                **request.metadata
+            ):
+                if event["event"] == "token":
+                    yield sse("token", {"text": event["text"]})
+                else:
+                    db_content = crud.save_generated_content(
+                        db, current_user, request, event["content"], event["model"], event["metadata"]
+                    )
+                    yield sse("done", schemas.Content.model_validate(db_content).model_dump(mode="json"))
+        except Exception as e:
+            logger.error(f"Streaming generation failed: {str(e)}")
+            yield sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **rate_limit_headers(rate_limit)}
+    )
+
 @app.post("/generate/batch", response_model=List[Dict[str, Any]])
 async def generate_batch_content(
     request: schemas.BatchGenerateRequest,
+    response: Response,
+    stream: bool = Query(False),
     current_user: models.User = Depends(auth.get_current_user),
     db: Session = Depends(database.get_db)
 ):
-    """Generate multiple content pieces in batch"""
+    """Generate multiple content pieces in batch; with ?stream=true send NDJSON lines as items finish"""
     # Check rate limiting
-    if not auth.check_rate_limit(db, current_user.id, "batch_generate", 10, 60):  # 10 batches per hour
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail="Rate limit exceeded"
+    rate_limit = await auth.check_rate_limit(current_user.id, "batch_generate", 10, 60)  # 10 batches per hour
+    response.headers.update(rate_limit_headers(rate_limit))
+    
+    if stream:
+        return StreamingResponse(
+            stream_batch(request, current_user, db),
+            media_type="application/x-ndjson",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", **rate_limit_headers(rate_limit)}
         )
     
     # Convert requests to dict format
@@ -458,32 +587,50 @@ async def generate_batch_content(
     results = await ai_service.AIService.generate_batch_content(requests)
     
     # Save successful generations to database
-    for i, result in enumerate(results):
-        if result["success"]:
-            req = request.requests[i]
-            title = req.prompt[:50] + "..." if len(req.prompt) > 50 else req.prompt
-            
-            db_content = models.Content(
-                title=title,
-                content_type=req.content_type,
-                input_text=req.prompt,
-                generated_content=result["content"],
-                model_used=result["model"],
-                status=models.ContentStatus.GENERATED,
-                tags=req.tags,
-                metadata=result["metadata"],
-                generation_time=result["metadata"].get("generation_time"),
-                tokens_used=result["metadata"].get("tokens_used"),
-                temperature=req.temperature,
-                language=req.language,
-                style=req.style,
-                user_id=current_user.id
-            )
-            db.add(db_content)
-    
-    db.commit()
+    crud.save_batch_contents(db, current_user.id, [
+        (request.requests[i], result) for i, result in enumerate(results) if result["success"]
+    ])
     return results
 
+async def stream_batch(request: schemas.BatchGenerateRequest, user: models.User, db: Session):
+    """NDJSON lines ({"index", "success", "content_id", ...}) in completion order.
+    
+    Finished items are committed in small groups and written out once their
+    rows exist, so a failure part-way keeps what was already sent and only
+    the in-flight items and one group are held in memory.
+    """
+    groups = ai_service.AIService.generate_batch_stream(
+        (req.dict() for req in request.requests),
+        settings.BATCH_COMMIT_SIZE,
+        settings.BATCH_COMMIT_WAIT_MS / 1000
+    )
+    try:
+        async for group in groups:
+            succeeded = [(index, result) for index, result in group if result["success"]]
+            content_ids: Dict[int, int] = {}
+            save_error = None
+            try:
+                ids = crud.save_batch_contents(db, user.id, [(request.requests[index], result) for index, result in succeeded])
+                content_ids = {index: content_id for (index, _), content_id in zip(succeeded, ids)}
+            except Exception as e:
+                db.rollback()
+                save_error = f"Generated but not saved: {e}"
+                logger.error(f"Batch commit failed: {e}")
+        
+            lines = []
+            for index, result in group:
+                if result["success"] and index in content_ids:
+                    line = {"index": index, "content_id": content_ids[index], **result}
+                elif result["success"]:
+                    line = {"index": index, "success": False, "error": save_error, "content": result["content"]}
+                else:
+                    line = {"index": index, "success": False, "error": result["error"]}
+                lines.append(json.dumps(line, default=str) + "\n")
+            yield "".join(lines)
+    finally:
+        # Cancels the items still in flight if the client went away
+        await groups.aclose()
+
 @app.post("/optimize-prompt", response_model=schemas.PromptOptimizationResponse)
 async def optimize_prompt(
     request: schemas.PromptOptimizationRequest,
@@ -568,7 +715,7 @@ async def update_content(
         raise HTTPException(status_code=404, detail="Content not found")
     
     for field, value in content_update.dict(exclude_unset=True).items():
-        setattr(content, field, value)
+        setattr(content, "content_metadata" if field == "metadata" else field, value)
     
     content.updated_at = datetime.utcnow()
     db.commit()
@@ -682,6 +829,11 @@ async def export_content(
 
 async def export_to_pdf(content: models.Content):
     """Export content to PDF"""
+    # reportlab is only needed here, so keep it off the startup path
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+    
     buffer = io.BytesIO()
     doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
@@ -748,7 +900,7 @@ async def export_to_json(content: models.Content):
         "generated_content": content.generated_content,
         "model_used": content.model_used,
         "created_at": content.created_at.isoformat(),
-        "metadata": content.metadata,
+        "metadata": content.content_metadata,
         "tags": content.tags
     }
     
@@ -874,5 +1026,32 @@ async def update_user_role(
     db.commit()
     return {"message": "User role updated successfully"}
 
+@app.get("/admin/models")
+async def get_local_model_stats(
+    admin_user: models.User = Depends(auth.get_admin_user)
+):
+    """Get local model registry load/eviction counters per worker (admin only)"""
+    return {
+        "workers": inference.inference_executor.model_stats(),
+        "pending": inference.inference_executor.pending
+    }
+
+@app.get("/admin/metrics")
+async def get_generation_metrics(
+    admin_user: models.User = Depends(auth.get_admin_user)
+):
+    """Get generation pipeline counters for this worker (admin only)"""
+    return {
+        "cache": ai_service.generation_cache.stats(),
+        "near_duplicate": ai_service.near_duplicates.stats(),
+        "single_flight": ai_service.single_flight.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "provider_limits": ai_service.provider_throttle.stats(),
+        "circuit_breakers": ai_service.circuit_breakers.stats(),
+        "hedging": ai_service.hedger.stats(),
+        "summarization": ai_service.summarizer.stats(),
+        "jobs": await job_queue.stats()
+    }
+
 if __name__ == "__main__":
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=settings.DEBUG)
\ No newline at end of file
@@ -0,0 +1,79 @@
+# backend/app/microbatch.py
+import asyncio
+import logging
+from typing import Any, Dict, List, Set, Tuple
+from .config import settings
+from .inference import InferenceExecutor, inference_executor
+
+logger = logging.getLogger(__name__)
+
+BatchKey = Tuple[str, Tuple[Tuple[str, Any], ...]]
+
+class MicroBatcher:
+    """Coalesces concurrent calls to a local pipeline into one padded batch.
+
+    Requests with identical generation parameters are collected for up to
+    window_ms or until max_size are waiting, then sent to the worker pool as a
+    single list input; each caller gets back its own slice of the output.
+    """
+
+    def __init__(self, executor: InferenceExecutor, window_ms: float, max_size: int):
+        self.executor = executor
+        self.window_ms = window_ms
+        self.max_size = max_size
+        self.batches = 0
+        self.items = 0
+        self._pending: Dict[BatchKey, List[Tuple[Any, asyncio.Future]]] = {}
+        self._timers: Dict[BatchKey, asyncio.TimerHandle] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    async def submit(self, name: str, inputs: Any, **kwargs) -> List[Dict[str, Any]]:
+        """Queue one input for the next batch of this pipeline and wait for its result"""
+        loop = asyncio.get_running_loop()
+        key: BatchKey = (name, tuple(sorted(kwargs.items())))
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((inputs, future))
+
+        if len(batch) >= self.max_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.window_ms / 1000, self._flush, key)
+        return await future
+
+    def _flush(self, key: BatchKey):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        # Skip callers that gave up while waiting for the window to close
+        batch = [(inputs, future) for inputs, future in self._pending.pop(key, []) if not future.done()]
+        if not batch:
+            return
+        task = asyncio.create_task(self._run_batch(key, batch))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, key: BatchKey, batch: List[Tuple[Any, asyncio.Future]]):
+        name, params = key
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.executor.run(
+                name, [inputs for inputs, _ in batch], batch_size=len(batch), **dict(params)
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                # Text generation yields a list per input, summarization a dict
+                future.set_result(result if isinstance(result, list) else [result])
+
+local_batcher = MicroBatcher(
+    inference_executor,
+    settings.MICROBATCH_WINDOW_MS,
+    settings.MICROBATCH_MAX_SIZE
+)
@@ -0,0 +1,20 @@
+# backend/app/migrate.py
+"""Create the database schema. Run once per deploy, before starting the API:
+
+    python -m app.migrate
+"""
+import logging
+from . import models
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+def migrate():
+    """Create any missing tables for the current models"""
+    models.Base.metadata.create_all(bind=engine)
+    logger.info("Database schema is up to date")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
+    migrate()
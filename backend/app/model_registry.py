@@ -0,0 +1,217 @@
+# backend/app/model_registry.py
+import gc
+import logging
+import os
+import resource
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable, Tuple
+from .cpu_inference import quantize_int8, load_onnx_pipeline
+
+logger = logging.getLogger(__name__)
+
+# How long a model that failed to load is reported unavailable before retrying
+LOAD_RETRY_SECONDS = 300
+
+# Weight bytes per parameter by backend; int8 keeps embeddings and norms in fp32
+BYTES_PER_PARAM = {"fp32": 4.0, "int8": 2.0, "onnx": 2.0}
+
+class ModelTooLarge(Exception):
+    """Raised when a model's weights alone exceed the memory budget"""
+
+def process_rss_bytes() -> int:
+    """Current resident set size of this process"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # ru_maxrss is the peak (in KiB on Linux), the best we have without procfs
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def model_bytes(generator) -> int:
+    """Memory held by a pipeline's weights and buffers"""
+    model = getattr(generator, "model", None)
+    save_dir = getattr(model, "model_save_dir", None)
+    if save_dir is not None:
+        # ONNX Runtime sessions hold about the size of their graph files
+        try:
+            return sum(
+                os.path.getsize(os.path.join(save_dir, f)) for f in os.listdir(save_dir) if f.endswith(".onnx")
+            )
+        except OSError:
+            return 0
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    tensors = list(model.parameters()) + list(model.buffers())
+    for module in model.modules():
+        # Dynamically quantized layers keep their int8 weights outside parameters()
+        packed = getattr(module, "_packed_params", None)
+        if packed is not None and hasattr(packed, "_weight_bias"):
+            tensors.extend(t for t in packed._weight_bias() if t is not None)
+    return sum(t.nelement() * t.element_size() for t in tensors)
+
+def estimate_model_bytes(params: int, backend: str = "fp32") -> int:
+    """Weight memory expected for a model of params parameters before loading it"""
+    return int(params * BYTES_PER_PARAM.get(backend, BYTES_PER_PARAM["fp32"]))
+
+def load_pipeline(
+    task: str,
+    model: str,
+    backend: str = "fp32",
+    threads: Tuple[int, int] = (1, 1),
+    onnx_cache_dir: str = "/tmp/onnx-models"
+):
+    """Load a Hugging Face pipeline ready for batched generation.
+
+    backend "int8" quantizes the loaded model's linear layers dynamically;
+    "onnx" serves an int8 ONNX Runtime export (falling back to "int8" when
+    optimum[onnxruntime] is not installed or the task has no ONNX model).
+    """
+    from transformers import pipeline
+    generator = None
+    if backend == "onnx":
+        try:
+            generator = load_onnx_pipeline(task, model, threads, onnx_cache_dir)
+        except (ImportError, ValueError) as e:
+            logger.warning(f"ONNX Runtime backend unavailable for {model}, using int8 PyTorch: {e}")
+            backend = "int8"
+    if generator is None:
+        generator = pipeline(task, model=model)
+        if backend == "int8":
+            quantize_int8(generator.model)
+    if task == "text-generation" and generator.tokenizer.pad_token_id is None:
+        # Decoder-only models need a pad token and left padding to run batched prompts
+        generator.tokenizer.pad_token_id = generator.model.config.eos_token_id
+        generator.tokenizer.padding_side = "left"
+    return generator
+
+class ModelRegistry:
+    """Loads local pipelines on first use and evicts the least recently used
+    ones so their combined weights stay within the memory budget.
+
+    Room is made before a load, from the size recorded at the model's last
+    load or else from size_hints, so peak memory stays within the budget
+    rather than reaching budget + new model.
+    """
+
+    def __init__(
+        self,
+        specs: Dict[str, Tuple[str, str]],
+        budget_bytes: int,
+        loader: Optional[Callable[[str, str], Any]] = None,
+        on_change: Optional[Callable[[Dict[str, Any]], None]] = None,
+        size_hints: Optional[Dict[str, int]] = None
+    ):
+        self.specs = specs
+        self.budget_bytes = budget_bytes
+        self.loader = loader or load_pipeline
+        self.on_change = on_change
+        self.size_hints = size_hints or {}
+        self.loads = 0
+        self.evictions = 0
+        self.hits = 0
+        self.rejected = 0
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._resident: Dict[str, int] = {}
+        self._sizes: Dict[str, int] = {}
+        self._load_seconds: Dict[str, float] = {}
+        self._failed: Dict[str, float] = {}
+
+    def expected_bytes(self, name: str) -> int:
+        """Weight memory a model is expected to take: as last loaded, else the hint"""
+        return self._sizes.get(name) or self.size_hints.get(name, 0)
+
+    def get(self, name: str):
+        """Return a loaded pipeline, loading it (and evicting others first) if needed.
+
+        Returns None when the model is unknown or failed to load recently;
+        raises ModelTooLarge when its weights alone exceed the budget.
+        """
+        if name in self._models:
+            self._models.move_to_end(name)
+            self.hits += 1
+            return self._models[name]
+
+        if name not in self.specs or time.time() - self._failed.get(name, 0) < LOAD_RETRY_SECONDS:
+            return None
+
+        task, model = self.specs[name]
+        self._check_fits(name)
+        self._make_room(self.expected_bytes(name))
+        start = time.perf_counter()
+        try:
+            generator = self.loader(task, model)
+        except Exception as e:
+            logger.error(f"Failed to load local model {model}: {e}")
+            self._failed[name] = time.time()
+            return None
+
+        self._models[name] = generator
+        self._resident[name] = self._sizes[name] = model_bytes(generator)
+        self._load_seconds[name] = time.perf_counter() - start
+        self._failed.pop(name, None)
+        self.loads += 1
+        logger.info(
+            f"Loaded local model {model} in {self._load_seconds[name]:.1f}s "
+            f"({self._resident[name] / 2**20:.0f} MiB)"
+        )
+        if self._resident[name] > self.budget_bytes:
+            # The hint was too low; the recorded size rejects it without loading next time
+            self.evict(name)
+            self._check_fits(name)
+        self._enforce_budget(keep=name)
+        self._publish()
+        return generator
+
+    def evict(self, name: str):
+        """Drop a loaded pipeline and release its memory"""
+        if self._models.pop(name, None) is None:
+            return
+        self._resident.pop(name, None)
+        self.evictions += 1
+        gc.collect()
+        logger.info(f"Evicted local model {self.specs[name][1]}")
+        self._publish()
+
+    def _check_fits(self, name: str):
+        needed = self.expected_bytes(name)
+        if needed > self.budget_bytes:
+            self.rejected += 1
+            raise ModelTooLarge(
+                f"Local model {self.specs[name][1]} needs about {needed / 2**20:.0f} MiB, "
+                f"more than the {self.budget_bytes / 2**20:.0f} MiB model memory budget"
+            )
+
+    def _make_room(self, needed: int):
+        while self._models and sum(self._resident.values()) + needed > self.budget_bytes:
+            self.evict(next(iter(self._models)))
+
+    def _enforce_budget(self, keep: str):
+        while sum(self._resident.values()) > self.budget_bytes and len(self._models) > 1:
+            oldest = next(iter(self._models))
+            if oldest == keep:
+                break
+            self.evict(oldest)
+
+    def stats(self) -> Dict[str, Any]:
+        """Load, eviction and memory counters for this process"""
+        return {
+            "loads": self.loads,
+            "evictions": self.evictions,
+            "hits": self.hits,
+            "rejected": self.rejected,
+            "budget_bytes": self.budget_bytes,
+            "resident_bytes": sum(self._resident.values()),
+            "process_rss_bytes": process_rss_bytes(),
+            "models": {
+                name: {
+                    "resident_bytes": self._resident[name],
+                    "load_seconds": self._load_seconds[name]
+                }
+                for name in self._models
+            }
+        }
+
+    def _publish(self):
+        if self.on_change is not None:
+            self.on_change(self.stats())
@@ -52,7 +52,7 @@ class Content(Base):
     model_used = Column(String)
     status = Column(SQLEnum(ContentStatus), default=ContentStatus.GENERATED)
     tags = Column(JSON, default=list)
-    metadata = Column(JSON, default=dict)
+    content_metadata = Column("metadata", JSON, default=dict)  # "metadata" is reserved on declarative models
     is_public = Column(Boolean, default=False)
     is_shared = Column(Boolean, default=False)
     share_token = Column(String, unique=True, index=True)
@@ -0,0 +1,161 @@
+# backend/app/prompt_match.py
+import hashlib
+import json
+import logging
+import re
+import unicodedata
+from typing import Optional, Dict, List, Any, Tuple
+from .redis_pool import get_redis, pipelined
+
+logger = logging.getLogger(__name__)
+
+# Content types whose prompt text is matched case-sensitively (case carries into the output)
+CASE_SENSITIVE_TYPES = {"code", "translation"}
+
+# Content types whose punctuation and typography carry into the output
+PUNCTUATION_SENSITIVE_TYPES = {"code", "translation"}
+
+# Content types whose output is deterministic enough to reuse for a near-identical prompt
+DETERMINISTIC_TYPES = {"summary", "translation"}
+
+FINGERPRINT_BITS = 64
+# A match within k differing bits shares at least one band when k < bands (pigeonhole)
+FINGERPRINT_BANDS = 8
+BAND_BITS = FINGERPRINT_BITS // FINGERPRINT_BANDS
+
+_TYPOGRAPHY = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", " ": " "
+})
+_WHITESPACE = re.compile(r"\s+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([,.;:!?])")
+_REPEATED_PUNCTUATION = re.compile(r"([,.;:!?])\1+")
+_WORD = re.compile(r"\w+")
+_WORD_OR_PUNCTUATION = re.compile(r"\w+|[^\w\s]")
+
+def canonicalize_prompt(prompt: str, content_type: str) -> str:
+    """Normalize formatting that does not change what is being asked.
+
+    Code keeps its line structure and indentation; other types have whitespace
+    collapsed. Repeated or trailing punctuation and typographic quotes and
+    dashes are normalized, and text is case-folded, unless they carry into
+    the output (code, translation).
+    """
+    if content_type in PUNCTUATION_SENSITIVE_TYPES:
+        text = unicodedata.normalize("NFC", prompt)
+    else:
+        text = unicodedata.normalize("NFKC", prompt).translate(_TYPOGRAPHY)
+    if content_type == "code":
+        return "\n".join(line.rstrip() for line in text.splitlines()).strip("\n")
+
+    text = _WHITESPACE.sub(" ", text).strip()
+    if content_type not in PUNCTUATION_SENSITIVE_TYPES:
+        text = _SPACE_BEFORE_PUNCTUATION.sub(r"\1", text)
+        text = _REPEATED_PUNCTUATION.sub(r"\1", text).rstrip(".!;:, ")
+    if content_type not in CASE_SENSITIVE_TYPES:
+        text = text.casefold()
+    return text
+
+def canonical_params(params: Dict[str, Any]) -> str:
+    """Stable serialization of generation parameters (key order and unset values ignored)"""
+    cleaned = {key: value for key, value in params.items() if value is not None}
+    return json.dumps(cleaned, sort_keys=True, separators=(",", ":"), default=str)
+
+def _hash64(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "big")
+
+def simhash(text: str, exact: bool = False) -> int:
+    """64-bit SimHash over word trigrams (single words for very short texts).
+
+    exact keeps case and counts punctuation marks as words, for content types
+    where they carry into the output.
+    """
+    words = _WORD_OR_PUNCTUATION.findall(text) if exact else _WORD.findall(text.casefold())
+    features = [" ".join(words[i:i + 3]) for i in range(len(words) - 2)] or words
+    weights = [0] * FINGERPRINT_BITS
+    for feature in features:
+        value = _hash64(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def similarity(a: int, b: int) -> float:
+    """Fraction of matching fingerprint bits"""
+    return 1 - bin(a ^ b).count("1") / FINGERPRINT_BITS
+
+def fingerprint_bands(fingerprint: int) -> List[int]:
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (i * BAND_BITS) & mask for i in range(FINGERPRINT_BANDS)]
+
+class NearDuplicateIndex:
+    """SimHash fingerprints of cached prompts, banded into Redis sets for lookup.
+
+    Only prompts with identical content type, model and parameters are compared
+    (the scope); within a scope the closest fingerprint above the content type's
+    similarity threshold wins.
+    """
+
+    def __init__(
+        self,
+        thresholds: Dict[str, float],
+        max_temperature: float,
+        enabled: bool = False,
+        redis_client=None
+    ):
+        self.thresholds = thresholds
+        self.max_temperature = max_temperature
+        self.enabled = enabled
+        self._redis = redis_client
+        self.lookups = 0
+        self.hits = 0
+        self.indexed = 0
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    def threshold_for(self, content_type: str, temperature: float) -> Optional[float]:
+        """Similarity required for a near-duplicate hit, or None when not eligible"""
+        if not self.enabled:
+            return None
+        if content_type not in DETERMINISTIC_TYPES and temperature > self.max_temperature:
+            return None
+        return self.thresholds.get(content_type, self.thresholds.get("default"))
+
+    def _band_keys(self, scope: str, fingerprint: int) -> List[str]:
+        return [f"neardup:{scope}:{i}:{band:x}" for i, band in enumerate(fingerprint_bands(fingerprint))]
+
+    async def lookup(self, scope: str, fingerprint: int, threshold: float) -> Optional[Tuple[str, float]]:
+        """Return (cache key, similarity) of the closest indexed prompt above threshold"""
+        self.lookups += 1
+        keys = self._band_keys(scope, fingerprint)
+        members = await pipelined(lambda pipe: [pipe.smembers(key) for key in keys], self.redis)
+
+        best: Optional[Tuple[str, float]] = None
+        for member in set().union(*members):
+            indexed, _, cache_key = member.decode().partition(":")
+            score = similarity(fingerprint, int(indexed, 16))
+            if score >= threshold and (best is None or score > best[1]):
+                best = (cache_key, score)
+        return best
+
+    async def add(self, scope: str, fingerprint: int, cache_key: str, ttl: int):
+        """Index a cached prompt; band entries expire with the cache entry"""
+        member = f"{fingerprint:x}:{cache_key}"
+
+        def build(pipe):
+            for key in self._band_keys(scope, fingerprint):
+                pipe.sadd(key, member)
+                pipe.expire(key, ttl)
+        await pipelined(build, self.redis)
+        self.indexed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Near-duplicate lookup counters; hits are requests the exact cache missed"""
+        return {
+            "enabled": self.enabled,
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "indexed": self.indexed
+        }
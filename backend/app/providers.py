@@ -0,0 +1,257 @@
+# backend/app/providers.py
+import httpx
+import json
+import logging
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, List, Any, AsyncIterator
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared HTTP connection pool for all provider calls (created lazily on the running loop)
+_http_client: Optional[httpx.AsyncClient] = None
+
+class ProviderError(Exception):
+    """Raised when a provider call fails or returns an error response"""
+
+    def __init__(
+        self,
+        provider: str,
+        message: str,
+        status_code: Optional[int] = None,
+        retry_after: Optional[float] = None,
+        timed_out: bool = False
+    ):
+        super().__init__(f"{provider} error: {message}")
+        self.provider = provider
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.timed_out = timed_out
+
+    @property
+    def throttled(self) -> bool:
+        """Whether the provider asked us to slow down"""
+        return self.status_code in (429, 503)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def _transport_error(provider: str, error: httpx.HTTPError) -> ProviderError:
+    return ProviderError(
+        provider,
+        f"{type(error).__name__}: {error}",
+        timed_out=isinstance(error, httpx.TimeoutException)
+    )
+
+def _response_error(provider: str, response: httpx.Response, body: str) -> ProviderError:
+    return ProviderError(
+        provider,
+        body[:200],
+        response.status_code,
+        retry_after=parse_retry_after(response.headers.get("retry-after"))
+    )
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide pooled keep-alive HTTP client"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.PROVIDER_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.PROVIDER_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.PROVIDER_KEEPALIVE_EXPIRY
+            ),
+            timeout=httpx.Timeout(
+                settings.PROVIDER_READ_TIMEOUT,
+                connect=settings.PROVIDER_CONNECT_TIMEOUT
+            )
+        )
+    return _http_client
+
+async def close_http_client():
+    """Close the shared HTTP client and release pooled connections"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+class OpenAIProvider:
+    """Async client for OpenAI-compatible chat completion APIs"""
+
+    name = "openai"
+
+    def __init__(self, base_url: str, api_key: Optional[str]):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+
+    def _headers(self) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+
+    async def chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float
+    ) -> str:
+        """Run a chat completion and return the message text"""
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        try:
+            response = await get_http_client().post(
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=self._headers()
+            )
+        except httpx.HTTPError as e:
+            raise _transport_error(self.name, e)
+
+        if response.status_code != 200:
+            raise _response_error(self.name, response, response.text)
+
+        data = response.json()
+        return data["choices"][0]["message"]["content"]
+
+    async def stream_chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float
+    ) -> AsyncIterator[str]:
+        """Run a streaming chat completion and yield text deltas as they arrive"""
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        try:
+            async with get_http_client().stream(
+                "POST",
+                f"{self.base_url}/chat/completions",
+                json=payload,
+                headers=self._headers()
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise _response_error(self.name, response, body.decode(errors="replace"))
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        yield delta
+        except httpx.HTTPError as e:
+            raise _transport_error(self.name, e)
+
+openai_provider = OpenAIProvider(settings.OPENAI_BASE_URL, settings.OPENAI_API_KEY)
+
+class AnthropicProvider:
+    """Async client for the Anthropic Messages API"""
+
+    name = "anthropic"
+    version = "2023-06-01"
+
+    def __init__(self, base_url: str, api_key: Optional[str]):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"anthropic-version": self.version}
+        if self.api_key:
+            headers["x-api-key"] = self.api_key
+        return headers
+
+    def _payload(self, model: str, messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Dict[str, Any]:
+        # The Messages API takes the system prompt separately from the turns
+        system = "\n\n".join(m["content"] for m in messages if m["role"] == "system")
+        payload: Dict[str, Any] = {
+            "model": model,
+            "messages": [m for m in messages if m["role"] != "system"],
+            "max_tokens": max_tokens,
+            "temperature": min(temperature, 1.0)
+        }
+        if system:
+            payload["system"] = system
+        return payload
+
+    async def chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float
+    ) -> str:
+        """Run a message completion and return its text"""
+        try:
+            response = await get_http_client().post(
+                f"{self.base_url}/messages",
+                json=self._payload(model, messages, max_tokens, temperature),
+                headers=self._headers()
+            )
+        except httpx.HTTPError as e:
+            raise _transport_error(self.name, e)
+
+        if response.status_code != 200:
+            raise _response_error(self.name, response, response.text)
+
+        data = response.json()
+        return "".join(block.get("text", "") for block in data["content"] if block.get("type") == "text")
+
+    async def stream_chat_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        temperature: float
+    ) -> AsyncIterator[str]:
+        """Run a streaming message completion and yield text deltas as they arrive"""
+        payload = {**self._payload(model, messages, max_tokens, temperature), "stream": True}
+        try:
+            async with get_http_client().stream(
+                "POST",
+                f"{self.base_url}/messages",
+                json=payload,
+                headers=self._headers()
+            ) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    raise _response_error(self.name, response, body.decode(errors="replace"))
+
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[len("data:"):].strip())
+                    if event.get("type") == "content_block_delta":
+                        delta = event.get("delta", {}).get("text")
+                        if delta:
+                            yield delta
+                    elif event.get("type") == "message_stop":
+                        break
+                    elif event.get("type") == "error":
+                        raise ProviderError(self.name, event.get("error", {}).get("message", "stream error"))
+        except httpx.HTTPError as e:
+            raise _transport_error(self.name, e)
+
+anthropic_provider = AnthropicProvider(settings.ANTHROPIC_BASE_URL, settings.ANTHROPIC_API_KEY)
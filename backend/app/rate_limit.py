@@ -0,0 +1,79 @@
+# backend/app/rate_limit.py
+import calendar
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Tuple
+from . import schemas
+from .redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# GCRA: each request pushes the key's theoretical arrival time (TAT) forward by
+# window/limit; a request is allowed while the TAT stays within one window of now.
+# This admits `limit` requests in a burst and then one every window/limit.
+# Uses the server clock so every pod agrees. Returns {allowed, remaining, reset_ms, retry_after_ms}.
+GCRA_SCRIPT = """
+local window = tonumber(ARGV[1])
+local interval = window / tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local tat = math.max(tonumber(redis.call('GET', KEYS[1]) or now), now)
+local new_tat = tat + interval
+if new_tat - now > window then
+    return {0, 0, math.ceil(tat - now), math.ceil(new_tat - window - now)}
+end
+redis.call('SET', KEYS[1], string.format('%d', new_tat), 'PX', math.ceil(new_tat - now))
+return {1, math.floor((window - (new_tat - now)) / interval), math.ceil(new_tat - now), 0}
+"""
+
+class RedisRateLimiter:
+    """Per-user, per-endpoint limits evaluated by one atomic Redis script"""
+
+    def __init__(self, redis_client=None, prefix: str = "ratelimit"):
+        self._redis = redis_client
+        self.prefix = prefix
+        self.allowed = 0
+        self.rejected = 0
+        self.errors = 0
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    async def hit(self, user_id: int, endpoint: str, limit: int, window_minutes: int) -> Tuple[bool, schemas.RateLimitInfo, int]:
+        """Count one request; returns (allowed, limit info, retry-after seconds)"""
+        window_ms = window_minutes * 60 * 1000
+        try:
+            allowed, remaining, reset_ms, retry_after_ms = await self.redis.eval(
+                GCRA_SCRIPT, 1, f"{self.prefix}:{endpoint}:{user_id}", window_ms, limit
+            )
+        except Exception as e:
+            # Fail open: an unavailable Redis should not take the API down with it
+            self.errors += 1
+            logger.warning(f"Rate limiter unavailable, allowing request: {e}")
+            return True, schemas.RateLimitInfo(limit=limit, remaining=limit, reset_time=datetime.utcnow()), 0
+
+        if allowed:
+            self.allowed += 1
+        else:
+            self.rejected += 1
+        info = schemas.RateLimitInfo(
+            limit=limit,
+            remaining=remaining,
+            reset_time=datetime.utcnow() + timedelta(milliseconds=reset_ms)
+        )
+        return bool(allowed), info, -(-retry_after_ms // 1000)
+
+    def stats(self) -> Dict[str, int]:
+        """Allowed/rejected counters for this worker"""
+        return {"allowed": self.allowed, "rejected": self.rejected, "errors": self.errors}
+
+def rate_limit_headers(info: schemas.RateLimitInfo) -> Dict[str, str]:
+    """X-RateLimit-* response headers for a limit check"""
+    return {
+        "X-RateLimit-Limit": str(info.limit),
+        "X-RateLimit-Remaining": str(info.remaining),
+        "X-RateLimit-Reset": str(calendar.timegm(info.reset_time.utctimetuple()))
+    }
+
+rate_limiter = RedisRateLimiter()
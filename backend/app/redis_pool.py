@@ -0,0 +1,44 @@
+# backend/app/redis_pool.py
+import logging
+from typing import Optional, Any, Callable, List
+import redis.asyncio as redis
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Shared asyncio Redis connection pool for cache, rate limiting and health checks
+_redis_client: Optional[redis.Redis] = None
+
+def get_redis() -> redis.Redis:
+    """Return the process-wide asyncio Redis client"""
+    global _redis_client
+    if _redis_client is None:
+        pool = redis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_connect_timeout=settings.REDIS_CONNECT_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=30
+        )
+        _redis_client = redis.Redis(connection_pool=pool)
+    return _redis_client
+
+async def close_redis():
+    """Close the shared client and disconnect pooled connections"""
+    global _redis_client
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+
+async def pipelined(
+    build: Callable[[Any], None],
+    client: Optional[redis.Redis] = None,
+    transaction: bool = False
+) -> List[Any]:
+    """Queue several commands on one pipeline and send them in a single round-trip.
+
+    build receives the pipeline and adds commands to it; their replies are returned in order.
+    """
+    async with (client or get_redis()).pipeline(transaction=transaction) as pipe:
+        build(pipe)
+        return await pipe.execute()
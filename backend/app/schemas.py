@@ -1,5 +1,5 @@
 # backend/app/schemas.py
-from pydantic import BaseModel, EmailStr, validator
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, validator
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
@@ -88,6 +88,8 @@ class ContentUpdate(BaseModel):
     status: Optional[ContentStatus] = None
 
 class Content(ContentBase):
+    # Read from the ORM's content_metadata attribute, still serialized as "metadata"
+    metadata: Optional[Dict[str, Any]] = Field({}, validation_alias=AliasChoices("content_metadata", "metadata"))
     id: int
     generated_content: str
     model_used: str
@@ -124,6 +126,24 @@ class GenerateRequest(BaseModel):
 class BatchGenerateRequest(BaseModel):
     requests: List[GenerateRequest]
 
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class Job(BaseModel):
+    id: str
+    status: JobStatus
+    priority: str
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    content_id: Optional[int] = None
+    error: Optional[str] = None
+    content: Optional[Content] = None
+
 class ContentTemplateBase(BaseModel):
     name: str
     description: str
@@ -0,0 +1,119 @@
+# backend/app/singleflight.py
+import asyncio
+import logging
+import uuid
+from typing import Optional, Dict, Any, Awaitable, Callable, TypeVar
+from .redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Delete the lock only if we still own it
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+class SingleFlight:
+    """Coalesces identical in-flight work by key.
+
+    Within a worker, callers share one task per key. Across pods, the first
+    caller takes a short-lived Redis lock and the others wait for its result
+    to appear in the cache instead of repeating the work.
+    """
+
+    def __init__(self, lock_ttl_ms: int, wait_timeout: float, poll_interval: float, redis_client=None):
+        self._redis = redis_client
+        self.lock_ttl_ms = lock_ttl_ms
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.leaders = 0
+        self.local_followers = 0
+        self.remote_followers = 0
+        self.remote_fallbacks = 0
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def redis(self):
+        return self._redis or get_redis()
+
+    async def run(
+        self,
+        key: str,
+        produce: Callable[[], Awaitable[T]],
+        read_result: Callable[[], Awaitable[Optional[T]]]
+    ) -> T:
+        """Return produce()'s result, sharing it with concurrent callers of the same key.
+
+        read_result is how followers on other pods pick up the leader's result
+        (normally a cache read); it returns None while there is nothing yet.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            # The shared task outlives any single caller, so one client disconnecting
+            # does not fail everyone else waiting on it
+            task = asyncio.create_task(self._lead_or_wait(key, produce, read_result))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+        else:
+            self.local_followers += 1
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: asyncio.Task):
+        self._inflight.pop(key, None)
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+    async def _lead_or_wait(
+        self,
+        key: str,
+        produce: Callable[[], Awaitable[T]],
+        read_result: Callable[[], Awaitable[Optional[T]]]
+    ) -> T:
+        lock_key = f"singleflight:{key}"
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(lock_key, token, nx=True, px=self.lock_ttl_ms)
+        except Exception as e:
+            logger.warning(f"Single-flight lock unavailable, generating without it: {e}")
+            return await produce()
+
+        if acquired:
+            self.leaders += 1
+            try:
+                return await produce()
+            finally:
+                try:
+                    await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+                except Exception as e:
+                    logger.warning(f"Failed to release single-flight lock {lock_key}: {e}")
+
+        # Another pod is producing this key: wait for its result
+        self.remote_followers += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.wait_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            result = await read_result()
+            if result is not None:
+                return result
+            if not await self.redis.exists(lock_key):
+                # The leader finished without a result (failed or uncached) or died
+                break
+
+        self.remote_fallbacks += 1
+        return await produce()
+
+    def stats(self) -> Dict[str, Any]:
+        """Leader and coalesced-follower counters for this worker"""
+        return {
+            "leaders": self.leaders,
+            "coalesced_local": self.local_followers,
+            "coalesced_remote": self.remote_followers,
+            "remote_fallbacks": self.remote_fallbacks,
+            "in_flight": len(self._inflight)
+        }
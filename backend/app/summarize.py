@@ -0,0 +1,175 @@
+# backend/app/summarize.py
+import asyncio
+import hashlib
+import json
+import logging
+import re
+from typing import Optional, Dict, Any, List, Iterator, Tuple, Callable, Awaitable
+
+logger = logging.getLogger(__name__)
+
+# leaf(text, max_tokens) summarizes one piece of text; count(text) returns its tokens
+Leaf = Callable[[str, int], Awaitable[str]]
+Count = Callable[[str], int]
+
+HEADING = re.compile(r"^(#{1,6}\s|\d+(\.\d+)*\.?\s+[A-Z])")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# Combining rounds before giving up on shrinking the partial summaries further
+MAX_LEVELS = 6
+
+def _pieces(text: str, max_tokens: int, count: Count) -> Iterator[Tuple[str, int, bool]]:
+    """Yield (piece, tokens, starts_section): paragraphs, split into sentences and then words only when too long"""
+    for paragraph in PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        tokens = count(paragraph)
+        starts_section = bool(HEADING.match(paragraph))
+        if tokens <= max_tokens:
+            yield paragraph, tokens, starts_section
+            continue
+        for sentence in SENTENCE_END.split(paragraph):
+            tokens = count(sentence)
+            if tokens <= max_tokens:
+                yield sentence, tokens, starts_section
+            else:
+                # A run-on "sentence" (tables, logs): cut it by words
+                words = sentence.split()
+                step = max(1, len(words) * max_tokens // tokens)
+                for start in range(0, len(words), step):
+                    piece = " ".join(words[start:start + step])
+                    yield piece, count(piece), starts_section
+                    starts_section = False
+            starts_section = False
+
+def _content_defined_cut(piece: str) -> bool:
+    # About one paragraph in four ends a chunk once it is half full, so chunk
+    # boundaries depend on the text itself and an edit only moves the ones near it
+    return hashlib.blake2b(piece.encode(), digest_size=2).digest()[0] % 4 == 0
+
+def split_structural(text: str, chunk_tokens: int, count: Count) -> List[str]:
+    """Split text into chunks of at most chunk_tokens, cutting at headings, then paragraphs, then sentences"""
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for piece, tokens, starts_section in _pieces(text, chunk_tokens, count):
+        if current and (
+            starts_section
+            or current_tokens + tokens > chunk_tokens
+            or (current_tokens >= chunk_tokens // 2 and _content_defined_cut(current[-1]))
+        ):
+            chunks.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+def _group(summaries: List[str], chunk_tokens: int, count: Count) -> List[str]:
+    """Pack consecutive partial summaries into combine inputs of at most chunk_tokens"""
+    groups: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for summary in summaries:
+        tokens = count(summary)
+        if current and current_tokens + tokens > chunk_tokens:
+            groups.append("\n\n".join(current))
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append("\n\n".join(current))
+    return groups
+
+class MapReduceSummarizer:
+    """Summarizes documents longer than one chunk: chunk summaries in parallel, then hierarchical combines.
+
+    Chunk and intermediate summaries are cached by a hash of model, length,
+    sampling parameters and text, so re-summarizing an edited document only pays for the chunks
+    (and combine groups) that changed.
+    """
+
+    def __init__(self, chunk_tokens: int, chunk_summary_tokens: int, concurrency: int, cache_ttl: int, cache=None):
+        self.chunk_tokens = chunk_tokens
+        self.chunk_summary_tokens = chunk_summary_tokens
+        self.concurrency = concurrency
+        self.cache_ttl = cache_ttl
+        self.cache = cache
+        self.documents = 0
+        self.chunks = 0
+        self.cache_hits = 0
+        self.combine_levels = 0
+
+    async def summarize(
+        self,
+        text: str,
+        model: str,
+        max_tokens: int,
+        leaf: Leaf,
+        count: Count,
+        chunk_tokens: Optional[int] = None,
+        chunk_leaf: Optional[Leaf] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Summarize text with leaf(), splitting it first if it does not fit one chunk.
+
+        chunk_leaf (default: leaf) produces the chunk and intermediate summaries;
+        only the final summary comes from leaf itself. params are the sampling
+        parameters (temperature, style, ...) chunk_leaf bakes in; they are part
+        of the chunk cache key so differently sampled summaries never collide.
+        """
+        chunk_tokens = chunk_tokens or self.chunk_tokens
+        chunk_leaf = chunk_leaf or leaf
+        if count(text) <= chunk_tokens:
+            return await leaf(text, max_tokens)
+
+        self.documents += 1
+        semaphore = asyncio.Semaphore(self.concurrency)
+        params_key = json.dumps(params or {}, sort_keys=True)
+        parts = split_structural(text, chunk_tokens, count)
+        self.chunks += len(parts)
+        for _ in range(MAX_LEVELS):
+            summaries = await asyncio.gather(*(
+                self._summarize_cached(part, model, params_key, chunk_leaf, semaphore) for part in parts
+            ))
+            combined = "\n\n".join(summaries)
+            if count(combined) <= chunk_tokens:
+                break
+            self.combine_levels += 1
+            parts = _group(summaries, chunk_tokens, count)
+        else:
+            logger.warning(f"Partial summaries still exceed {chunk_tokens} tokens after {MAX_LEVELS} rounds")
+        return await leaf(combined, max_tokens)
+
+    async def _summarize_cached(self, text: str, model: str, params_key: str, leaf: Leaf, semaphore: asyncio.Semaphore) -> str:
+        digest = hashlib.sha256(f"{model}:{self.chunk_summary_tokens}:{params_key}:{text}".encode()).hexdigest()
+        key = f"summary-chunk:{digest}"
+        if self.cache is not None:
+            try:
+                cached = await self.cache.get(key)
+            except Exception as e:
+                logger.warning(f"Chunk summary cache read failed: {e}")
+                cached = None
+            if cached is not None:
+                self.cache_hits += 1
+                return cached["content"]
+
+        async with semaphore:
+            summary = await leaf(text, self.chunk_summary_tokens)
+        if self.cache is not None:
+            try:
+                await self.cache.set(key, {"content": summary}, self.cache_ttl)
+            except Exception as e:
+                logger.warning(f"Chunk summary cache write failed: {e}")
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "chunk_cache_hits": self.cache_hits,
+            "combine_levels": self.combine_levels
+        }
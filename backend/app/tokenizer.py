@@ -0,0 +1,171 @@
+# backend/app/tokenizer.py
+import logging
+import re
+from functools import lru_cache
+from typing import Dict, List, Iterator, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # counts fall back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Encoding per model family, matched by prefix. Claude has no public offline
+# tokenizer; cl100k_base is a close stand-in. The local models (GPT-2, CodeGen,
+# BART) all use the GPT-2 byte-level BPE vocabulary.
+MODEL_ENCODINGS: List[Tuple[str, str]] = [
+    ("gpt-4", "cl100k_base"),
+    ("gpt-3.5", "cl100k_base"),
+    ("claude", "cl100k_base"),
+    ("local", "gpt2"),
+]
+DEFAULT_ENCODING = "cl100k_base"
+
+# Context window (prompt + completion tokens) per model
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo-preview": 128000,
+    "claude-3-sonnet-20240229": 200000,
+    "claude-3-opus-20240229": 200000,
+    "local-text": 1024,
+    "local-code": 2048,
+    "local-summary": 1024,
+}
+DEFAULT_CONTEXT_WINDOW = 4096
+
+# Chat framing overhead: tokens per message and for priming the reply
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+# Long texts are encoded in slices of about this many characters
+CHUNK_CHARS = 16384
+
+class ContextLengthExceeded(ValueError):
+    """Raised when a prompt plus its completion budget cannot fit the model's context"""
+
+    def __init__(self, model: str, prompt_tokens: int, max_tokens: int, context_window: int):
+        super().__init__(
+            f"{model} context is {context_window} tokens; prompt needs {prompt_tokens} "
+            f"and max_tokens asks for {max_tokens}"
+        )
+        self.model = model
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+        self.context_window = context_window
+
+def _chunks(text: str) -> Iterator[str]:
+    """Slice text before whitespace so no slice boundary falls inside a token"""
+    start = 0
+    while start < len(text):
+        end = start + CHUNK_CHARS
+        if end < len(text):
+            cut = max(text.rfind(" ", start + 1, end), text.rfind("\n", start + 1, end))
+            if cut > start:
+                end = cut
+        yield text[start:end]
+        start = end
+
+class TiktokenEncoding:
+    """Exact counts with a tiktoken BPE encoding"""
+
+    def __init__(self, encoding):
+        self.name = encoding.name
+        self._encoding = encoding
+
+    def count(self, text: str) -> int:
+        return sum(len(self._encoding.encode_ordinary(chunk)) for chunk in _chunks(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        kept = 0
+        position = 0
+        for chunk in _chunks(text):
+            tokens = self._encoding.encode_ordinary(chunk)
+            if kept + len(tokens) > max_tokens:
+                return text[:position] + self._encoding.decode(tokens[:max_tokens - kept])
+            kept += len(tokens)
+            position += len(chunk)
+        return text
+
+class EstimatedEncoding:
+    """Estimate (about four characters per token per word) when tiktoken or its files are missing"""
+
+    name = "estimate"
+    _pattern = re.compile(r"\w+|[^\w\s]")
+
+    def count(self, text: str) -> int:
+        return sum((len(match.group()) + 3) // 4 for match in self._pattern.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        kept = 0
+        for match in self._pattern.finditer(text):
+            kept += (len(match.group()) + 3) // 4
+            if kept > max_tokens:
+                return text[:match.start()]
+        return text
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str):
+    """Load an encoding once per process"""
+    if tiktoken is not None:
+        try:
+            return TiktokenEncoding(tiktoken.get_encoding(name))
+        except Exception as e:
+            # tiktoken downloads encoding files on first use; bake them into the image (TIKTOKEN_CACHE_DIR)
+            logger.warning(f"Tokenizer encoding {name} unavailable, estimating token counts: {e}")
+    else:
+        logger.warning("tiktoken is not installed, estimating token counts")
+    return EstimatedEncoding()
+
+def encoding_for_model(model: str):
+    for prefix, name in MODEL_ENCODINGS:
+        if model.startswith(prefix):
+            return get_encoding(name)
+    return get_encoding(DEFAULT_ENCODING)
+
+def context_window(model: str) -> int:
+    return CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens in text for a model's encoding"""
+    return encoding_for_model(model).count(text)
+
+def count_message_tokens(messages: List[Dict[str, str]], model: str) -> int:
+    """Prompt tokens for a chat request, including the per-message framing"""
+    encoding = encoding_for_model(model)
+    return TOKENS_PER_REPLY + sum(TOKENS_PER_MESSAGE + encoding.count(m["content"]) for m in messages)
+
+def fit_to_context(
+    messages: List[Dict[str, str]],
+    model: str,
+    max_tokens: int,
+    min_completion_tokens: int,
+    trim: bool
+) -> Tuple[List[Dict[str, str]], int, int]:
+    """Make a chat request fit the model's context; returns (messages, max_tokens, prompt_tokens).
+
+    Without trim an oversize request raises ContextLengthExceeded. With trim the
+    completion budget shrinks first (down to min_completion_tokens), then the
+    end of the last message is cut.
+    """
+    window = context_window(model)
+    prompt_tokens = count_message_tokens(messages, model)
+    if prompt_tokens + max_tokens <= window:
+        return messages, max_tokens, prompt_tokens
+    if not trim:
+        raise ContextLengthExceeded(model, prompt_tokens, max_tokens, window)
+
+    completion = min(max_tokens, min_completion_tokens)
+    if prompt_tokens + completion <= window:
+        return messages, window - prompt_tokens, prompt_tokens
+
+    encoding = encoding_for_model(model)
+    last = messages[-1]
+    keep = encoding.count(last["content"]) - (prompt_tokens + completion - window)
+    if keep <= 0:
+        raise ContextLengthExceeded(model, prompt_tokens, max_tokens, window)
+    messages = [*messages[:-1], {**last, "content": encoding.truncate(last["content"], keep)}]
+    prompt_tokens = count_message_tokens(messages, model)
+    logger.info(f"Trimmed prompt for {model} to {prompt_tokens} tokens")
+    return messages, min(max_tokens, window - prompt_tokens), prompt_tokens
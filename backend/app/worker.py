@@ -0,0 +1,84 @@
+# backend/app/worker.py
+"""Async generation worker: runs jobs queued by POST /generate?async=true.
+
+    python -m app.worker
+"""
+import asyncio
+import logging
+import signal
+from typing import Dict, Any
+
+from . import models, schemas, database, ai_service, providers, inference, redis_pool, crud
+from .config import settings
+from .job_queue import job_queue, JobWorker
+from .providers import ProviderError
+
+logging.basicConfig(level=getattr(logging, settings.LOG_LEVEL))
+logger = logging.getLogger(__name__)
+
+class LeaseLost(Exception):
+    """Raised when a job's lease ran out before its result could be saved"""
+
+def _save(job: Dict[str, Any], request: schemas.GenerateRequest, generated_content: str, model_used: str, metadata: Dict[str, Any]) -> int:
+    db = database.SessionLocal()
+    try:
+        user = db.query(models.User).filter(models.User.id == job["user_id"]).first()
+        if user is None:
+            raise ValueError(f"User {job['user_id']} no longer exists")
+        db_content = crud.save_generated_content(
+            db, user, request, generated_content, model_used, {**metadata, "job_id": job["id"]}
+        )
+        return db_content.id
+    finally:
+        db.close()
+
+def is_transient(error: Exception) -> bool:
+    """Provider errors that a later attempt can get past: throttling, timeouts, 5xx, an open circuit"""
+    if not isinstance(error, ProviderError):
+        return False
+    return error.throttled or error.timed_out or error.status_code is None or error.status_code >= 500
+
+async def generate_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Generate and persist one queued request; returns the job's result fields"""
+    request = schemas.GenerateRequest(**job["payload"])
+    generated_content, model_used, metadata = await ai_service.AIService.generate_content(
+        prompt=request.prompt,
+        content_type=request.content_type,
+        model=request.model,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+        language=request.language,
+        style=request.style,
+        **request.metadata
+    )
+    # Save only while we still hold the lease, so a job redelivered after a stall is not stored twice
+    if not await job_queue.extend(job):
+        raise LeaseLost(f"Job {job['id']} was redelivered before it finished")
+    content_id = await asyncio.to_thread(_save, job, request, generated_content, model_used, metadata)
+    return {"content_id": content_id}
+
+async def run():
+    redis_pool.get_redis()
+    ai_service.generation_cache.start_listener()
+    worker = JobWorker(
+        job_queue, generate_job, settings.JOB_WORKER_CONCURRENCY, settings.JOB_POLL_INTERVAL, retryable=is_transient
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+    logger.info(f"Job worker started: {settings.JOB_WORKER_CONCURRENCY} concurrent jobs, priorities {settings.JOB_PRIORITIES}")
+    try:
+        await worker.run()
+        logger.info(f"Job worker stopping; waiting up to {settings.JOB_SHUTDOWN_GRACE:.0f}s for {worker.stats()['running']} running jobs")
+        await worker.drain(settings.JOB_SHUTDOWN_GRACE)
+    finally:
+        await providers.close_http_client()
+        inference.inference_executor.shutdown()
+        await ai_service.generation_cache.stop_listener()
+        await redis_pool.close_redis()
+
+def main():
+    asyncio.run(run())
+
+if __name__ == "__main__":
+    main()
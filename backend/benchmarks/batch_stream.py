@@ -0,0 +1,90 @@
+# backend/benchmarks/batch_stream.py
+"""Buffered vs NDJSON-streamed /generate/batch.
+
+Runs a batch through AIService ("text", caching off) against the stub
+provider the way each mode of the endpoint does: the buffered mode gathers
+every result and serializes the list at the end; the streamed mode consumes
+generate_batch_stream and serializes each commit group into NDJSON lines
+(database writes are not part of this measurement). Reports time to the
+first result, total time and the peak traced memory (tracemalloc) for
+growing batch sizes.
+
+    python -m benchmarks.batch_stream --sizes 100,1000,5000 --latency-ms 20 --token-interval-ms 1
+"""
+import argparse
+import asyncio
+import json
+import time
+import tracemalloc
+import uuid
+
+from app import ai_service
+from app.cache_policy import NO_CACHE
+from app.config import settings
+from app.providers import close_http_client
+from benchmarks.stub_provider import running_stub
+
+
+def requests(size: int):
+    for _ in range(size):
+        yield {"prompt": f"Write a tagline {uuid.uuid4().hex}", "content_type": "text", "max_tokens": 60}
+
+
+async def buffered(size: int):
+    start = time.perf_counter()
+    results = await ai_service.AIService.generate_batch_content(list(requests(size)))
+    body = json.dumps(results, default=str)
+    elapsed = time.perf_counter() - start
+    return elapsed, elapsed, len(body)
+
+
+async def streamed(size: int):
+    start = time.perf_counter()
+    first = None
+    sent = 0
+    groups = ai_service.AIService.generate_batch_stream(
+        requests(size), settings.BATCH_COMMIT_SIZE, settings.BATCH_COMMIT_WAIT_MS / 1000
+    )
+    async for group in groups:
+        chunk = "".join(json.dumps({"index": index, "content_id": 0, **result}, default=str) + "\n" for index, result in group)
+        sent += len(chunk)
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start, sent
+
+
+async def main_async(args):
+    ai_service.cache_policy_for = lambda content_type, temperature: NO_CACHE
+    async with running_stub(
+        args.port, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 2, completion_words=60,
+        token_interval_ms=args.token_interval_ms
+    ) as base_url:
+        ai_service.openai_provider.base_url = base_url
+        try:
+            # Warm the pooled client and the provider throttle
+            await buffered(settings.BATCH_CONCURRENCY)
+            print(f"BATCH_CONCURRENCY={settings.BATCH_CONCURRENCY}, commit groups of {settings.BATCH_COMMIT_SIZE} "
+                  f"or {settings.BATCH_COMMIT_WAIT_MS:.0f} ms\n")
+            print(f"{'items':>6} {'mode':<9} {'first s':>8} {'total s':>8} {'peak MB':>8} {'body MB':>8}")
+            for size in (int(s) for s in args.sizes.split(",")):
+                for name, run in (("buffered", buffered), ("streamed", streamed)):
+                    tracemalloc.start()
+                    first, total, body = await run(size)
+                    _, peak = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    print(f"{size:>6} {name:<9} {first:>8.2f} {total:>8.2f} {peak / 2**20:>8.2f} {body / 2**20:>8.2f}")
+        finally:
+            await close_http_client()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--token-interval-ms", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
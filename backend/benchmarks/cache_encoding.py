@@ -0,0 +1,153 @@
+# backend/benchmarks/cache_encoding.py
+"""Size and encode/decode cost of cached generations: legacy JSON vs the binary codec.
+
+Builds a synthetic cache entry per content type (typical output length, real
+metadata shape) and reports the stored size, compression ratio versus JSON and
+per-entry encode/decode time for each codec.
+
+    python -m benchmarks.cache_encoding --repeat 2000 --threshold 1024
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict
+
+from app.ai_service import ContentType
+from app.cache import CacheCodec
+
+# Rough output length in words per content type
+TYPICAL_WORDS = {
+    ContentType.SOCIAL_MEDIA: 40,
+    ContentType.AD_COPY: 60,
+    ContentType.REVIEW: 150,
+    ContentType.PRODUCT_DESCRIPTION: 150,
+    ContentType.EMAIL: 200,
+    ContentType.SUMMARY: 200,
+    ContentType.FAQ: 400,
+    ContentType.TRANSLATION: 400,
+    ContentType.TEXT: 400,
+    ContentType.CODE: 400,
+    ContentType.MARKETING_COPY: 500,
+    ContentType.PRESENTATION: 600,
+    ContentType.CREATIVE_WRITING: 800,
+    ContentType.NEWS_ARTICLE: 800,
+    ContentType.PROPOSAL: 1000,
+    ContentType.ANALYSIS: 1200,
+    ContentType.TUTORIAL: 1500,
+    ContentType.BLOG_POST: 1500,
+    ContentType.TECHNICAL_DOCUMENTATION: 2000,
+    ContentType.REPORT: 3000,
+}
+
+VOCABULARY = (
+    "the of and to a in is that for it as with was on be by this are from at or an have not "
+    "content platform user data model performance growth market customer team product service "
+    "strategy results analysis quality process value system design support report quarter revenue "
+    "improve deliver increase reduce experience insight approach solution feature release"
+).split()
+
+CODE_LINES = [
+    "def {name}(items, limit=None):",
+    "    \"\"\"Return the first items matching the filter\"\"\"",
+    "    results = []",
+    "    for item in items:",
+    "        if limit is not None and len(results) >= limit:",
+    "            break",
+    "        results.append(transform(item))",
+    "    return results",
+    "",
+]
+
+
+def synthetic_content(content_type: ContentType, words: int, rng: random.Random) -> str:
+    """Generated-looking text of about the given length"""
+    if content_type == ContentType.CODE:
+        lines = []
+        while sum(len(line.split()) for line in lines) < words:
+            lines.extend(line.format(name=f"{rng.choice(VOCABULARY)}_{rng.choice(VOCABULARY)}") for line in CODE_LINES)
+        return "\n".join(lines)
+
+    paragraphs, sentence, paragraph = [], [], []
+    for _ in range(words):
+        sentence.append(rng.choice(VOCABULARY))
+        if len(sentence) >= rng.randint(8, 20):
+            paragraph.append(" ".join(sentence).capitalize() + ".")
+            sentence = []
+            if len(paragraph) >= 5:
+                paragraphs.append(" ".join(paragraph))
+                paragraph = []
+    paragraph.append(" ".join(sentence).capitalize() + ".")
+    paragraphs.append(" ".join(paragraph))
+    return "\n\n".join(paragraphs)
+
+
+def cache_entry(content_type: ContentType, rng: random.Random) -> Dict[str, Any]:
+    """A cache value shaped like the ones AIService stores"""
+    content = synthetic_content(content_type, TYPICAL_WORDS[content_type], rng)
+    return {
+        "content": content,
+        "model": "gpt-3.5-turbo",
+        "metadata": {
+            "generation_id": str(uuid.uuid4()),
+            "generation_time": 2.3,
+            "tokens_used": len(content.split()),
+            "timestamp": datetime.utcnow().isoformat(),
+            "parameters": {
+                "max_tokens": 500,
+                "temperature": 0.7,
+                "language": "en",
+                "style": "professional"
+            }
+        }
+    }
+
+
+def time_per_call(fn: Callable[[], Any], repeat: int) -> float:
+    """Mean microseconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--threshold", type=int, default=1024, help="compression threshold in bytes")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    codecs = {
+        "json": CacheCodec(write_format="json"),
+        "msgpack": CacheCodec("none", args.threshold),
+        "msgpack+zlib": CacheCodec("zlib", args.threshold),
+        "msgpack+zstd": CacheCodec("zstd", args.threshold),
+    }
+
+    print(f"{'content type':<24} {'codec':<13} {'bytes':>8} {'ratio':>6} {'enc us':>8} {'dec us':>8}")
+    totals = {name: 0 for name in codecs}
+    for content_type in sorted(TYPICAL_WORDS, key=TYPICAL_WORDS.get):
+        entry = cache_entry(content_type, rng)
+        json_size = len(json.dumps(entry).encode())
+        for name, codec in codecs.items():
+            raw, _ = codec.encode(entry)
+            assert codec.decode(raw)[0] == entry
+            encode_us = time_per_call(lambda: codec.encode(entry), args.repeat)
+            decode_us = time_per_call(lambda: codec.decode(raw), args.repeat)
+            totals[name] += len(raw)
+            print(
+                f"{content_type.value:<24} {name:<13} {len(raw):>8} {json_size / len(raw):>5.2f}x "
+                f"{encode_us:>8.1f} {decode_us:>8.1f}"
+            )
+
+    print("\nall content types:")
+    for name, total in totals.items():
+        print(f"  {name:<13} {total:>9} bytes  {totals['json'] / total:.2f}x vs json")
+
+
+if __name__ == "__main__":
+    main()
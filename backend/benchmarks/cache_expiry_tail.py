@@ -0,0 +1,97 @@
+# backend/benchmarks/cache_expiry_tail.py
+"""Tail latency of popular prompts as their cache entries expire, with and without
+stale-while-revalidate.
+
+Concurrent clients repeatedly request a few popular prompts through
+AIService.generate_content (stub provider, real Redis) with a short fresh TTL.
+Without a stale window every expiry sends the next callers to the provider;
+with one they get the stale entry while a single background refresh runs.
+
+    python -m benchmarks.cache_expiry_tail --redis-url redis://localhost:6379 --ttl 3 --duration 15
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Dict, List
+
+import httpx
+
+from app import ai_service
+from app.cache_policy import CachePolicy
+from app.config import settings
+from app.providers import close_http_client
+from app.redis_pool import close_redis
+from benchmarks.common import percentile
+from benchmarks.stub_provider import running_stub
+
+
+async def run(prompts: List[str], clients: int, duration: float) -> List[float]:
+    latencies: List[float] = []
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            await ai_service.AIService.generate_content(random.choice(prompts), "blog_post")
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return latencies
+
+
+async def requests_served(base_url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        response = await client.get(base_url.replace("/v1", "/stats"))
+        return response.json()["requests_served"]
+
+
+async def main_async(args):
+    settings.REDIS_URL = args.redis_url
+    results: Dict[str, Dict[str, float]] = {}
+    async with running_stub(args.port, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 10) as base_url:
+        ai_service.openai_provider.base_url = base_url
+        try:
+            for name, stale_ttl in (("expire only", 0), ("stale-while-revalidate", args.ttl * 10)):
+                policy = CachePolicy(True, args.ttl, stale_ttl)
+                ai_service.cache_policy_for = lambda content_type, temperature: policy
+                prompts = [f"popular prompt {i} {uuid.uuid4().hex}" for i in range(args.prompts)]
+                served_before = await requests_served(base_url)
+                latencies = await run(prompts, args.clients, args.duration)
+                served = await requests_served(base_url) - served_before
+                results[name] = {
+                    "requests": len(latencies),
+                    "provider_calls": served,
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p99_ms": percentile(latencies, 99) * 1000,
+                    "max_ms": max(latencies) * 1000
+                }
+                await asyncio.sleep(0.5)  # let background refreshes finish
+        finally:
+            await close_http_client()
+            await close_redis()
+
+    print(f"{'mode':<24} {'requests':>9} {'provider':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, r in results.items():
+        print(
+            f"{name:<24} {r['requests']:>9} {r['provider_calls']:>9} "
+            f"{r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--prompts", type=int, default=5)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--ttl", type=int, default=3, help="fresh TTL in seconds")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--latency-ms", type=float, default=400.0)
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# backend/benchmarks/cpu_inference.py
+"""Local inference on CPU: fp32 vs int8 dynamic quantization vs int8 ONNX Runtime.
+
+Each backend runs in its own spawned process (so RSS is not shared between
+them) with the thread counts the inference workers would use. Greedy decoding
+of --new-tokens tokens per prompt; reports load time, weight size, RSS,
+latency percentiles and tokens/s, plus drift from fp32: the share of
+generated tokens identical to fp32, the mean position of the first differing
+token, and the KL divergence of the first next-token distribution.
+"fp32-default" is fp32 with PyTorch's own thread defaults, for comparison.
+
+    python -m benchmarks.cpu_inference --model text_generator --backends fp32-default,fp32,int8,onnx --workers 1
+"""
+import argparse
+import math
+import multiprocessing
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.cpu_inference import configure_threads, thread_settings
+from app.inference import LOCAL_PIPELINES
+from app.model_registry import load_pipeline, model_bytes, process_rss_bytes
+from benchmarks.common import summarize
+
+MiB = 2**20
+
+PROMPTS = {
+    "text-generation": [
+        "The quarterly report shows that",
+        "def fibonacci(n):",
+        "Five tips for writing a clear product announcement:",
+        "Our new marketing campaign focuses on",
+        "Once upon a time in a small coastal town,",
+        "The main benefits of remote work are",
+        "import numpy as np\n\ndef normalize(x):",
+        "Customer feedback for the latest release was",
+    ],
+    "summarization": [
+        "The city council met on Tuesday to discuss the new transit plan. After three hours of debate, members "
+        "voted to expand bus service to the northern suburbs, add two express routes downtown and fund a pilot "
+        "program for on-demand shuttles. Critics argued the plan does little for cyclists, while supporters said "
+        "it would cut average commute times by fifteen minutes. The changes take effect next spring.",
+        "Researchers released a study of sleep habits in 4,000 adults. Participants who kept a consistent bedtime "
+        "reported better mood and focus than those whose schedules varied by more than an hour, regardless of total "
+        "sleep. The authors caution that the study is observational and call for a controlled trial.",
+    ],
+}
+
+
+def measure(backend: str, threads: Optional[Tuple[int, int]], task: str, model: str, new_tokens: int, runs: int) -> Dict[str, Any]:
+    """Child process: load one backend and time greedy generation over the prompts"""
+    if threads is not None:
+        configure_threads(*threads)
+    import torch
+
+    backend_name = "fp32" if backend == "fp32-default" else backend
+    load_threads = threads or (torch.get_num_threads(), torch.get_num_interop_threads())
+    start = time.perf_counter()
+    generator = load_pipeline(task, model, backend_name, load_threads, settings.INFERENCE_ONNX_CACHE_DIR)
+    load_s = time.perf_counter() - start
+    tokenizer, lm = generator.tokenizer, generator.model
+    seq2seq = task == "summarization"
+    options = {"do_sample": False, "num_beams": 1, "max_new_tokens": new_tokens, "min_new_tokens": new_tokens,
+               "pad_token_id": tokenizer.pad_token_id}
+    prompts = PROMPTS[task]
+
+    with torch.no_grad():
+        lm.generate(**tokenizer(prompts[0], return_tensors="pt"), **options)  # warm-up
+        latencies, sequences, tokens = [], [], 0
+        for run in range(runs):
+            for prompt in prompts:
+                inputs = tokenizer(prompt, return_tensors="pt", truncation=True)
+                t = time.perf_counter()
+                output = lm.generate(**inputs, **options)[0]
+                latencies.append(time.perf_counter() - t)
+                generated = output.tolist() if seq2seq else output[inputs["input_ids"].shape[1]:].tolist()
+                tokens += len(generated)
+                if run == 0:
+                    sequences.append(generated)
+        elapsed = sum(latencies)
+
+        first_logprobs = []
+        for prompt in prompts:
+            inputs = tokenizer(prompt, return_tensors="pt", truncation=True)
+            if seq2seq:
+                inputs["decoder_input_ids"] = torch.tensor([[lm.config.decoder_start_token_id]])
+            logits = lm(**inputs).logits[0, -1].float()
+            first_logprobs.append(torch.log_softmax(logits, dim=-1).tolist())
+
+    return {
+        "threads": load_threads,
+        "load_s": load_s,
+        "weights_bytes": model_bytes(generator),
+        "rss_bytes": process_rss_bytes(),
+        "latency": summarize(latencies, elapsed),
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "sequences": sequences,
+        "first_logprobs": first_logprobs,
+    }
+
+
+def drift(reference: Dict[str, Any], result: Dict[str, Any]) -> Tuple[float, float, float]:
+    """(identical token share, mean first differing position, mean first-token KL) against the fp32 run"""
+    same = total = 0
+    first_diffs: List[int] = []
+    for ref, out in zip(reference["sequences"], result["sequences"]):
+        same += sum(a == b for a, b in zip(ref, out))
+        total += max(len(ref), len(out))
+        first_diffs.append(next((i for i, (a, b) in enumerate(zip(ref, out)) if a != b), min(len(ref), len(out))))
+    kls = [
+        sum(math.exp(p) * (p - q) for p, q in zip(ref, out))
+        for ref, out in zip(reference["first_logprobs"], result["first_logprobs"])
+    ]
+    return same / max(total, 1), sum(first_diffs) / max(len(first_diffs), 1), sum(kls) / max(len(kls), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="text_generator", choices=sorted(LOCAL_PIPELINES))
+    parser.add_argument("--backends", default="fp32-default,fp32,int8,onnx")
+    parser.add_argument("--workers", type=int, default=settings.INFERENCE_WORKERS, help="inference workers sharing the CPU limit")
+    parser.add_argument("--intra-op-threads", type=int, default=settings.INFERENCE_INTRA_OP_THREADS)
+    parser.add_argument("--inter-op-threads", type=int, default=settings.INFERENCE_INTER_OP_THREADS)
+    parser.add_argument("--new-tokens", type=int, default=48)
+    parser.add_argument("--runs", type=int, default=3, help="passes over the prompts")
+    args = parser.parse_args()
+
+    task, model = LOCAL_PIPELINES[args.model]
+    threads = thread_settings(args.workers, args.intra_op_threads, args.inter_op_threads)
+    context = multiprocessing.get_context("spawn")
+    results: Dict[str, Dict[str, Any]] = {}
+    for backend in args.backends.split(","):
+        with context.Pool(1) as pool:
+            try:
+                results[backend] = pool.apply(
+                    measure, (backend, None if backend == "fp32-default" else threads, task, model, args.new_tokens, args.runs)
+                )
+            except Exception as e:
+                print(f"{backend}: failed ({type(e).__name__}: {e})")
+
+    print(f"\n{model} ({task}), {len(PROMPTS[task])} prompts x {args.runs}, {args.new_tokens} new tokens, greedy\n")
+    print(f"{'backend':<13} {'threads':>8} {'load s':>7} {'weights MiB':>12} {'RSS MiB':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'tok/s':>7} {'same tok':>9} {'1st diff':>9} {'KL':>8}")
+    reference = results.get("fp32")
+    for backend, r in results.items():
+        same, first_diff, kl = drift(reference, r) if reference else (float("nan"),) * 3
+        print(
+            f"{backend:<13} {'%d/%d' % tuple(r['threads']):>8} {r['load_s']:>7.1f} {r['weights_bytes'] / MiB:>12.0f} "
+            f"{r['rss_bytes'] / MiB:>8.0f} {r['latency']['p50_ms']:>8.0f} {r['latency']['p95_ms']:>8.0f} "
+            f"{r['tokens_per_s']:>7.1f} {same:>9.1%} {first_diff:>9.1f} {kl:>8.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
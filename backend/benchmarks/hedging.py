@@ -0,0 +1,108 @@
+# backend/benchmarks/hedging.py
+"""Tail latency with and without hedged provider requests.
+
+Concurrent clients call AIService.generate_content ("text", caching off)
+against the stub provider, which stalls a fraction of requests before their
+first token. With hedging on, a request that has no first token by
+--deadline-ms is raced against the backup model (served by the stub's
+Anthropic route); the first to stream wins and the other is cancelled.
+Reports latency percentiles, hedge rate, backup wins and the extra provider
+requests the hedges cost.
+
+    python -m benchmarks.hedging --requests 400 --stall-rate 0.05 --stall-ms 3000 --deadline-ms 600
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+from app import ai_service
+from app.adaptive_limit import ProviderThrottle
+from app.cache_policy import NO_CACHE
+from app.hedging import Hedger
+from app.providers import close_http_client
+from benchmarks.common import percentile
+from benchmarks.stub_provider import running_stub
+
+
+async def stub_stats(stats_url: str) -> Dict[str, int]:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(stats_url)).json()
+
+
+async def run(requests: int, concurrency: int) -> List[float]:
+    latencies: List[float] = []
+    remaining = iter(range(requests))
+
+    async def client():
+        for _ in remaining:
+            start = time.perf_counter()
+            await ai_service.AIService.generate_content(f"Write a tagline {uuid.uuid4().hex}", "text", max_tokens=40)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return latencies
+
+
+async def main_async(args):
+    ai_service.cache_policy_for = lambda content_type, temperature: NO_CACHE
+    # Fixed concurrency, so the throttle does not back off on the injected stalls
+    ai_service.provider_throttle = ProviderThrottle(args.concurrency, 1, args.concurrency, 0.75, 1000, 30)
+    results: Dict[str, Dict[str, Any]] = {}
+    async with running_stub(
+        args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.latency_ms / 10,
+        completion_words=40,
+        stall_rate=args.stall_rate,
+        stall_ms=args.stall_ms
+    ) as base_url:
+        stats_url = base_url.replace("/v1", "/stats")
+        for provider in ai_service.hosted_providers.values():
+            provider.base_url = base_url
+            provider.api_key = "stub"
+        try:
+            for mode, enabled in (("no hedging", False), ("hedged", True)):
+                hedger = Hedger({"default": args.deadline_ms}, {"gpt-3.5-turbo": args.backup_model}, enabled=enabled)
+                ai_service.hedger = hedger
+                before = await stub_stats(stats_url)
+                latencies = await run(args.requests, args.concurrency)
+                after = await stub_stats(stats_url)
+                results[mode] = {
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p95_ms": percentile(latencies, 95) * 1000,
+                    "p99_ms": percentile(latencies, 99) * 1000,
+                    "provider": after["requests_served"] - before["requests_served"],
+                    "cancelled": after["streams_cancelled"] - before["streams_cancelled"],
+                    **hedger.stats()
+                }
+        finally:
+            await close_http_client()
+
+    print(f"{args.stall_rate:.0%} of provider requests stall {args.stall_ms:.0f} ms; hedge deadline {args.deadline_ms:.0f} ms\n")
+    print(f"{'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedge %':>8} {'backup':>7} {'provider':>9} {'cancel':>7}")
+    for mode, r in results.items():
+        print(
+            f"{mode:<12} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['hedge_rate'] * 100:>7.1f}% "
+            f"{r['backup_wins']:>7} {r['provider']:>9} {r['cancelled']:>7}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--stall-rate", type=float, default=0.05)
+    parser.add_argument("--stall-ms", type=float, default=3000.0)
+    parser.add_argument("--deadline-ms", type=float, default=600.0, help="first-token deadline before hedging")
+    parser.add_argument("--backup-model", default="claude-3-sonnet-20240229")
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# backend/benchmarks/job_queue.py
+"""Async generation jobs: priority scheduling and crash recovery.
+
+Runs JobQueue + JobWorker against a Redis stand-in (any Redis URL) with
+AIService.generate_content ("text", caching off) answering from the stub
+provider. The job handler is app.worker.generate_job without the Postgres
+write. Several JobWorker instances in this process stand in for worker pods.
+
+* burst: --jobs jobs enqueued at once with a priority mix; queue wait
+  (claim - enqueue) per priority, throughput, and the peak depth and oldest
+  job age that GET /admin/metrics would have reported;
+* crash: a worker claims --crash-jobs jobs and dies without finishing them;
+  the jobs are redelivered once their visibility timeout runs out.
+
+    python -m benchmarks.job_queue --redis-url redis://localhost:6379 --jobs 400 --workers 2 --concurrency 8
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Dict, List
+
+from app import ai_service
+from app.cache_policy import NO_CACHE
+from app.config import settings
+from app.job_queue import JobQueue, JobWorker, SUCCEEDED, TERMINAL
+from app.providers import close_http_client
+from app.redis_pool import close_redis, get_redis
+from benchmarks.common import percentile
+from benchmarks.stub_provider import running_stub
+
+PRIORITIES = ["high", "normal", "low"]
+
+
+async def generate(job: Dict[str, Any]) -> Dict[str, Any]:
+    payload = job["payload"]
+    await ai_service.AIService.generate_content(payload["prompt"], payload["content_type"], max_tokens=payload["max_tokens"])
+    return {"content_id": 0}
+
+
+async def sample_stats(queue: JobQueue, peaks: Dict[str, float], done: asyncio.Event):
+    while not done.is_set():
+        stats = await queue.stats()
+        peaks["depth"] = max(peaks["depth"], stats["depth"])
+        for priority, q in stats["queues"].items():
+            peaks[priority] = max(peaks[priority], q["oldest_age_seconds"])
+        await asyncio.sleep(0.25)
+
+
+async def wait_finished(queue: JobQueue, job_ids: List[str]) -> List[Dict[str, Any]]:
+    while True:
+        jobs = [await queue.get(job_id) for job_id in job_ids]
+        if all(job["status"] in TERMINAL for job in jobs):
+            return jobs
+        await asyncio.sleep(0.1)
+
+
+async def enqueue(queue: JobQueue, count: int, mix: Dict[str, float]) -> List[str]:
+    rng = random.Random(0)
+    ids = []
+    for priority in rng.choices(list(mix), weights=list(mix.values()), k=count):
+        job = await queue.enqueue(1, {"prompt": f"Write a tagline {uuid.uuid4().hex}", "content_type": "text", "max_tokens": 40}, priority)
+        ids.append(job["id"])
+    return ids
+
+
+async def run_workers(queue: JobQueue, workers: int, concurrency: int):
+    pool = [JobWorker(queue, generate, concurrency, 0.5) for _ in range(workers)]
+    tasks = [asyncio.create_task(worker.run()) for worker in pool]
+    return pool, tasks
+
+
+async def stop_workers(pool: List[JobWorker], tasks: List[asyncio.Task]):
+    for worker in pool:
+        worker.stop()
+    await asyncio.gather(*tasks)
+    await asyncio.gather(*(worker.drain(5) for worker in pool))
+
+
+async def burst(args, mix: Dict[str, float]):
+    queue = JobQueue(PRIORITIES, 30, 3, 600, 0, prefix=f"bench-jobs-{uuid.uuid4().hex[:8]}")
+    ids = await enqueue(queue, args.jobs, mix)
+    peaks = {"depth": 0, **{p: 0.0 for p in PRIORITIES}}
+    done = asyncio.Event()
+    sampler = asyncio.create_task(sample_stats(queue, peaks, done))
+    start = time.perf_counter()
+    pool, tasks = await run_workers(queue, args.workers, args.concurrency)
+    jobs = await wait_finished(queue, ids)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+    await stop_workers(pool, tasks)
+
+    print(f"burst: {args.jobs} jobs, {args.workers} workers x {args.concurrency}, "
+          f"{sum(j['status'] == SUCCEEDED for j in jobs) / elapsed:.1f} jobs/s, peak depth {peaks['depth']}\n")
+    print(f"{'priority':<9} {'jobs':>5} {'wait p50 s':>11} {'wait p95 s':>11} {'wait max s':>11} {'peak age s':>11}")
+    for priority in PRIORITIES:
+        waits = [(j["started_at"] - j["enqueued_at"]) / 1000 for j in jobs if j["priority"] == priority]
+        print(
+            f"{priority:<9} {len(waits):>5} {percentile(waits, 50):>11.2f} {percentile(waits, 95):>11.2f} "
+            f"{max(waits, default=0):>11.2f} {peaks[priority]:>11.2f}"
+        )
+
+
+async def crash(args):
+    queue = JobQueue(PRIORITIES, args.visibility_s, 3, 600, 0, prefix=f"bench-jobs-{uuid.uuid4().hex[:8]}")
+    ids = await enqueue(queue, args.crash_jobs * 4, {"normal": 1.0})
+    # The doomed worker leases jobs and never finishes them
+    lost = [await queue.claim() for _ in range(args.crash_jobs)]
+    start = time.perf_counter()
+    pool, tasks = await run_workers(queue, 1, args.concurrency)
+    jobs = await wait_finished(queue, ids)
+    elapsed = time.perf_counter() - start
+    await stop_workers(pool, tasks)
+    stats = await queue.stats()
+    lost_ids = {job["id"] for job in lost}
+    recovered = [j for j in jobs if j["id"] in lost_ids]
+    print(f"\ncrash: {len(lost)} of {len(ids)} jobs held by a dead worker, visibility timeout {args.visibility_s:.0f}s")
+    print(f"  all jobs finished after {elapsed:.2f}s; succeeded {sum(j['status'] == SUCCEEDED for j in jobs)}/{len(jobs)}")
+    print(f"  redelivered {stats['redelivered']}; abandoned jobs restarted after "
+          f"{min((j['started_at'] - j['enqueued_at']) / 1000 for j in recovered):.2f}-"
+          f"{max((j['started_at'] - j['enqueued_at']) / 1000 for j in recovered):.2f}s, attempts {sorted({j['attempts'] for j in recovered})}")
+
+
+async def main_async(args):
+    settings.REDIS_URL = args.redis_url
+    ai_service.cache_policy_for = lambda content_type, temperature: NO_CACHE
+    mix = {p: float(share) for p, share in (item.split(":") for item in args.mix.split(","))}
+    async with running_stub(args.port, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 10, completion_words=40) as base_url:
+        ai_service.openai_provider.base_url = base_url
+        try:
+            await burst(args, mix)
+            await crash(args)
+        finally:
+            redis = get_redis()
+            async for key in redis.scan_iter("bench-jobs-*"):
+                await redis.delete(key)
+            await close_http_client()
+            await close_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--jobs", type=int, default=400)
+    parser.add_argument("--mix", default="high:0.1,normal:0.6,low:0.3", help="share of jobs per priority")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=8, help="jobs per worker")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--crash-jobs", type=int, default=8)
+    parser.add_argument("--visibility-s", type=float, default=3.0)
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+# backend/benchmarks/micro.py
+"""Micro-benchmarks of functions on every request's path, saved as JSON per commit.
+
+* cache_key_short / cache_key_long: AIService.get_cache_key for a one-line
+  and a ~2 KB prompt with the usual generation parameters;
+* verify_token: auth.verify_token on a fresh access token;
+* password_hash / password_verify: auth.get_password_hash and
+  auth.verify_password (bcrypt, so milliseconds per call by design);
+* check_rate_limit: auth.check_rate_limit against --redis-url, one limiter
+  script round trip per call;
+* content_list_{validate,fastapi,dump_json}_<n>: a GET /contents page of n
+  ORM-like rows (--list-sizes; 20 is the default page, 100 the maximum)
+  validated into schemas.Content, serialized the way FastAPI does it
+  (validate, dump_python(mode="json"), json.dumps), and validated then
+  dumped straight to JSON bytes by pydantic-core.
+
+Each benchmark is timed with timeit: the loop count is calibrated so one
+repeat takes at least --min-time seconds, and per-call times over --repeat
+repeats are reported. The serialization paths also get a tracemalloc
+profile per stage (validate, dump, json.dumps, ...): bytes and blocks each
+stage leaves allocated for the next, its top allocation site, and the peak
+for the whole path. Results go to --output (default micro-<commit>.json);
+--compare prints the change against an earlier results file and exits
+non-zero when a benchmark is more than --max-slowdown slower.
+
+    python -m benchmarks.micro --redis-url redis://localhost:6379 --output micro-main.json
+    python -m benchmarks.micro --only cache_key,content_list --compare micro-main.json --max-slowdown 0.15
+"""
+import argparse
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+LONG_PROMPT = (
+    "Write a detailed launch announcement for our analytics dashboard. Cover the new cohort view, "
+    "the export scheduler, and the permission model for shared reports.  Keep the tone friendly!\n"
+) * 12
+
+PARAMS = {"max_tokens": 500, "temperature": 0.7, "language": "en", "style": "professional"}
+
+
+def commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def content_rows(count: int) -> List[SimpleNamespace]:
+    """Stand-ins for models.Content rows as GET /contents returns them"""
+    now = datetime.utcnow()
+    return [
+        SimpleNamespace(
+            id=i,
+            title=f"Quarterly update {i}",
+            content_type="blog",
+            input_text="Write a quarterly product update for our customers",
+            generated_content="The quarter brought three major releases and a faster dashboard. " * 30,
+            model_used="gpt-3.5-turbo",
+            status="generated",
+            is_public=False,
+            is_shared=False,
+            share_token=None,
+            tags=["product", "update"],
+            metadata={"generation_time": 1.8, "tokens_used": 420, "prompt_tokens": 40, "completion_tokens": 380},
+            generation_time=1.8,
+            tokens_used=420,
+            temperature=0.7,
+            language="en",
+            style="professional",
+            created_at=now - timedelta(minutes=i),
+            updated_at=now - timedelta(minutes=i),
+            user_id=1
+        )
+        for i in range(count)
+    ]
+
+
+def time_call(fn: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, float]:
+    """Per-call timings (µs) of fn over `repeat` repeats of a calibrated loop count"""
+    timer = timeit.Timer(fn)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time:
+        loops = max(1, int(loops * min_time / max(elapsed, 1e-9)))
+    per_call = [t / loops * 1e6 for t in timer.repeat(repeat=repeat, number=loops)]
+    median = statistics.median(per_call)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "median_us": median,
+        "min_us": min(per_call),
+        "stdev_us": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "ops_per_s": 1e6 / median if median else 0.0
+    }
+
+
+def time_async(make_call: Callable[[], Any], min_time: float, repeat: int) -> Dict[str, float]:
+    """Like time_call for a coroutine function, awaited back to back on one event loop"""
+    loop = asyncio.new_event_loop()
+
+    async def run(loops: int) -> float:
+        start = time.perf_counter()
+        for _ in range(loops):
+            await make_call()
+        return time.perf_counter() - start
+
+    try:
+        loops = 1
+        while (elapsed := loop.run_until_complete(run(loops))) < 0.2:
+            loops *= 10
+        loops = max(loops, int(loops * min_time / elapsed))
+        per_call = [loop.run_until_complete(run(loops)) / loops * 1e6 for _ in range(repeat)]
+    finally:
+        from app.redis_pool import close_redis
+        loop.run_until_complete(close_redis())
+        loop.close()
+    median = statistics.median(per_call)
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "median_us": median,
+        "min_us": min(per_call),
+        "stdev_us": statistics.stdev(per_call) if len(per_call) > 1 else 0.0,
+        "ops_per_s": 1e6 / median if median else 0.0
+    }
+
+
+# A serialization path: named stages, each taking the previous stage's output
+Stages = List[Tuple[str, Callable[[Any], Any]]]
+
+
+def pipeline(stages: Stages, value: Any) -> Callable[[], Any]:
+    def run():
+        result = value
+        for _, stage in stages:
+            result = stage(result)
+        return result
+    return run
+
+
+def allocations(stages: Stages, value: Any) -> Dict[str, Any]:
+    """tracemalloc profile of one pass: what each stage leaves allocated, and the peak of the whole path"""
+    pipeline(stages, value)()  # warm caches (schema builds, interned strings) outside the profile
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    profile: Dict[str, Any] = {"stages": {}}
+    tracemalloc.start()
+    try:
+        # Peak from a plain pass, before any snapshots are held
+        tracemalloc.reset_peak()
+        pipeline(stages, value)()
+        profile["peak_bytes"] = tracemalloc.get_traced_memory()[1] - tracemalloc.get_traced_memory()[0]
+        outputs = [value]
+        previous = tracemalloc.take_snapshot().filter_traces(ignore)
+        for name, stage in stages:
+            # Keep every output alive so each stage's allocations show up in its own diff
+            outputs.append(stage(outputs[-1]))
+            snapshot = tracemalloc.take_snapshot().filter_traces(ignore)
+            diff = [stat for stat in snapshot.compare_to(previous, "lineno") if stat.size_diff > 0]
+            top = max(diff, key=lambda stat: stat.size_diff, default=None)
+            profile["stages"][name] = {
+                "bytes": sum(stat.size_diff for stat in diff),
+                "blocks": sum(max(stat.count_diff, 0) for stat in diff),
+                "top_site": f"{top.traceback[0].filename}:{top.traceback[0].lineno}" if top else ""
+            }
+            previous = snapshot
+    finally:
+        tracemalloc.stop()
+    return profile
+
+
+def cache_key_benchmarks() -> Dict[str, Callable[[], Any]]:
+    from app.ai_service import AIService
+    return {
+        "cache_key_short": lambda: AIService.get_cache_key("Write a tagline for a coffee shop", "text", "gpt-3.5-turbo", **PARAMS),
+        "cache_key_long": lambda: AIService.get_cache_key(LONG_PROMPT, "blog", "gpt-3.5-turbo", **PARAMS),
+    }
+
+
+def token_benchmarks() -> Dict[str, Callable[[], Any]]:
+    from app import auth
+    token = auth.create_access_token(data={"sub": "bench"}, expires_delta=timedelta(hours=1))
+    return {"verify_token": lambda: auth.verify_token(token, "access")}
+
+
+def password_benchmarks() -> Dict[str, Callable[[], Any]]:
+    from app import auth
+    hashed = auth.get_password_hash("correct horse battery staple")
+    return {
+        "password_hash": lambda: auth.get_password_hash("correct horse battery staple"),
+        "password_verify": lambda: auth.verify_password("correct horse battery staple", hashed),
+    }
+
+
+def content_list_paths(sizes: List[int]) -> Dict[str, Tuple[Stages, Any]]:
+    from pydantic import TypeAdapter
+    from app import schemas
+    adapter = TypeAdapter(List[schemas.Content])
+    validate = ("validate", lambda rows: adapter.validate_python(rows, from_attributes=True))
+    paths = {}
+    for size in sizes:
+        rows = content_rows(size)
+        paths[f"content_list_validate_{size}"] = ([validate], rows)
+        # response_model handling: validate, jsonable dicts, then JSONResponse renders them
+        paths[f"content_list_fastapi_{size}"] = ([
+            validate,
+            ("dump_python", lambda models: adapter.dump_python(models, mode="json")),
+            ("json.dumps", json.dumps),
+            ("encode", str.encode),
+        ], rows)
+        paths[f"content_list_dump_json_{size}"] = ([validate, ("dump_json", adapter.dump_json)], rows)
+    return paths
+
+
+# Benchmark groups selectable with --only
+SYNC_GROUPS = ("cache_key", "verify_token", "password", "content_list")
+
+
+def run_group(name: str, make: Callable[[], Dict[str, Any]], args, results: Dict[str, Any], memory: Dict[str, Any]):
+    try:
+        benchmarks = make()
+    except Exception as e:
+        print(f"{name}: skipped ({type(e).__name__}: {e})")
+        results[name] = {"error": f"{type(e).__name__}: {e}"}
+        return
+    for bench, fn in benchmarks.items():
+        if isinstance(fn, tuple):
+            # A serialization path: time it end to end, then profile its stages
+            stages, value = fn
+            results[bench] = time_call(pipeline(stages, value), args.min_time, args.repeat)
+            memory[bench] = allocations(stages, value)
+        else:
+            results[bench] = time_call(fn, args.min_time, args.repeat)
+        report(bench, results[bench])
+
+
+def report(name: str, stats: Dict[str, float]):
+    print(f"{name:<28} {stats['median_us']:>12.2f} {stats['min_us']:>12.2f} {stats['stdev_us']:>10.2f} {stats['ops_per_s']:>12.0f}")
+
+
+def compare(results: Dict[str, Any], previous: Dict[str, Any], max_slowdown: Optional[float]) -> List[str]:
+    print(f"\nvs {previous.get('commit', '?')}:")
+    failures = []
+    for name, stats in results.items():
+        old = previous.get("benchmarks", {}).get(name)
+        if "median_us" not in stats or not old or "median_us" not in old:
+            continue
+        change = stats["median_us"] / old["median_us"] - 1
+        print(f"  {name:<28} {old['median_us']:>12.2f} -> {stats['median_us']:>12.2f} us  {change:>+8.1%}")
+        if max_slowdown is not None and change > max_slowdown:
+            failures.append(f"{name} is {change:.1%} slower than {previous.get('commit', '?')}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="", help=f"comma-separated groups: {', '.join(SYNC_GROUPS)}, check_rate_limit")
+    parser.add_argument("--redis-url", default=settings.REDIS_URL)
+    parser.add_argument("--list-sizes", default="20,100")
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repeat")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default=None, help="results file (default micro-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+    parser.add_argument("--max-slowdown", type=float, default=None, help="fail when a median is this much slower than --compare")
+    args = parser.parse_args()
+    only = {name for name in args.only.split(",") if name}
+    settings.REDIS_URL = args.redis_url
+    sizes = [int(size) for size in args.list_sizes.split(",")]
+
+    results: Dict[str, Any] = {}
+    memory: Dict[str, Any] = {}
+    print(f"{'benchmark':<28} {'median us':>12} {'min us':>12} {'stdev us':>10} {'ops/s':>12}")
+    groups: List[Tuple[str, Callable[[], Dict[str, Any]]]] = [
+        ("cache_key", cache_key_benchmarks),
+        ("verify_token", token_benchmarks),
+        ("password", password_benchmarks),
+        ("content_list", lambda: content_list_paths(sizes)),
+    ]
+    for name, make in groups:
+        if not only or name in only:
+            run_group(name, make, args, results, memory)
+
+    if not only or "check_rate_limit" in only:
+        try:
+            from app import auth
+            results["check_rate_limit"] = time_async(
+                lambda: auth.check_rate_limit(1, "micro-bench", 10**9, 60), args.min_time, args.repeat
+            )
+            report("check_rate_limit", results["check_rate_limit"])
+        except Exception as e:
+            print(f"check_rate_limit: skipped ({type(e).__name__}: {e})")
+            results["check_rate_limit"] = {"error": f"{type(e).__name__}: {e}"}
+
+    if memory:
+        print(f"\n{'allocations per call':<40} {'KiB':>9} {'blocks':>7}  top site")
+        for name, profile in memory.items():
+            print(f"{name:<40} {profile['peak_bytes'] / 1024:>9.1f} {'':>7}  (peak)")
+            for stage, stats in profile["stages"].items():
+                print(f"  {stage:<38} {stats['bytes'] / 1024:>9.1f} {stats['blocks']:>7}  {stats['top_site']}")
+
+    sha = commit()
+    output = {
+        "commit": sha,
+        "timestamp": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "benchmarks": results,
+        "memory": memory,
+    }
+    path = Path(args.output or f"micro-{sha}.json")
+    path.write_text(json.dumps(output, indent=2) + "\n")
+    print(f"\nresults written to {path}")
+
+    if args.compare:
+        failures = compare(results, json.loads(Path(args.compare).read_text()), args.max_slowdown)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
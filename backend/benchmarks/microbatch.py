@@ -0,0 +1,83 @@
+# backend/benchmarks/microbatch.py
+"""Throughput and tail latency of local pipelines at different micro-batch windows.
+
+Loads the real local models in a worker pool, so the first run downloads them.
+
+    python -m benchmarks.microbatch --pipeline text_generator --windows 0,5,10,25,50
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from app.config import settings
+from app.inference import InferenceExecutor
+from app.microbatch import MicroBatcher
+from benchmarks.common import summarize
+
+PROMPTS = {
+    "text_generator": "The future of content creation is",
+    "code_generator": "def fibonacci(n):",
+    "summarizer": " ".join(["Local models summarize long documents for offline use."] * 40)
+}
+
+
+async def run_window(executor: InferenceExecutor, pipeline: str, window_ms: float, max_size: int,
+                     total: int, concurrency: int, max_length: int):
+    batcher = MicroBatcher(executor, window_ms, max_size)
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    kwargs = {"max_length": max_length, "do_sample": False}
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            await batcher.submit(pipeline, PROMPTS[pipeline], **kwargs)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    result = summarize(latencies, time.perf_counter() - start)
+    result["avg_batch"] = batcher.items / batcher.batches if batcher.batches else 0.0
+    return result
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pipeline", choices=sorted(PROMPTS), default="text_generator")
+    parser.add_argument("--windows", default="0,5,10,25,50", help="comma-separated batch windows in ms")
+    parser.add_argument("--max-size", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-length", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    executor = InferenceExecutor(
+        args.workers, max_pending=args.concurrency, timeout=600,
+        memory_budget_bytes=settings.MODEL_MEMORY_BUDGET_MB * 2**20
+    )
+    try:
+        # Warm the workers so model loading is not counted against the first window
+        await asyncio.gather(*(
+            executor.run(args.pipeline, PROMPTS[args.pipeline], max_length=8) for _ in range(args.workers)
+        ))
+
+        print(f"{'window ms':>10} {'max size':>9} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'avg batch':>10}")
+        # Window 0 with batch size 1 is the unbatched baseline
+        windows = [(0.0, 1)] + [(float(w), args.max_size) for w in args.windows.split(",")]
+        for window_ms, max_size in windows:
+            result = await run_window(
+                executor, args.pipeline, window_ms, max_size,
+                args.requests, args.concurrency, args.max_length
+            )
+            print(
+                f"{window_ms:>10.0f} {max_size:>9} {result['rps']:>8.2f} "
+                f"{result['p50_ms']:>9.0f} {result['p99_ms']:>9.0f} {result['avg_batch']:>10.1f}"
+            )
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
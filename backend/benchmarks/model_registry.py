@@ -0,0 +1,61 @@
+# backend/benchmarks/model_registry.py
+"""Cold-start cost and steady-state memory of the local model registry.
+
+Loads each local model in-process, reports load time, weight size and process
+RSS, then replays a request mix under the configured budget to show evictions.
+Models whose estimated weights exceed the budget on their own are rejected
+without loading.
+
+    python -m benchmarks.model_registry --budget-mb 384 --requests 30
+"""
+import argparse
+import random
+import time
+
+from app.inference import LOCAL_PIPELINES, size_hints
+from app.model_registry import ModelRegistry, ModelTooLarge, process_rss_bytes
+
+MiB = 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-mb", type=int, default=384)
+    parser.add_argument("--requests", type=int, default=30, help="random model lookups in the replay phase")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    baseline_rss = process_rss_bytes()
+    # Models load at fp32 here (load_pipeline's default backend)
+    registry = ModelRegistry(LOCAL_PIPELINES, budget_bytes=args.budget_mb * MiB, size_hints=size_hints("fp32"))
+
+    print(f"baseline RSS: {baseline_rss / MiB:.0f} MiB, budget: {args.budget_mb} MiB\n")
+    print(f"{'model':<16} {'cold load s':>12} {'weights MiB':>12} {'RSS MiB':>9}")
+    for name in LOCAL_PIPELINES:
+        start = time.perf_counter()
+        try:
+            status = "" if registry.get(name) is not None else "  (failed to load)"
+        except ModelTooLarge:
+            status = f"  (over budget, ~{registry.expected_bytes(name) / MiB:.0f} MiB)"
+        elapsed = time.perf_counter() - start
+        weights = registry.stats()["models"].get(name, {}).get("resident_bytes", 0)
+        print(f"{name:<16} {elapsed:>12.2f} {weights / MiB:>12.0f} {process_rss_bytes() / MiB:>9.0f}{status}")
+
+    rng = random.Random(args.seed)
+    names = list(LOCAL_PIPELINES)
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        try:
+            registry.get(rng.choice(names))
+        except ModelTooLarge:
+            pass
+    elapsed = time.perf_counter() - start
+
+    stats = registry.stats()
+    print(f"\nreplay of {args.requests} lookups: {elapsed:.2f}s")
+    print(f"loads={stats['loads']} evictions={stats['evictions']} hits={stats['hits']} rejected={stats['rejected']}")
+    print(f"steady-state weights: {stats['resident_bytes'] / MiB:.0f} MiB, RSS: {stats['process_rss_bytes'] / MiB:.0f} MiB")
+
+
+if __name__ == "__main__":
+    main()
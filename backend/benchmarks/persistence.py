@@ -0,0 +1,118 @@
+# backend/benchmarks/persistence.py
+"""Database work per /generate and per batch: the old persistence path vs app.crud.
+
+Runs against the app's own models on a database (SQLite by default, or
+--database-url), counting SQL statements, commits and latency:
+
+* /generate, old: the pre-crud sequence replayed with the ORM models:
+  get_current_user (SELECT user, UPDATE last_login, COMMIT), INSERT content,
+  COMMIT, refresh SELECT, SELECT analytics, UPDATE analytics, COMMIT, then
+  reading the expired row for the response;
+* /generate, new: SELECT user (get_current_user), then
+  app.crud.save_generated_content;
+* batch of --batch items, old: one ORM object added per item, one flush
+  and commit, ids read back afterwards; new: app.crud.save_batch_contents.
+
+On SQLite, RETURNING ids in parameter order still takes one INSERT per row;
+PostgreSQL gets batched multi-row INSERTs.
+
+    python -m benchmarks.persistence --database-url sqlite:///./bench_persistence.db --requests 500 --batch 100
+"""
+import argparse
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+from benchmarks.common import summarize
+
+REQUEST = schemas.GenerateRequest(prompt="Write about item", content_type="text", tags=["bench"])
+GENERATED = "lorem ipsum " * 80
+METADATA: Dict[str, Any] = {"generation_time": 0.8, "tokens_used": 120}
+
+
+def generate_old(db: Session, i: int):
+    user = db.query(models.User).filter(models.User.username == "bench").first()
+    user.last_login = datetime.utcnow()
+    db.commit()
+    content = models.Content(**crud.content_values(user.id, REQUEST, GENERATED, "gpt-3.5-turbo", METADATA))
+    db.add(content)
+    db.commit()
+    db.refresh(content)
+    analytics = db.query(models.UserAnalytics).filter(models.UserAnalytics.user_id == user.id).first()
+    analytics.total_generations += 1
+    analytics.total_tokens_used += 120
+    analytics.last_generation_date = datetime.utcnow()
+    analytics.average_generation_time = (analytics.average_generation_time + 0.8) / 2
+    db.commit()
+    # Serializing the response reads the expired row again
+    return content.id, content.generated_content
+
+
+def generate_new(db: Session, i: int):
+    user = db.query(models.User).filter(models.User.username == "bench").first()
+    content = crud.save_generated_content(db, user, REQUEST, GENERATED, "gpt-3.5-turbo", METADATA)
+    return content.id, content.generated_content
+
+
+def batch_old(db: Session, size: int) -> List[int]:
+    contents = [models.Content(**crud.content_values(1, REQUEST, GENERATED, "gpt-3.5-turbo", METADATA)) for _ in range(size)]
+    for content in contents:
+        db.add(content)
+    db.commit()
+    return [content.id for content in contents]
+
+
+def batch_new(db: Session, size: int) -> List[int]:
+    result = {"content": GENERATED, "model": "gpt-3.5-turbo", "metadata": METADATA}
+    return crud.save_batch_contents(db, 1, [(REQUEST, result)] * size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_persistence.db")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--batches", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    models.Base.metadata.drop_all(engine)
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(models.User(id=1, username="bench", email="bench@example.com"))
+        db.add(models.UserAnalytics(user_id=1, total_generations=0, total_tokens_used=0, average_generation_time=0.8))
+        db.commit()
+
+    counters = {"statements": 0, "commits": 0}
+    event.listen(engine, "before_cursor_execute", lambda *a: counters.__setitem__("statements", counters["statements"] + 1))
+    event.listen(engine, "commit", lambda *a: counters.__setitem__("commits", counters["commits"] + 1))
+
+    print(f"{'path':<22} {'SQL/call':>9} {'commits':>8} {'p50 ms':>8} {'p99 ms':>8} {'calls/s':>8}")
+    for name, run, calls, arg in (
+        ("/generate old", generate_old, args.requests, None),
+        ("/generate new", generate_new, args.requests, None),
+        (f"batch of {args.batch} old", batch_old, args.batches, args.batch),
+        (f"batch of {args.batch} new", batch_new, args.batches, args.batch),
+    ):
+        counters.update(statements=0, commits=0)
+        latencies: List[float] = []
+        start = time.perf_counter()
+        for i in range(calls):
+            # A fresh session per call, like get_db per request
+            with Session(engine) as db:
+                t = time.perf_counter()
+                run(db, arg if arg is not None else i)
+                latencies.append(time.perf_counter() - t)
+        stats = summarize(latencies, time.perf_counter() - start)
+        print(
+            f"{name:<22} {counters['statements'] / calls:>9.2f} {counters['commits'] / calls:>8.2f} "
+            f"{stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f} {stats['rps']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+# backend/benchmarks/prompt_cache_hits.py
+"""Cache hit rate from prompt canonicalization and near-duplicate matching.
+
+Replays a synthetic request stream where each source prompt is re-sent with
+formatting variations (whitespace, case, punctuation) and small edits, and
+counts hits for: raw-prompt keys (the old scheme), canonical keys, and
+canonical keys plus the SimHash near-duplicate index. Wrong hits are
+near-duplicate matches to a different source prompt. Needs a Redis server;
+the benchmark's keys are removed afterwards.
+
+    python -m benchmarks.prompt_cache_hits --redis-url redis://localhost:6379 --prompts 200 --repeats 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import uuid
+from typing import Callable, Dict, List, Tuple
+
+import redis.asyncio as aredis
+
+from app.ai_service import ContentType
+from app.prompt_match import NearDuplicateIndex, PUNCTUATION_SENSITIVE_TYPES, canonicalize_prompt, simhash
+from benchmarks.cache_encoding import synthetic_content
+
+VARIATIONS: Dict[str, Callable[[str, random.Random], str]] = {
+    "exact": lambda text, rng: text,
+    "whitespace": lambda text, rng: "  " + text.replace(" ", "  ", 5).replace(". ", ".\n") + "\n",
+    "case": lambda text, rng: text.upper() if rng.random() < 0.5 else text.lower(),
+    "punctuation": lambda text, rng: text.rstrip(".") + "!!",
+    "one word edited": lambda text, rng: edit_words(text, rng, 1),
+    "three words edited": lambda text, rng: edit_words(text, rng, 3),
+}
+
+
+def edit_words(text: str, rng: random.Random, count: int) -> str:
+    words = text.split(" ")
+    for _ in range(count):
+        words[rng.randrange(len(words))] = rng.choice(["notably", "overall", "quickly", "however"])
+    return " ".join(words)
+
+
+def raw_key(prompt: str, content_type: str) -> str:
+    """Cache key as computed before canonicalization"""
+    return hashlib.md5(f"{prompt}:{content_type}:gpt-3.5-turbo:{json.dumps({})}".encode()).hexdigest()
+
+
+def canonical_key(prompt: str, content_type: str) -> str:
+    return hashlib.md5(f"{canonicalize_prompt(prompt, content_type)}:{content_type}".encode()).hexdigest()
+
+
+def request_stream(prompts: int, repeats: int, words: int, rng: random.Random) -> List[Tuple[int, str, str]]:
+    """(source id, variation name, prompt); each source's first request is its original text"""
+    stream = []
+    for source in range(prompts):
+        text = synthetic_content(ContentType.SUMMARY, words, rng)
+        stream.append((source, "original", text))
+        for _ in range(repeats):
+            name = rng.choice(list(VARIATIONS))
+            stream.append((source, name, VARIATIONS[name](text, rng)))
+    # Keep each original ahead of its variations while interleaving sources
+    originals = [item for item in stream if item[1] == "original"]
+    variations = [item for item in stream if item[1] != "original"]
+    rng.shuffle(variations)
+    return originals + variations
+
+
+async def main_async(args):
+    rng = random.Random(args.seed)
+    client = aredis.Redis.from_url(args.redis_url)
+    index = NearDuplicateIndex({"summary": args.threshold}, 0.3, enabled=True, redis_client=client)
+    scope = f"bench-{uuid.uuid4().hex}"
+    content_type = ContentType.SUMMARY.value
+
+    raw_cache, canonical_cache = {}, {}
+    by_variation: Dict[str, Dict[str, int]] = {}
+    totals = {"requests": 0, "raw": 0, "canonical": 0, "near": 0, "wrong": 0}
+    try:
+        for source, variation, prompt in request_stream(args.prompts, args.repeats, args.words, rng):
+            row = by_variation.setdefault(variation, {"requests": 0, "raw": 0, "canonical": 0, "near": 0, "wrong": 0})
+            canonical = canonicalize_prompt(prompt, content_type)
+            fingerprint = simhash(canonical, exact=content_type in PUNCTUATION_SENSITIVE_TYPES)
+            raw_hit = raw_key(prompt, content_type) in raw_cache
+            key = canonical_key(prompt, content_type)
+            canonical_hit = key in canonical_cache
+            near_hit = wrong = False
+            if not canonical_hit:
+                match = await index.lookup(scope, fingerprint, args.threshold)
+                if match is not None:
+                    near_hit = True
+                    wrong = canonical_cache[match[0]] != source
+            raw_cache[raw_key(prompt, content_type)] = source
+            if not canonical_hit and not near_hit:
+                canonical_cache[key] = source
+                await index.add(scope, fingerprint, key, 600)
+
+            for counts in (row, totals):
+                counts["requests"] += 1
+                counts["raw"] += raw_hit
+                counts["canonical"] += canonical_hit
+                counts["near"] += canonical_hit or near_hit
+                counts["wrong"] += wrong
+    finally:
+        async for key in client.scan_iter(f"neardup:{scope}:*"):
+            await client.delete(key)
+        await client.aclose()
+
+    print(f"{'variation':<20} {'requests':>8} {'raw key':>8} {'canonical':>10} {'+near-dup':>10} {'wrong':>6}")
+    for name, counts in list(by_variation.items()) + [("all", totals)]:
+        n = counts["requests"]
+        print(
+            f"{name:<20} {n:>8} {counts['raw'] / n:>8.1%} {counts['canonical'] / n:>10.1%} "
+            f"{counts['near'] / n:>10.1%} {counts['wrong']:>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--prompts", type=int, default=200, help="distinct source prompts")
+    parser.add_argument("--repeats", type=int, default=4, help="variations sent per source prompt")
+    parser.add_argument("--words", type=int, default=200, help="words per source prompt")
+    parser.add_argument("--threshold", type=float, default=0.95, help="near-duplicate similarity threshold")
+    parser.add_argument("--seed", type=int, default=11)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
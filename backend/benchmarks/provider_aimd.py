@@ -0,0 +1,104 @@
+# backend/benchmarks/provider_aimd.py
+"""Throughput and 429s against a provider with a hidden concurrency ceiling:
+unthrottled calls vs the adaptive (AIMD) provider throttle.
+
+The stub answers 429 + Retry-After once more than --ceiling requests are in
+flight. Unthrottled clients keep hammering (with a short fixed retry delay);
+throttled clients go through ProviderThrottle, which should settle just under
+the ceiling with few 429s.
+
+    python -m benchmarks.provider_aimd --clients 64 --ceiling 16 --duration 20
+"""
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from app.adaptive_limit import ProviderThrottle
+from app.providers import OpenAIProvider, ProviderError, close_http_client
+from benchmarks.common import percentile
+from benchmarks.stub_provider import running_stub
+
+MESSAGES = [{"role": "user", "content": "Write a short product description."}]
+
+
+async def run(provider: OpenAIProvider, throttle, clients: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def call():
+        if throttle is None:
+            return await provider.chat_completion("gpt-3.5-turbo", MESSAGES, 40, 0.7)
+        async with throttle.slot(provider.name, "gpt-3.5-turbo") as timing:
+            text = await provider.chat_completion("gpt-3.5-turbo", MESSAGES, 40, 0.7)
+            timing.output_tokens = len(text.split())
+            return text
+
+    async def client():
+        nonlocal errors
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                await call()
+                latencies.append(time.perf_counter() - start)
+            except ProviderError:
+                errors += 1
+                await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    return {
+        "ok_per_s": len(latencies) / elapsed,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000
+    }
+
+
+async def main_async(args):
+    results = {}
+    async with running_stub(
+        args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.latency_ms / 10,
+        completion_words=40,
+        token_interval_ms=0,
+        max_concurrency=args.ceiling,
+        retry_after_s=args.retry_after_s
+    ) as base_url:
+        provider = OpenAIProvider(base_url, api_key=None)
+        try:
+            results["unthrottled"] = await run(provider, None, args.clients, args.duration)
+            throttle = ProviderThrottle(
+                initial=4, minimum=1, maximum=args.clients, backoff_ratio=args.backoff_ratio,
+                latency_tolerance=3, queue_timeout=30
+            )
+            results["AIMD throttle"] = await run(provider, throttle, args.clients, args.duration)
+            final_limit = throttle.stats()[f"{provider.name}:gpt-3.5-turbo"]["limit"]
+        finally:
+            await close_http_client()
+
+    ideal = args.ceiling / (args.latency_ms / 1000)
+    print(f"provider ceiling: {args.ceiling} in flight (~{ideal:.0f} ok/s at {args.latency_ms:.0f} ms)\n")
+    print(f"{'mode':<16} {'ok/s':>8} {'429s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, r in results.items():
+        print(f"{name:<16} {r['ok_per_s']:>8.1f} {r['errors']:>8} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print(f"\nAIMD limit at end of run: {final_limit}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--ceiling", type=int, default=16, help="provider's concurrency ceiling")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--retry-after-s", type=float, default=0.5)
+    parser.add_argument("--backoff-ratio", type=float, default=0.75)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
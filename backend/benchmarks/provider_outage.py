@@ -0,0 +1,123 @@
+# backend/benchmarks/provider_outage.py
+"""Behaviour through a provider outage: no protection vs circuit breaker,
+retry budget and local fallback.
+
+Concurrent clients call AIService.generate_content ("text", caching off)
+against the stub provider, which is healthy, then fails every request after
+hanging for --error-delay-ms, then recovers. The local pipeline is replaced by
+a --local-ms stand-in so no model has to be downloaded. For each phase it
+reports successes, fallbacks, errors, latency and requests that reached the
+provider.
+
+    python -m benchmarks.provider_outage --clients 20 --phase-s 8 --error-delay-ms 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any, Dict, List
+
+import httpx
+
+from app import ai_service
+from app.cache_policy import NO_CACHE
+from app.circuit_breaker import CircuitBreakers
+from app.config import settings
+from app.providers import close_http_client
+from benchmarks.common import percentile
+from benchmarks.stub_provider import running_stub
+
+
+async def provider_requests(stats_url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        stats = (await client.get(stats_url)).json()
+        return stats["requests_served"] + stats["requests_failed"]
+
+
+async def set_faults(faults_url: str, **faults):
+    async with httpx.AsyncClient() as client:
+        await client.post(faults_url, json=faults)
+
+
+async def run_phase(clients: int, duration: float) -> Dict[str, Any]:
+    latencies: List[float] = []
+    counts = {"ok": 0, "fallback": 0, "errors": 0}
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                _, _, metadata = await ai_service.AIService.generate_content(
+                    f"Write a tagline {uuid.uuid4().hex}", "text", max_tokens=40
+                )
+                counts["fallback" if "fallback" in metadata else "ok"] += 1
+            except Exception:
+                counts["errors"] += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return {**counts, "p50_ms": percentile(latencies, 50) * 1000, "p99_ms": percentile(latencies, 99) * 1000}
+
+
+async def main_async(args):
+    async def local_stand_in(name: str, prompt: str, **kwargs):
+        await asyncio.sleep(args.local_ms / 1000)
+        return [{"generated_text": "local output"}]
+
+    ai_service.cache_policy_for = lambda content_type, temperature: NO_CACHE
+    ai_service.AIService._run_local = staticmethod(local_stand_in)
+
+    modes = {
+        # Never opens, never retries, no fallback: the behaviour before the breaker
+        "unprotected": (CircuitBreakers(0, 0.2, 5, 0, 0, 10, 2.0, 10, 20, 30, 30, 1), False),
+        "breaker + fallback": (CircuitBreakers(
+            settings.PROVIDER_MAX_RETRIES, 0.2, 5, 0.2, 10, 10, 0.5, 10, 20, 30, args.open_s, 1
+        ), True)
+    }
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    async with running_stub(args.port, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 10, completion_words=40) as base_url:
+        stats_url = base_url.replace("/v1", "/stats")
+        faults_url = base_url.replace("/v1", "/faults")
+        ai_service.openai_provider.base_url = base_url
+        try:
+            for mode, (breakers, fallback) in modes.items():
+                ai_service.circuit_breakers = breakers
+                settings.PROVIDER_LOCAL_FALLBACK = fallback
+                results[mode] = {}
+                for phase, error_rate in (("healthy", 0.0), ("outage", 1.0), ("recovered", 0.0)):
+                    await set_faults(faults_url, error_rate=error_rate, error_delay_ms=args.error_delay_ms)
+                    before = await provider_requests(stats_url)
+                    result = await run_phase(args.clients, args.phase_s)
+                    result["provider"] = await provider_requests(stats_url) - before
+                    results[mode][phase] = result
+                results[mode]["circuit"] = breakers.stats()["circuits"]
+        finally:
+            await close_http_client()
+
+    print(f"{'mode':<20} {'phase':<10} {'ok':>6} {'fallbk':>7} {'errors':>7} {'provider':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, phases in results.items():
+        for phase in ("healthy", "outage", "recovered"):
+            r = phases[phase]
+            print(
+                f"{mode:<20} {phase:<10} {r['ok']:>6} {r['fallback']:>7} {r['errors']:>7} "
+                f"{r['provider']:>9} {r['p50_ms']:>8.1f} {r['p99_ms']:>8.1f}"
+            )
+    for circuit, state in results["breaker + fallback"]["circuit"].items():
+        print(f"\n{circuit}: state={state['state']} opened={state['opened']} rejected={state['rejected']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--phase-s", type=float, default=8.0, help="duration of each phase")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--error-delay-ms", type=float, default=2000.0, help="how long failing requests hang")
+    parser.add_argument("--open-s", type=float, default=3.0, help="breaker open period before a probe")
+    parser.add_argument("--local-ms", type=float, default=50.0, help="latency of the local fallback stand-in")
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
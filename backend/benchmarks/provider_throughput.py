@@ -0,0 +1,76 @@
+# backend/benchmarks/provider_throughput.py
+"""Compare provider-call throughput: pooled async client vs per-call threads.
+
+    python -m benchmarks.provider_throughput --requests 500 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, List
+
+import httpx
+
+from app.providers import OpenAIProvider, close_http_client
+from benchmarks.common import summarize
+from benchmarks.stub_provider import running_stub
+
+MESSAGES = [
+    {"role": "system", "content": "You are a benchmark."},
+    {"role": "user", "content": "Say something."}
+]
+
+
+def legacy_call(base_url: str) -> str:
+    """Blocking call with a fresh connection, like the old to_thread handlers"""
+    with httpx.Client(timeout=60) as client:
+        response = client.post(
+            f"{base_url}/chat/completions",
+            json={"model": "gpt-3.5-turbo", "messages": MESSAGES, "max_tokens": 100, "temperature": 0.7}
+        )
+        return response.json()["choices"][0]["message"]["content"]
+
+
+async def run_load(call: Callable[[], Awaitable[str]], total: int, concurrency: int) -> Dict[str, float]:
+    slots = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+
+    async def one():
+        async with slots:
+            start = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return summarize(latencies, time.perf_counter() - start)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    async with running_stub(args.port, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 5) as base_url:
+        provider = OpenAIProvider(base_url, api_key=None)
+        try:
+            pooled = await run_load(
+                lambda: provider.chat_completion("gpt-3.5-turbo", MESSAGES, 100, 0.7),
+                args.requests, args.concurrency
+            )
+            threaded = await run_load(
+                lambda: asyncio.to_thread(legacy_call, base_url),
+                args.requests, args.concurrency
+            )
+        finally:
+            await close_http_client()
+
+    print(f"{'mode':<10} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, result in (("pooled", pooled), ("threaded", threaded)):
+        print(f"{name:<10} {result['rps']:>10.1f} {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+# backend/benchmarks/rate_limit.py
+"""Database work per rate-limit check: the old `rate_limits` table vs the Redis limiter.
+
+Replays the table-based check that used to run on every /token, /generate and
+/generate/batch call (DELETE expired rows, COUNT, INSERT, COMMIT) and the
+Redis GCRA script that replaced it. It counts SQL statements, commits and
+Redis round-trips per check, and measures latency.
+
+    python -m benchmarks.rate_limit --database-url sqlite:///./bench_ratelimit.db --redis-url redis://localhost:6379 --requests 2000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import redis.asyncio as aredis
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, and_, create_engine, event, func, select
+
+from app.rate_limit import RedisRateLimiter
+from benchmarks.common import summarize
+
+# Mirror of models.RateLimit, so the legacy check can run without the app's models
+metadata = MetaData()
+rate_limits = Table(
+    "rate_limits", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer),
+    Column("endpoint", String),
+    Column("request_count", Integer, default=0),
+    Column("window_start", DateTime, default=datetime.utcnow),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+
+def legacy_check(connection, user_id: int, endpoint: str, limit: int, window_minutes: int) -> bool:
+    """The statements the table-based auth.check_rate_limit issued"""
+    window_start = datetime.utcnow() - timedelta(minutes=window_minutes)
+    with connection.begin():
+        connection.execute(rate_limits.delete().where(rate_limits.c.window_start < window_start))
+        count = connection.execute(
+            select(func.count()).select_from(rate_limits).where(and_(
+                rate_limits.c.user_id == user_id,
+                rate_limits.c.endpoint == endpoint,
+                rate_limits.c.window_start >= window_start
+            ))
+        ).scalar()
+        if count >= limit:
+            return False
+        connection.execute(rate_limits.insert().values(
+            user_id=user_id, endpoint=endpoint, request_count=1, window_start=datetime.utcnow()
+        ))
+    return True
+
+
+def report(name: str, latencies: List[float], elapsed: float, counters: Dict[str, int]):
+    stats = summarize(latencies, elapsed)
+    n = stats["count"]
+    print(
+        f"{name:<16} {counters['statements'] / n:>10.2f} {counters['commits'] / n:>8.2f} "
+        f"{counters['redis'] / n:>8.2f} {stats['p50_ms']:>8.3f} {stats['p99_ms']:>8.3f} {stats['rps']:>9.0f}"
+    )
+
+
+async def main_async(args):
+    engine = create_engine(args.database_url)
+    metadata.create_all(engine)
+    db_counters = {"statements": 0, "commits": 0, "redis": 0}
+    event.listen(engine, "before_cursor_execute", lambda *a: db_counters.__setitem__("statements", db_counters["statements"] + 1))
+    event.listen(engine, "commit", lambda *a: db_counters.__setitem__("commits", db_counters["commits"] + 1))
+
+    print(f"{'limiter':<16} {'SQL/req':>10} {'commit':>8} {'redis':>8} {'p50 ms':>8} {'p99 ms':>8} {'checks/s':>9}")
+
+    latencies: List[float] = []
+    with engine.connect() as connection:
+        start = time.perf_counter()
+        for i in range(args.requests):
+            t = time.perf_counter()
+            legacy_check(connection, i % args.users, "generate", 10**9, 60)
+            latencies.append(time.perf_counter() - t)
+        report("rate_limits table", latencies, time.perf_counter() - start, db_counters)
+
+    client = aredis.Redis.from_url(args.redis_url)
+    redis_counters = {"statements": 0, "commits": 0, "redis": 0}
+    limiter = RedisRateLimiter(client, prefix=f"bench-ratelimit-{uuid.uuid4().hex}")
+    latencies = []
+    start = time.perf_counter()
+    for i in range(args.requests):
+        t = time.perf_counter()
+        await limiter.hit(i % args.users, "generate", 10**9, 60)
+        latencies.append(time.perf_counter() - t)
+        redis_counters["redis"] += 1  # one EVAL per check
+    report("redis GCRA", latencies, time.perf_counter() - start, redis_counters)
+
+    async for key in client.scan_iter(f"{limiter.prefix}:*"):
+        await client.delete(key)
+    await client.aclose()
+    metadata.drop_all(engine)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite:///./bench_ratelimit.db")
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
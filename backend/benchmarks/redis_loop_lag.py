@@ -0,0 +1,100 @@
+# backend/benchmarks/redis_loop_lag.py
+"""Event-loop blocking from Redis: blocking client vs the shared asyncio pool.
+
+Runs concurrent cache lookups (GET + PTTL) against a Redis server while a
+ticker measures how late the event loop wakes it up. With the blocking client
+every round-trip stalls the loop; with the asyncio pool lag should stay near zero.
+
+    python -m benchmarks.redis_loop_lag --redis-url redis://localhost:6379 --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List
+
+import redis
+import redis.asyncio as aredis
+
+from app.redis_pool import pipelined
+from benchmarks.common import percentile, summarize
+
+TICK_SECONDS = 0.001
+
+
+async def ticker(lags: List[float], stop: asyncio.Event):
+    """Record how much later than requested each short sleep returns"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - start - TICK_SECONDS)
+
+
+async def run(lookup, requests: int, concurrency: int) -> Dict[str, float]:
+    lags: List[float] = []
+    latencies: List[float] = []
+    stop = asyncio.Event()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        async with slots:
+            start = time.perf_counter()
+            await lookup(f"bench:loop-lag:{i % 100}")
+            latencies.append(time.perf_counter() - start)
+
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+
+    result = summarize(latencies, elapsed)
+    result["loop_lag_p99_ms"] = percentile(lags, 99) * 1000
+    result["loop_lag_max_ms"] = max(lags, default=0.0) * 1000
+    result["loop_blocked_ms"] = sum(lag for lag in lags if lag > TICK_SECONDS) * 1000
+    return result
+
+
+async def main_async(args):
+    blocking = redis.from_url(args.redis_url)
+    pooled = aredis.Redis(connection_pool=aredis.ConnectionPool.from_url(args.redis_url, max_connections=args.concurrency))
+    for i in range(100):
+        blocking.setex(f"bench:loop-lag:{i}", 300, b"x" * 512)
+
+    async def blocking_lookup(key: str):
+        pipe = blocking.pipeline(transaction=False)
+        pipe.get(key)
+        pipe.pttl(key)
+        pipe.execute()
+
+    async def pooled_lookup(key: str):
+        def build(pipe):
+            pipe.get(key)
+            pipe.pttl(key)
+        await pipelined(build, pooled)
+
+    results = {
+        "blocking client": await run(blocking_lookup, args.requests, args.concurrency),
+        "asyncio pool": await run(pooled_lookup, args.requests, args.concurrency),
+    }
+    await pooled.aclose()
+    blocking.close()
+
+    print(f"{'client':<16} {'rps':>9} {'p50 ms':>8} {'p99 ms':>8} {'lag p99':>8} {'lag max':>8} {'blocked ms':>11}")
+    for name, r in results.items():
+        print(
+            f"{name:<16} {r['rps']:>9.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+            f"{r['loop_lag_p99_ms']:>8.2f} {r['loop_lag_max_ms']:>8.2f} {r['loop_blocked_ms']:>11.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
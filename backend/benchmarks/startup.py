@@ -0,0 +1,110 @@
+# backend/benchmarks/startup.py
+"""Import time and time-to-first-response of the API, with regression gates.
+
+Each measurement runs in a fresh interpreter. Exits non-zero when a budget is
+exceeded or a heavy module is imported by `app.main`, so it can run in CI.
+
+    python -m benchmarks.startup --repeat 3 --max-import-ms 1500 --max-first-response-ms 4000
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that must stay off the import path of app.main
+HEAVY_MODULES = ("torch", "transformers", "reportlab")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import() -> Tuple[float, List[Tuple[int, str]], List[str]]:
+    """Wall time to import app.main, slowest top-level imports, and heavy modules loaded"""
+    probe = (
+        "import sys, app.main; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+
+    top_level = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1:
+            top_level.append((int(match.group(2)), match.group(4)))
+    top_level.sort(reverse=True)
+    heavy = [name for name in result.stdout.strip().split(",") if name]
+    return elapsed, top_level[:10], heavy
+
+
+def measure_first_response(port: int, timeout: float = 120.0) -> float:
+    """Seconds from launching uvicorn until GET / answers 200"""
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, "WARMUP_MODELS": ""}
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {server.returncode}")
+            try:
+                if httpx.get(f"http://127.0.0.1:{port}/", timeout=1).status_code == 200:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            time.sleep(0.02)
+        raise RuntimeError("server did not answer before the timeout")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-first-response-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    imports = []
+    for _ in range(args.repeat):
+        elapsed, slowest, heavy = measure_import()
+        imports.append(elapsed)
+    first_responses = [measure_first_response(args.port) for _ in range(args.repeat)]
+
+    import_ms = statistics.median(imports) * 1000
+    first_response_ms = statistics.median(first_responses) * 1000
+    print(f"import app.main:          {import_ms:8.0f} ms (median of {args.repeat})")
+    print(f"time to first response:   {first_response_ms:8.0f} ms (median of {args.repeat})")
+    print("\nslowest top-level imports (cumulative):")
+    for micros, name in slowest:
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+    if args.max_first_response_ms is not None and first_response_ms > args.max_first_response_ms:
+        failures.append(f"first response took {first_response_ms:.0f} ms > {args.max_first_response_ms:.0f} ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
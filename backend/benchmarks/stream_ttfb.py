@@ -0,0 +1,72 @@
+# backend/benchmarks/stream_ttfb.py
+"""Time-to-first-token for streaming vs buffered completions against the stub.
+
+    python -m benchmarks.stream_ttfb --requests 50 --latency-ms 300 --completion-words 400
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from app.providers import OpenAIProvider, close_http_client
+from benchmarks.common import percentile
+from benchmarks.stub_provider import running_stub
+
+MESSAGES = [
+    {"role": "system", "content": "You are a benchmark."},
+    {"role": "user", "content": "Write a long blog post."}
+]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-interval-ms", type=float, default=20.0)
+    parser.add_argument("--completion-words", type=int, default=400)
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    buffered: List[float] = []
+    first_token: List[float] = []
+    stream_total: List[float] = []
+
+    async with running_stub(
+        args.port,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.latency_ms / 10,
+        completion_words=args.completion_words,
+        token_interval_ms=args.token_interval_ms
+    ) as base_url:
+        provider = OpenAIProvider(base_url, api_key=None)
+        try:
+            async def one_buffered():
+                start = time.perf_counter()
+                await provider.chat_completion("gpt-3.5-turbo", MESSAGES, args.completion_words, 0.7)
+                buffered.append(time.perf_counter() - start)
+
+            async def one_streamed():
+                start = time.perf_counter()
+                first = None
+                async for _ in provider.stream_chat_completion("gpt-3.5-turbo", MESSAGES, args.completion_words, 0.7):
+                    if first is None:
+                        first = time.perf_counter() - start
+                first_token.append(first)
+                stream_total.append(time.perf_counter() - start)
+
+            await asyncio.gather(*(one_buffered() for _ in range(args.requests)))
+            await asyncio.gather(*(one_streamed() for _ in range(args.requests)))
+        finally:
+            await close_http_client()
+
+    print(f"{'metric':<26} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, samples in (
+        ("buffered: full response", buffered),
+        ("streamed: first token", first_token),
+        ("streamed: last token", stream_total)
+    ):
+        print(f"{name:<26} {percentile(samples, 50) * 1000:>10.1f} {percentile(samples, 99) * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,227 @@
+# backend/benchmarks/stub_provider.py
+"""Local OpenAI-compatible stub server for benchmarking without the network.
+
+Run standalone and point the backend at it:
+
+    python -m benchmarks.stub_provider --port 9100 --latency-ms 200
+    OPENAI_BASE_URL=http://127.0.0.1:9100/v1 ANTHROPIC_BASE_URL=http://127.0.0.1:9100/v1 uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def create_app(
+    latency_ms: float = 200.0,
+    jitter_ms: float = 50.0,
+    completion_words: int = 120,
+    token_interval_ms: float = 10.0,
+    max_concurrency: int = 0,
+    retry_after_s: float = 1.0,
+    error_rate: float = 0.0,
+    error_status: int = 500,
+    error_delay_ms: float = 0.0,
+    stall_rate: float = 0.0,
+    stall_ms: float = 0.0,
+    latency_distribution: str = "normal"
+) -> FastAPI:
+    """Build a stub app that answers chat completions after a simulated delay.
+
+    Serves both the OpenAI chat completions and the Anthropic messages routes.
+    Every request waits latency_ms before its first token (normally distributed
+    with jitter_ms, or lognormal with median latency_ms and a long tail that
+    grows with jitter_ms) and token_interval_ms per further token; streaming requests emit tokens as they are "decoded",
+    buffered requests return once the last one is done. With max_concurrency,
+    requests beyond that many in flight get a 429 with Retry-After. A fraction
+    error_rate of requests fails with error_status after error_delay_ms, and a
+    fraction stall_rate waits an extra stall_ms before its first token; the
+    fault settings can be changed while running with POST /faults.
+    """
+    app = FastAPI(title="Stub LLM Provider")
+    app.state.requests_served = 0
+    app.state.requests_throttled = 0
+    app.state.in_flight = 0
+    app.state.requests_failed = 0
+    app.state.requests_stalled = 0
+    app.state.streams_cancelled = 0
+    app.state.faults = {
+        "error_rate": error_rate,
+        "error_status": error_status,
+        "error_delay_ms": error_delay_ms,
+        "stall_rate": stall_rate,
+        "stall_ms": stall_ms
+    }
+
+    def openai_chunk(completion_id: str, model: str, text: str) -> str:
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": text}, "finish_reason": None}]
+        }
+        return f"data: {json.dumps(chunk)}\n\n"
+
+    def anthropic_event(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps({'type': event, **data})}\n\n"
+
+    def stream_chunks(model: str, words: int, anthropic: bool) -> AsyncIterator[str]:
+        async def chunks():
+            completion_id = f"msg-{uuid.uuid4().hex}"
+            try:
+                if anthropic:
+                    yield anthropic_event("message_start", {"message": {"id": completion_id, "model": model}})
+                for i in range(words):
+                    if i:
+                        await asyncio.sleep(token_interval_ms / 1000)
+                    if anthropic:
+                        yield anthropic_event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": f"token{i} "}})
+                    else:
+                        yield openai_chunk(completion_id, model, f"token{i} ")
+                yield anthropic_event("message_stop", {}) if anthropic else "data: [DONE]\n\n"
+            except asyncio.CancelledError:
+                app.state.streams_cancelled += 1
+                raise
+        return chunks()
+
+    async def admit(body: Dict[str, Any], anthropic: bool):
+        if max_concurrency and app.state.in_flight >= max_concurrency:
+            app.state.requests_throttled += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": str(retry_after_s)}
+            )
+        faults = app.state.faults
+        if faults["error_rate"] and random.random() < faults["error_rate"]:
+            await asyncio.sleep(faults["error_delay_ms"] / 1000)
+            app.state.requests_failed += 1
+            return JSONResponse(
+                {"error": {"message": "Injected fault", "type": "server_error"}},
+                status_code=faults["error_status"]
+            )
+        app.state.in_flight += 1
+        try:
+            if faults["stall_rate"] and random.random() < faults["stall_rate"]:
+                app.state.requests_stalled += 1
+                await asyncio.sleep(faults["stall_ms"] / 1000)
+            return await complete(body, anthropic)
+        finally:
+            app.state.in_flight -= 1
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        return await admit(await request.json(), anthropic=False)
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        return await admit(await request.json(), anthropic=True)
+
+    async def complete(body: Dict[str, Any], anthropic: bool):
+        if latency_distribution == "lognormal" and latency_ms > 0:
+            delay = random.lognormvariate(math.log(latency_ms), jitter_ms / latency_ms) / 1000
+        else:
+            delay = max(0.0, random.gauss(latency_ms, jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+        app.state.requests_served += 1
+
+        model = body.get("model", "stub")
+        words = min(completion_words, body.get("max_tokens") or completion_words)
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(model, words, anthropic), media_type="text/event-stream")
+
+        await asyncio.sleep(max(0, words - 1) * token_interval_ms / 1000)
+        content = " ".join(f"token{i}" for i in range(words))
+        if anthropic:
+            return {
+                "id": f"msg-{uuid.uuid4().hex}",
+                "type": "message",
+                "role": "assistant",
+                "model": model,
+                "content": [{"type": "text", "text": content}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 0, "output_tokens": words}
+            }
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": words, "total_tokens": words}
+        }
+
+    @app.post("/faults")
+    async def set_faults(request: Request) -> Dict[str, Any]:
+        app.state.faults.update(await request.json())
+        return app.state.faults
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, Any]:
+        return {
+            "requests_served": app.state.requests_served,
+            "requests_throttled": app.state.requests_throttled,
+            "requests_failed": app.state.requests_failed,
+            "requests_stalled": app.state.requests_stalled,
+            "streams_cancelled": app.state.streams_cancelled
+        }
+
+    return app
+
+
+@asynccontextmanager
+async def running_stub(port: int, **options) -> AsyncIterator[str]:
+    """Serve the stub on the running loop and yield its OpenAI-style base URL"""
+    config = uvicorn.Config(create_app(**options), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    task = asyncio.get_running_loop().create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}/v1"
+    finally:
+        server.should_exit = True
+        await task
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--completion-words", type=int, default=120)
+    parser.add_argument("--token-interval-ms", type=float, default=10.0)
+    parser.add_argument("--max-concurrency", type=int, default=0, help="429 beyond this many in flight (0 = unlimited)")
+    parser.add_argument("--retry-after-s", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--error-delay-ms", type=float, default=0.0, help="how long a failing request hangs first")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="fraction of requests that stall before the first token")
+    parser.add_argument("--stall-ms", type=float, default=0.0)
+    parser.add_argument("--latency-distribution", choices=["normal", "lognormal"], default="normal")
+    args = parser.parse_args()
+
+    app = create_app(
+        args.latency_ms, args.jitter_ms, args.completion_words, args.token_interval_ms,
+        args.max_concurrency, args.retry_after_s, args.error_rate, args.error_status, args.error_delay_ms,
+        args.stall_rate, args.stall_ms, args.latency_distribution
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# backend/benchmarks/summarize_long.py
+"""Map-reduce summarization of a long document against the stub provider.
+
+Builds a synthetic report (headed sections of paragraphs) far larger than one
+chunk and summarizes it through AIService (content type "summary"):
+
+* chunk summaries with concurrency 1 vs --concurrency, cold cache:
+  wall time, chunks, combine rounds and provider calls;
+* the same document with one paragraph edited, warm chunk cache: how many
+  provider calls the edit costs.
+
+The old single-call path could only send what fits one context window; the
+table shows how much of the document that was.
+
+    python -m benchmarks.summarize_long --redis-url redis://localhost:6379 --sections 40 --concurrency 4
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+import httpx
+
+from app import ai_service, tokenizer
+from app.cache_policy import NO_CACHE
+from app.config import settings
+from app.providers import close_http_client
+from app.redis_pool import close_redis
+from app.summarize import MapReduceSummarizer
+from benchmarks.stub_provider import running_stub
+
+MODEL = "gpt-3.5-turbo"
+VOCABULARY = (
+    "revenue growth quarter customers retention churn pipeline forecast margin region product "
+    "launch pricing support latency incidents roadmap hiring budget risk compliance audit"
+).split()
+
+
+def build_report(sections: int, paragraphs: int, seed: int) -> str:
+    rng = random.Random(seed)
+    out = []
+    for s in range(sections):
+        out.append(f"## Section {s + 1}: {rng.choice(VOCABULARY).title()} review")
+        for _ in range(paragraphs):
+            sentences = [
+                " ".join(rng.choice(VOCABULARY) for _ in range(rng.randint(12, 24))).capitalize() + "."
+                for _ in range(rng.randint(4, 8))
+            ]
+            out.append(" ".join(sentences))
+    return "\n\n".join(out)
+
+
+async def provider_calls(stats_url: str) -> int:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(stats_url)).json()["requests_served"]
+
+
+async def summarize(document: str, stats_url: str):
+    before = await provider_calls(stats_url)
+    start = time.perf_counter()
+    await ai_service.AIService.generate_content(document, "summary", model=MODEL, max_tokens=300, temperature=0.3)
+    return time.perf_counter() - start, await provider_calls(stats_url) - before
+
+
+async def main_async(args):
+    settings.REDIS_URL = args.redis_url
+    ai_service.cache_policy_for = lambda content_type, temperature: NO_CACHE
+    document = build_report(args.sections, args.paragraphs, seed=1)
+    doc_tokens = tokenizer.count_tokens(document, MODEL)
+    window = tokenizer.context_window(MODEL)
+    print(f"document: {doc_tokens} tokens; one {MODEL} call could read {min(doc_tokens, window - 300)} of them "
+          f"({min(1.0, (window - 300) / doc_tokens):.0%})\n")
+
+    async with running_stub(args.port, latency_ms=args.latency_ms, jitter_ms=args.latency_ms / 10, completion_words=60) as base_url:
+        stats_url = base_url.replace("/v1", "/stats")
+        ai_service.openai_provider.base_url = base_url
+        try:
+            print(f"{'run':<34} {'seconds':>8} {'provider':>9} {'chunks':>7} {'rounds':>7} {'cached':>7}")
+            for name, concurrency, cache in (
+                ("cold, concurrency 1", 1, None),
+                (f"cold, concurrency {args.concurrency}", args.concurrency, None),
+                ("cold, cache on", args.concurrency, ai_service.generation_cache),
+                ("one paragraph edited, cache warm", args.concurrency, ai_service.generation_cache),
+            ):
+                if name.startswith("one paragraph"):
+                    paragraphs = document.split("\n\n")
+                    paragraphs[len(paragraphs) // 2] += f" Revised figure {uuid.uuid4().hex[:6]}."
+                    document = "\n\n".join(paragraphs)
+                elif cache is not None:
+                    # A fresh salt keeps earlier benchmark runs from warming the cache
+                    document = document + f"\n\nAppendix {uuid.uuid4().hex}"
+                summarizer = MapReduceSummarizer(
+                    settings.SUMMARY_CHUNK_TOKENS, settings.SUMMARY_CHUNK_SUMMARY_TOKENS,
+                    concurrency, 3600, cache=cache
+                )
+                ai_service.summarizer = summarizer
+                seconds, calls = await summarize(document, stats_url)
+                stats = summarizer.stats()
+                print(
+                    f"{name:<34} {seconds:>8.2f} {calls:>9} {stats['chunks']:>7} "
+                    f"{stats['combine_levels']:>7} {stats['chunk_cache_hits']:>7}"
+                )
+        finally:
+            await close_http_client()
+            await close_redis()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--sections", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=6, help="paragraphs per section")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# backend/benchmarks/token_count.py
+"""Token counting cost and accuracy: the old word count vs the tokenizer layer.
+
+For inputs of growing size it times each counter and records its peak
+allocation (tracemalloc): `len(text.split())` (what tokens_used used to be),
+a whole-text tiktoken encode, and the chunked count in app.tokenizer. Without
+tiktoken's encoding files (see TIKTOKEN_CACHE_DIR) only the estimate runs.
+
+    python -m benchmarks.token_count --model gpt-4 --sizes-kb 10,1000,10000
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from typing import Callable
+
+from app import tokenizer
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog content generation model prompt tokens "
+    "internationalization 2024 résumé naïve café, (parenthetical) \"quoted\" e-mail user@example.com"
+).split()
+
+
+def sample_text(size_bytes: int) -> str:
+    rng = random.Random(0)
+    parts, size = [], 0
+    while size < size_bytes:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)
+
+
+def measure(count: Callable[[str], int], text: str):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = count(text)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed * 1000, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="gpt-4")
+    parser.add_argument("--sizes-kb", default="10,1000,10000")
+    args = parser.parse_args()
+
+    encoding = tokenizer.encoding_for_model(args.model)
+    counters = {"words (old)": lambda text: len(text.split())}
+    if isinstance(encoding, tokenizer.TiktokenEncoding):
+        counters["encode whole"] = lambda text: len(encoding._encoding.encode_ordinary(text))
+    counters[f"chunked ({encoding.name})"] = encoding.count
+
+    print(f"{'size':>8} {'counter':<24} {'count':>10} {'ms':>9} {'peak MB':>8}")
+    for size_kb in (int(s) for s in args.sizes_kb.split(",")):
+        text = sample_text(size_kb * 1024)
+        for name, count in counters.items():
+            result, ms, peak = measure(count, text)
+            print(f"{size_kb:>6}KB {name:<24} {result:>10} {ms:>9.1f} {peak:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def run():
+    """Run a coroutine to completion on a fresh event loop"""
+    return asyncio.run
+
+
+@pytest.fixture
+def fake_redis():
+    """In-memory asyncio Redis with Lua scripting (fakeredis + lupa)"""
+    return fakeredis.aioredis.FakeRedis()
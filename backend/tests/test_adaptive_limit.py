@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from app.adaptive_limit import MIN_TIMED_TOKENS, AdaptiveLimit, CallTiming, ProviderThrottle, ThrottleSaturated
+from app.providers import ProviderError
+
+
+def make_limit(initial: int = 4) -> AdaptiveLimit:
+    return AdaptiveLimit("openai:gpt-3.5-turbo", initial, 1, 64, 0.5, 3.0, cooldown=0)
+
+
+def test_saturated_queue_raises_throttle_saturated(run):
+    throttle = ProviderThrottle(1, 1, 1, 0.5, 3.0, queue_timeout=0.05)
+
+    async def scenario():
+        async with throttle.slot("openai", "gpt-3.5-turbo"):
+            with pytest.raises(ThrottleSaturated) as raised:
+                async with throttle.slot("openai", "gpt-3.5-turbo"):
+                    pass
+        return raised.value
+
+    error = run(scenario())
+    assert isinstance(error, ProviderError) and error.status_code == 429
+    stats = throttle.stats()["openai:gpt-3.5-turbo"]
+    # Our own queue timing out says nothing about the provider
+    assert stats["throttled"] == 0 and stats["decreases"] == 0 and stats["in_flight"] == 0
+
+
+def test_provider_429_cuts_the_limit(run):
+    throttle = ProviderThrottle(8, 1, 8, 0.5, 3.0, queue_timeout=1)
+
+    async def scenario():
+        with pytest.raises(ProviderError):
+            async with throttle.slot("openai", "gpt-3.5-turbo"):
+                raise ProviderError("openai", "rate limited", 429)
+
+    run(scenario())
+    stats = throttle.stats()["openai:gpt-3.5-turbo"]
+    assert stats["throttled"] == 1 and stats["limit"] == 4
+
+
+def test_long_completions_at_the_usual_token_rate_are_not_slow():
+    limit = make_limit()
+    for tokens in (20, 50, 100, 400, 1000):
+        limit.on_success(("per_token", 0.02))
+        limit.on_success(("per_token", (0.3 + tokens * 0.02) / tokens))
+    assert limit.slow == 0 and limit.decreases == 0
+
+
+def test_slow_first_token_cuts_the_limit():
+    limit = make_limit()
+    for _ in range(10):
+        limit.on_success(("ttft", 0.3))
+    before = limit.limit
+    limit.on_success(("ttft", 2.0))
+    assert limit.slow == 1 and limit.limit == pytest.approx(before * 0.5)
+
+
+def test_signals_are_compared_separately():
+    limit = make_limit()
+    for _ in range(10):
+        limit.on_success(("per_token", 0.02))
+    # A first sample of another signal has nothing to be compared with
+    limit.on_success(("ttft", 0.5))
+    limit.on_success(None)
+    assert limit.slow == 0
+    assert set(limit.stats()["latency_ewma"]) == {"per_token", "ttft"}
+
+
+def test_call_timing_samples():
+    streamed = CallTiming()
+    streamed.first_token()
+    streamed.output_tokens = 500
+    assert streamed.sample()[0] == "ttft"
+
+    short = CallTiming()
+    short.output_tokens = MIN_TIMED_TOKENS - 1
+    assert short.sample() is None
+
+    long = CallTiming()
+    long.output_tokens = 200
+    signal, per_token = long.sample()
+    assert signal == "per_token" and per_token >= 0
+
+
+def test_streamed_slot_reports_time_to_first_token(run):
+    throttle = ProviderThrottle(4, 1, 8, 0.5, 3.0, queue_timeout=1)
+
+    async def scenario():
+        async with throttle.slot("openai", "gpt-3.5-turbo") as timing:
+            await asyncio.sleep(0.02)
+            timing.first_token()
+            # The rest of the stream does not count towards the sample
+            await asyncio.sleep(0.2)
+
+    run(scenario())
+    ttft = throttle.stats()["openai:gpt-3.5-turbo"]["latency_ewma"]["ttft"]
+    assert 0.015 <= ttft < 0.15
+
+
+def test_each_provider_and_model_has_its_own_cap(run):
+    throttle = ProviderThrottle(2, 1, 2, 0.5, 3.0, queue_timeout=5)
+    in_flight = {}
+    peak = {}
+
+    async def call(provider: str, model: str):
+        key = f"{provider}:{model}"
+        async with throttle.slot(provider, model):
+            in_flight[key] = in_flight.get(key, 0) + 1
+            peak[key] = max(peak.get(key, 0), in_flight[key])
+            await asyncio.sleep(0.02)
+            in_flight[key] -= 1
+
+    async def scenario():
+        await asyncio.gather(*(
+            call(provider, model)
+            for provider, model in [("openai", "gpt-3.5-turbo"), ("openai", "gpt-4"), ("anthropic", "claude-3-haiku")]
+            for _ in range(6)
+        ))
+
+    run(scenario())
+    assert peak == {"openai:gpt-3.5-turbo": 2, "openai:gpt-4": 2, "anthropic:claude-3-haiku": 2}
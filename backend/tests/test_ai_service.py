@@ -0,0 +1,273 @@
+import asyncio
+
+import pytest
+
+from app import ai_service
+from app.adaptive_limit import ThrottleSaturated
+from app.ai_service import AIService, CachePolicy, _token_sink
+from app.circuit_breaker import CircuitOpenError
+from app.providers import ProviderError
+from app.tokenizer import ContextLengthExceeded
+
+NO_CACHE = CachePolicy(False, 0, 0)
+
+
+class Calls:
+    """Fake provider and local fallback for AIService._generate_uncached"""
+
+    def __init__(self, monkeypatch, error: ProviderError, deltas=()):
+        self.local = 0
+
+        async def call_provider(model, messages, max_tokens, temperature, on_delta=None):
+            for delta in deltas:
+                on_delta(delta)
+            raise error
+
+        async def local_fallback(prompt, content_type, max_tokens, temperature):
+            self.local += 1
+            return "local text"
+
+        monkeypatch.setattr(AIService, "_call_provider", call_provider)
+        monkeypatch.setattr(AIService, "_generate_local_fallback", local_fallback)
+        monkeypatch.setattr(ai_service.settings, "PROVIDER_LOCAL_FALLBACK", True)
+
+
+def generate(sink=None):
+    async def scenario():
+        if sink is not None:
+            _token_sink.set(sink)
+        return await AIService._generate_uncached(
+            "key", "id", 0.0, NO_CACHE, "Write a tagline for a bakery", "text", "gpt-3.5-turbo", 50, 0.7, "en", "professional"
+        )
+    return scenario()
+
+
+@pytest.mark.parametrize("error", [
+    ProviderError("openai", "upstream error", 502),
+    ProviderError("openai", "timeout", timed_out=True),
+    CircuitOpenError("openai:gpt-3.5-turbo", "circuit open", 503),
+    ThrottleSaturated("openai", "no capacity for gpt-3.5-turbo within 10s", 429),
+])
+def test_unavailable_provider_falls_back_to_local_model(run, monkeypatch, error):
+    calls = Calls(monkeypatch, error)
+
+    content, model, metadata = run(generate())
+
+    assert content == "local text" and model == "local-text"
+    assert metadata["fallback"]["from_model"] == "gpt-3.5-turbo"
+    assert calls.local == 1
+
+
+@pytest.mark.parametrize("status_code", [400, 401, 403, 404])
+def test_rejected_request_is_not_hidden_by_fallback(run, monkeypatch, status_code):
+    calls = Calls(monkeypatch, ProviderError("openai", "invalid api key", status_code))
+
+    with pytest.raises(ProviderError) as raised:
+        run(generate())
+    assert raised.value.status_code == status_code
+    assert calls.local == 0
+
+
+def test_no_fallback_after_tokens_were_streamed(run, monkeypatch):
+    calls = Calls(monkeypatch, ProviderError("openai", "upstream error", 502), deltas=["Fresh ", "bread"])
+    sent = []
+
+    with pytest.raises(ProviderError):
+        run(generate(sent.append))
+    assert sent == ["Fresh ", "bread"]
+    assert calls.local == 0
+
+
+def test_streamed_failure_before_first_token_falls_back(run, monkeypatch):
+    calls = Calls(monkeypatch, ProviderError("openai", "upstream error", 502))
+    sent = []
+
+    content, model, _ = run(generate(sent.append))
+    assert content == "local text" and calls.local == 1
+
+
+def test_oversized_prompt_is_not_hidden_by_fallback(run, monkeypatch):
+    calls = Calls(monkeypatch, ProviderError("openai", "unused", 502))
+
+    def too_long(messages, model, max_tokens, min_completion, trim):
+        raise ContextLengthExceeded(model, 5000, max_tokens, 4096)
+
+    monkeypatch.setattr(ai_service.tokenizer, "fit_to_context", too_long)
+
+    with pytest.raises(ContextLengthExceeded):
+        run(generate())
+    assert calls.local == 0
+
+
+def fake_generation(monkeypatch, deltas=(), content="Fresh bread daily", error=None, gate=None):
+    async def generate_content(**kwargs):
+        sink = _token_sink.get()
+        for delta in deltas:
+            sink(delta)
+        if gate is not None:
+            await gate.wait()
+        if error is not None:
+            raise error
+        return content, kwargs["model"], {"tokens_used": 3}
+
+    monkeypatch.setattr(AIService, "generate_content", generate_content)
+
+
+def collect(**kwargs):
+    async def scenario():
+        return [event async for event in AIService.generate_content_stream(**kwargs)]
+    return scenario()
+
+
+def test_stream_yields_tokens_then_done(run, monkeypatch):
+    fake_generation(monkeypatch, deltas=["Fresh ", "bread ", "daily"])
+
+    events = run(collect(prompt="Write a tagline", model="gpt-3.5-turbo"))
+
+    assert [e["text"] for e in events[:-1]] == ["Fresh ", "bread ", "daily"]
+    assert events[-1] == {"event": "done", "content": "Fresh bread daily", "model": "gpt-3.5-turbo", "metadata": {"tokens_used": 3}}
+
+
+def test_unstreamed_result_is_sent_as_one_token(run, monkeypatch):
+    fake_generation(monkeypatch, content="Cached tagline")
+
+    events = run(collect(prompt="Write a tagline", model="gpt-3.5-turbo"))
+
+    assert [e["event"] for e in events] == ["token", "done"]
+    assert events[0]["text"] == "Cached tagline"
+
+
+def test_stream_raises_the_generation_error_after_its_tokens(run, monkeypatch):
+    fake_generation(monkeypatch, deltas=["Fresh "], error=ProviderError("openai", "upstream error", 502))
+    seen = []
+
+    async def scenario():
+        async for event in AIService.generate_content_stream(prompt="Write a tagline", model="gpt-3.5-turbo"):
+            seen.append(event)
+
+    with pytest.raises(ProviderError):
+        run(scenario())
+    assert seen == [{"event": "token", "text": "Fresh "}]
+
+
+def test_closing_the_stream_cancels_the_generation(run, monkeypatch):
+    async def scenario():
+        gate = asyncio.Event()
+        fake_generation(monkeypatch, deltas=["Fresh "], gate=gate)
+        tasks = set(asyncio.all_tasks())
+        stream = AIService.generate_content_stream(prompt="Write a tagline", model="gpt-3.5-turbo")
+        first = await stream.__anext__()
+        generation = (asyncio.all_tasks() - tasks - {asyncio.current_task()}).pop()
+        await stream.aclose()
+        await asyncio.sleep(0)
+        return first, generation
+
+    first, generation = run(scenario())
+    assert first == {"event": "token", "text": "Fresh "}
+    assert generation.cancelled()
+
+
+def test_sink_does_not_leak_out_of_the_stream(run, monkeypatch):
+    fake_generation(monkeypatch, deltas=["Fresh "])
+
+    async def scenario():
+        await collect(prompt="Write a tagline", model="gpt-3.5-turbo")
+        return _token_sink.get()
+
+    assert run(scenario()) is None
+
+
+class Generations:
+    """generate_content stand-in that tracks how many calls are in flight"""
+
+    def __init__(self, monkeypatch, delay: float = 0.01):
+        self.in_flight = self.peak = 0
+        self.cancelled = 0
+        self.delay = delay
+
+        async def generate_content(prompt, **kwargs):
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            try:
+                await asyncio.sleep(self.delay)
+            except asyncio.CancelledError:
+                self.cancelled += 1
+                raise
+            finally:
+                self.in_flight -= 1
+            return f"content for {prompt}", "gpt-3.5-turbo", {}
+
+        monkeypatch.setattr(AIService, "generate_content", generate_content)
+
+
+def requests(count: int):
+    return ({"prompt": f"prompt {i}", "content_type": "text"} for i in range(count))
+
+
+def test_batch_stream_bounds_items_in_flight_and_yields_each_once(run, monkeypatch):
+    generations = Generations(monkeypatch)
+    monkeypatch.setattr(ai_service.settings, "BATCH_CONCURRENCY", 3)
+
+    async def scenario():
+        return [group async for group in AIService.generate_batch_stream(requests(10), 4, 1.0)]
+
+    groups = run(scenario())
+
+    assert generations.peak == 3
+    # A group is sent once it reaches 4, so it holds at most 3 more than that
+    assert all(len(group) < 4 + 3 for group in groups)
+    assert sorted(index for group in groups for index, _ in group) == list(range(10))
+    assert all(result["content"] == f"content for prompt {index}" for group in groups for index, result in group)
+
+
+def test_closing_the_batch_stream_cancels_items_in_flight(run, monkeypatch):
+    generations = Generations(monkeypatch, delay=10)
+
+    async def scenario():
+        stream = AIService.generate_batch_stream(requests(5), 10, 0.01)
+        waiting = asyncio.create_task(stream.__anext__())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.gather(waiting, return_exceptions=True)
+        await stream.aclose()
+        await asyncio.sleep(0)
+
+    run(scenario())
+    assert generations.cancelled == 5 and generations.in_flight == 0
+
+
+def test_batch_runs_items_concurrently_and_keeps_input_order(run, monkeypatch):
+    delays = {"prompt 0": 0.15, "prompt 1": 0.05, "prompt 2": 0.1}
+
+    async def generate_content(prompt, **kwargs):
+        await asyncio.sleep(delays.get(prompt, 0.01))
+        if prompt == "prompt 3":
+            raise ProviderError("openai", "invalid request", 400)
+        return f"content for {prompt}", "gpt-3.5-turbo", {"tokens_used": 3}
+
+    monkeypatch.setattr(AIService, "generate_content", generate_content)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        results = await AIService.generate_batch_content(list(requests(6)))
+        return results, loop.time() - start
+
+    results, elapsed = run(scenario())
+
+    # Wall time tracks the slowest item, not the sum
+    assert elapsed < 0.25
+    assert [r["success"] for r in results] == [True, True, True, False, True, True]
+    assert [r["content"] for r in results if r["success"]] == [f"content for prompt {i}" for i in (0, 1, 2, 4, 5)]
+    assert "invalid request" in results[3]["error"]
+    assert results[3]["request"] == {"prompt": "prompt 3", "content_type": "text"}
+
+
+def test_batch_concurrency_is_capped_by_the_setting(run, monkeypatch):
+    generations = Generations(monkeypatch)
+    monkeypatch.setattr(ai_service.settings, "BATCH_CONCURRENCY", 4)
+
+    results = run(AIService.generate_batch_content(list(requests(12))))
+
+    assert generations.peak == 4
+    assert [r["content"] for r in results] == [f"content for prompt {i}" for i in range(12)]
@@ -0,0 +1,217 @@
+import asyncio
+import json
+
+import pytest
+
+from app.ai_service import ContentType
+from app.cache import CODEC_NONE, CODEC_ZLIB, CODEC_ZSTD, FRAME_MAGIC, CacheCodec, GenerationCache, LocalLRU
+
+
+def entry(content_type: ContentType, words: int = 40):
+    return {
+        "content": " ".join(f"{content_type.value}-word{i}" for i in range(words)),
+        "model": "gpt-3.5-turbo",
+        "metadata": {"content_type": content_type.value, "tokens_used": words, "generation_time": 0.42, "tags": ["a", "b"]},
+        "fresh_until": 1700000000.5
+    }
+
+
+@pytest.mark.parametrize("content_type", list(ContentType))
+def test_round_trip_each_content_type(content_type):
+    codec = CacheCodec()
+    value = entry(content_type)
+    raw, size = codec.encode(value)
+    assert raw[0] == FRAME_MAGIC
+    assert codec.decode(raw) == (value, size)
+
+
+@pytest.mark.parametrize("compression, codec_id", [("zstd", CODEC_ZSTD), ("zlib", CODEC_ZLIB)])
+def test_compresses_above_threshold(compression, codec_id):
+    codec = CacheCodec(compression, threshold_bytes=256)
+    value = entry(ContentType.BLOG_POST, words=400)
+    raw, size = codec.encode(value)
+    assert raw[2] == codec_id
+    assert len(raw) < size
+    assert codec.decode(raw) == (value, size)
+
+
+def test_small_entries_stay_uncompressed():
+    codec = CacheCodec("zstd", threshold_bytes=4096)
+    value = entry(ContentType.SOCIAL_MEDIA, words=5)
+    raw, size = codec.encode(value)
+    assert raw[2] == CODEC_NONE
+    assert len(raw) == size + 3
+    assert codec.decode(raw) == (value, size)
+
+
+def test_reads_legacy_json_entries():
+    value = entry(ContentType.EMAIL)
+    legacy = json.dumps(value).encode()
+    assert CacheCodec().decode(legacy) == (value, len(legacy))
+
+
+def test_json_write_format_is_readable_by_binary_readers():
+    value = entry(ContentType.CODE)
+    raw, _ = CacheCodec(write_format="json").encode(value)
+    assert CacheCodec().decode(raw)[0] == value
+
+
+def frames():
+    raw, _ = CacheCodec(threshold_bytes=0).encode(entry(ContentType.TEXT, words=200))
+    return {
+        "magic only": raw[:1],
+        "header only": raw[:3],
+        "truncated body": raw[:len(raw) // 2],
+        "corrupt body": raw[:3] + b"\x00" * (len(raw) - 3),
+        "unknown version": bytes((FRAME_MAGIC, 99)) + raw[2:],
+        "not json": b"{not json",
+    }
+
+
+@pytest.mark.parametrize("name", list(frames()))
+def test_unreadable_entries_are_cache_misses(run, fake_redis, name):
+    cache = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+
+    async def scenario():
+        await fake_redis.set("key", frames()[name], ex=60)
+        return await cache.get("key")
+
+    assert run(scenario()) is None
+    assert cache.redis_misses == 1 and cache.redis_hits == 0
+
+
+def test_cache_round_trip_through_redis(run, fake_redis):
+    cache = GenerationCache(2**20, "test-invalidations", local_enabled=False, redis_client=fake_redis)
+    value = entry(ContentType.SUMMARY, words=500)
+
+    async def scenario():
+        await cache.set("key", value, 60)
+        return await cache.get("key")
+
+    assert run(scenario()) == value
+    assert cache.redis_hits == 1
+
+
+def test_local_tier_answers_hot_keys_without_redis(run, fake_redis):
+    cache = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+    value = entry(ContentType.TEXT)
+
+    async def scenario():
+        await cache.set("key", value, 60)
+        # Gone from Redis, still served from this process
+        await fake_redis.delete("key")
+        return await cache.get("key")
+
+    assert run(scenario()) == value
+    assert cache.stats()["local"]["hits"] == 1
+    assert cache.stats()["redis"] == {"hits": 0, "misses": 0}
+
+
+def test_redis_hit_fills_the_local_tier_with_the_remaining_ttl(run, fake_redis, monkeypatch):
+    cache = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+    writer = GenerationCache(2**20, "test-invalidations", local_enabled=False, redis_client=fake_redis)
+    ttls = []
+    set_local = cache.local.set
+    monkeypatch.setattr(cache.local, "set", lambda key, value, size, ttl: ttls.append(ttl) or set_local(key, value, size, ttl))
+
+    async def scenario():
+        await writer.set("key", entry(ContentType.TEXT), 30)
+        first = await cache.get("key")
+        second = await cache.get("key")
+        return first is second
+
+    assert run(scenario())
+    assert len(ttls) == 1 and 29 < ttls[0] <= 30
+    assert (cache.redis_hits, cache.local_hits, cache.local_misses) == (1, 1, 1)
+
+
+def test_local_tier_is_capped_by_bytes_and_evicts_least_recently_used():
+    lru = LocalLRU(max_bytes=100)
+    lru.set("a", "A", 40, 60)
+    lru.set("b", "B", 40, 60)
+    assert lru.get("a") == "A"
+    lru.set("c", "C", 40, 60)
+
+    assert lru.get("b") is None
+    assert (lru.get("a"), lru.get("c")) == ("A", "C")
+    assert lru.size_bytes == 80 and lru.evictions == 1
+
+    lru.set("huge", "H", 101, 60)
+    assert lru.get("huge") is None and len(lru) == 2
+
+
+def test_local_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.cache.time.monotonic", lambda: now[0])
+    lru = LocalLRU(max_bytes=100)
+    lru.set("key", "value", 10, 5)
+    assert lru.get("key") == "value"
+    now[0] += 5
+    assert lru.get("key") is None and lru.size_bytes == 0
+
+
+async def until(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out waiting for an invalidation"
+        await asyncio.sleep(0.01)
+
+
+def test_writes_on_one_pod_drop_local_copies_on_the_others(run, fake_redis):
+    pod_a = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+    pod_b = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+
+    async def scenario():
+        pod_b.start_listener()
+        try:
+            await asyncio.sleep(0.05)
+            await pod_a.set("key", {"content": "old"}, 60)
+            # pod_b caches it locally, then pod_a overwrites it
+            assert await pod_b.get("key") == {"content": "old"}
+            await pod_a.set("key", {"content": "new"}, 60)
+            await until(lambda: pod_b.invalidations_received == 2)
+            return await pod_b.get("key")
+        finally:
+            await pod_b.stop_listener()
+
+    assert run(scenario()) == {"content": "new"}
+    assert pod_b.local_hits == 0 and pod_b.redis_hits == 2
+
+
+def test_invalidate_removes_the_entry_everywhere(run, fake_redis):
+    pod_a = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+    pod_b = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+
+    async def scenario():
+        pod_b.start_listener()
+        try:
+            await asyncio.sleep(0.05)
+            await pod_a.set("key", {"content": "value"}, 60)
+            await until(lambda: pod_b.invalidations_received == 1)
+            await pod_b.get("key")
+            await pod_a.invalidate("key")
+            await until(lambda: pod_b.invalidations_received == 2)
+            return await pod_a.get("key"), await pod_b.get("key")
+        finally:
+            await pod_b.stop_listener()
+
+    assert run(scenario()) == (None, None)
+    assert len(pod_b.local) == 0
+
+
+def test_a_pod_ignores_its_own_invalidations(run, fake_redis):
+    cache = GenerationCache(2**20, "test-invalidations", redis_client=fake_redis)
+
+    async def scenario():
+        cache.start_listener()
+        try:
+            await asyncio.sleep(0.05)
+            await cache.set("key", {"content": "value"}, 60)
+            await asyncio.sleep(0.1)
+            await fake_redis.delete("key")
+            return await cache.get("key")
+        finally:
+            await cache.stop_listener()
+
+    assert run(scenario()) == {"content": "value"}
+    assert cache.invalidations_received == 0 and cache._listener is None
@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+
+from app import ai_service
+from app.ai_service import AIService
+from app.cache import GenerationCache
+from app.cache_policy import CACHE_POLICIES, DEFAULT_POLICIES, NO_CACHE, cache_policy_for, temperature_band
+from app.config import settings
+from app.singleflight import SingleFlight
+
+PROMPT = "Write a tagline for a bakery"
+
+
+@pytest.mark.parametrize("temperature, band", [(0.0, "low"), (0.3, "low"), (0.31, "medium"), (0.8, "medium"), (0.81, "high"), (2.0, "high")])
+def test_temperature_bands(temperature, band):
+    assert temperature_band(temperature) == band
+
+
+def test_deterministic_types_are_cached_longer_than_creative_ones():
+    translation = cache_policy_for("translation", 1.0)
+    assert translation.cache and translation.ttl == settings.CACHE_TTL * 24
+    assert cache_policy_for("summary", 0.2).ttl > cache_policy_for("summary", 1.0).ttl
+    assert cache_policy_for("creative_writing", 0.2).ttl < cache_policy_for("summary", 0.2).ttl
+
+
+@pytest.mark.parametrize("content_type", ["code", "creative_writing", "social_media", "ad_copy", "marketing_copy"])
+def test_high_temperature_output_is_not_cached_where_variety_matters(content_type):
+    assert cache_policy_for(content_type, 1.0) == NO_CACHE
+
+
+def test_unlisted_types_use_the_default_policies():
+    assert "text" not in CACHE_POLICIES
+    for temperature, band in [(0.2, "low"), (0.7, "medium"), (1.0, "high")]:
+        assert cache_policy_for("text", temperature) == DEFAULT_POLICIES[band]
+
+
+class Provider:
+    """Hosted provider stand-in that answers with a numbered version, optionally held on a gate"""
+    name = "openai"
+    api_key = "test"
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+        self.gate = None
+
+    async def chat_completion(self, model, messages, max_tokens, temperature):
+        self.calls += 1
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("provider down")
+        return f"Fresh bread, version {self.calls}"
+
+
+@pytest.fixture
+def provider(monkeypatch, fake_redis):
+    provider = Provider()
+    monkeypatch.setitem(ai_service.hosted_providers, "openai", provider)
+    monkeypatch.setattr(ai_service, "generation_cache", GenerationCache(2**20, "test-invalidations", local_enabled=False, redis_client=fake_redis))
+    monkeypatch.setattr(ai_service, "single_flight", SingleFlight(5000, 5.0, 0.01, redis_client=fake_redis))
+    monkeypatch.setattr(ai_service.near_duplicates, "enabled", False)
+    return provider
+
+
+def generate(content_type: str = "technical_documentation", temperature: float = 0.2):
+    return AIService.generate_content(PROMPT, content_type, "gpt-3.5-turbo", max_tokens=50, temperature=temperature)
+
+
+def cache_key(content_type: str = "technical_documentation", temperature: float = 0.2) -> str:
+    return AIService.get_cache_key(
+        PROMPT, content_type, "gpt-3.5-turbo", max_tokens=50, temperature=temperature, language="en", style="professional"
+    )
+
+
+async def expire(key: str):
+    """Move a cached entry past its fresh period, leaving it in its stale window"""
+    cached = await ai_service.generation_cache.get(key)
+    await ai_service.generation_cache.set(key, {**cached, "fresh_until": 0}, 60)
+
+
+async def refreshed():
+    await asyncio.gather(*ai_service._refresh_tasks)
+
+
+def test_entry_is_kept_through_its_stale_window(run, provider, fake_redis):
+    policy = cache_policy_for("technical_documentation", 0.2)
+
+    async def scenario():
+        first = await generate()
+        second = await generate()
+        return first, second, await fake_redis.ttl(cache_key())
+
+    first, second, ttl = run(scenario())
+    assert first[0] == second[0] == "Fresh bread, version 1"
+    assert provider.calls == 1
+    assert policy.ttl + policy.stale_ttl - 2 <= ttl <= policy.ttl + policy.stale_ttl
+
+
+def test_uncacheable_generations_always_reach_the_provider(run, provider, fake_redis):
+    async def scenario():
+        await generate("creative_writing", 1.0)
+        await generate("creative_writing", 1.0)
+        return await fake_redis.exists(cache_key("creative_writing", 1.0))
+
+    assert run(scenario()) == 0
+    assert provider.calls == 2
+
+
+def test_stale_entry_is_served_at_once_and_refreshed_in_the_background(run, provider):
+    async def scenario():
+        await generate()
+        await expire(cache_key())
+        provider.gate = asyncio.Event()
+        # The refresh is held at the provider, yet stale callers are answered
+        stale = await asyncio.wait_for(asyncio.gather(*(generate() for _ in range(5))), timeout=1)
+        provider.gate.set()
+        await refreshed()
+        return stale, await generate()
+
+    stale, fresh = run(scenario())
+    assert {content for content, _, _ in stale} == {"Fresh bread, version 1"}
+    assert fresh[0] == "Fresh bread, version 2"
+    # One refresh for all five stale hits
+    assert provider.calls == 2
+    assert ai_service.generation_cache.stale_hits == 5
+    assert ai_service.generation_cache.refreshes == 5
+
+
+def test_failed_refresh_keeps_serving_the_stale_entry(run, provider):
+    async def scenario():
+        await generate()
+        await expire(cache_key())
+        provider.fail = True
+        first = await generate()
+        await refreshed()
+        second = await generate()
+        await refreshed()
+        return first, second
+
+    first, second = run(scenario())
+    assert first[0] == second[0] == "Fresh bread, version 1"
+    assert ai_service.generation_cache.refreshes == 0
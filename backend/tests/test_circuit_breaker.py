@@ -0,0 +1,59 @@
+import pytest
+
+from app.adaptive_limit import ThrottleSaturated
+from app.circuit_breaker import CLOSED, OPEN, CircuitBreakers, CircuitOpenError, is_provider_failure
+from app.providers import ProviderError
+
+
+def make_breakers() -> CircuitBreakers:
+    # Retry up to twice with no delay; open once 2 of the last 4 calls failed
+    return CircuitBreakers(2, 0, 0, 1.0, 10, 60, 0.5, 2, 4, 60, 30, 1)
+
+
+@pytest.mark.parametrize("error, failure", [
+    (ProviderError("openai", "rate limited", 429), True),
+    (ProviderError("openai", "bad gateway", 502), True),
+    (ProviderError("openai", "timeout", timed_out=True), True),
+    (ProviderError("openai", "connection reset"), True),
+    (ProviderError("openai", "bad request", 400), False),
+    (CircuitOpenError("openai:gpt-3.5-turbo", "circuit open", 503), False),
+    (ThrottleSaturated("openai", "no capacity for gpt-3.5-turbo within 10s", 429), False),
+])
+def test_is_provider_failure(error, failure):
+    assert is_provider_failure(error) is failure
+
+
+def failing(error: ProviderError, calls: list):
+    async def attempt():
+        calls.append(1)
+        raise error
+    return attempt
+
+
+def test_throttle_saturation_is_neither_retried_nor_counted(run):
+    breakers = make_breakers()
+    calls = []
+
+    async def scenario():
+        for _ in range(4):
+            with pytest.raises(ThrottleSaturated):
+                await breakers.call("openai", "gpt-3.5-turbo", failing(ThrottleSaturated("openai", "no capacity", 429), calls))
+
+    run(scenario())
+    assert len(calls) == 4
+    assert breakers.retries == 0
+    stats = breakers.stats()["circuits"]["openai:gpt-3.5-turbo"]
+    assert stats["state"] == CLOSED and stats["recent_calls"] == 0
+
+
+def test_provider_429s_are_retried_and_open_the_circuit(run):
+    breakers = make_breakers()
+    calls = []
+
+    async def scenario():
+        with pytest.raises(ProviderError):
+            await breakers.call("openai", "gpt-3.5-turbo", failing(ProviderError("openai", "rate limited", 429), calls))
+
+    run(scenario())
+    assert len(calls) == 2
+    assert breakers.breaker_for("openai", "gpt-3.5-turbo").state == OPEN
@@ -0,0 +1,50 @@
+import io
+
+import pytest
+
+from app import cpu_inference
+from app.cpu_inference import cpu_limit, thread_settings
+
+
+def cgroup(monkeypatch, files, cpus: int = 16):
+    """Serve the given /sys/fs/cgroup files; any other path does not exist"""
+    def fake_open(path, *args, **kwargs):
+        if path not in files:
+            raise FileNotFoundError(path)
+        return io.StringIO(files[path])
+
+    monkeypatch.setattr(cpu_inference, "open", fake_open, raising=False)
+    monkeypatch.setattr(cpu_inference.os, "sched_getaffinity", lambda pid: set(range(cpus)))
+
+
+@pytest.mark.parametrize("files, expected", [
+    ({"/sys/fs/cgroup/cpu.max": "150000 100000\n"}, 1.5),
+    ({"/sys/fs/cgroup/cpu.max": "max 100000\n"}, 16.0),
+    ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "200000\n", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n"}, 2.0),
+    ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1\n", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000\n"}, 16.0),
+    ({}, 16.0),
+])
+def test_cpu_limit_reads_the_cgroup_quota(monkeypatch, files, expected):
+    cgroup(monkeypatch, files)
+    assert cpu_limit() == expected
+
+
+@pytest.mark.parametrize("limit, workers, expected", [
+    (16.0, 1, (16, 1)),
+    (16.0, 4, (4, 1)),
+    (2.0, 1, (2, 1)),
+    (1.5, 1, (1, 1)),
+    # Never below one thread, even with more workers than CPUs
+    (1.0, 4, (1, 1)),
+    (4.0, 0, (4, 1)),
+])
+def test_threads_are_split_across_workers_within_the_cpu_limit(monkeypatch, limit, workers, expected):
+    monkeypatch.setattr(cpu_inference, "cpu_limit", lambda: limit)
+    assert thread_settings(workers) == expected
+
+
+def test_explicit_thread_counts_win(monkeypatch):
+    monkeypatch.setattr(cpu_inference, "cpu_limit", lambda: 16.0)
+    assert thread_settings(4, intra_op=3, inter_op=2) == (3, 2)
+    assert thread_settings(4, intra_op=3) == (3, 1)
+    assert thread_settings(4, inter_op=2) == (4, 2)
@@ -0,0 +1,86 @@
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import crud, models, schemas
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(models.User(id=1, username="alice", email="alice@example.com"))
+        session.add(models.UserAnalytics(user_id=1, total_generations=0, total_tokens_used=0))
+        session.commit()
+    statements: List[str] = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    with Session(engine) as session:
+        session.info["statements"] = statements
+        yield session
+
+
+def request(prompt: str = "Write a tagline for a coffee shop") -> schemas.GenerateRequest:
+    return schemas.GenerateRequest(prompt=prompt, content_type="text", tags=["coffee"], metadata={"source": "test"})
+
+
+def analytics(db: Session) -> models.UserAnalytics:
+    db.expire_all()
+    return db.query(models.UserAnalytics).filter(models.UserAnalytics.user_id == 1).one()
+
+
+def test_save_generated_content_returns_inserted_row(db):
+    user = db.get(models.User, 1)
+    db.info["statements"].clear()
+
+    content = crud.save_generated_content(
+        db, user, request(), "Fresh coffee, fresher ideas", "gpt-3.5-turbo", {"generation_time": 1.5, "tokens_used": 12}
+    )
+
+    assert content.id is not None
+    assert content.generated_content == "Fresh coffee, fresher ideas"
+    assert content.content_metadata == {"source": "test", "generation_time": 1.5, "tokens_used": 12}
+    assert content.status == models.ContentStatus.GENERATED
+    assert schemas.Content.model_validate(content).metadata["tokens_used"] == 12
+    statements = [sql.split()[0] for sql in db.info["statements"]]
+    assert statements == ["INSERT", "UPDATE"]
+    assert "RETURNING" in db.info["statements"][0]
+
+
+def test_save_generated_content_updates_analytics_in_place(db):
+    user = db.get(models.User, 1)
+    crud.save_generated_content(db, user, request(), "one", "gpt-3.5-turbo", {"generation_time": 2.0, "tokens_used": 10})
+    crud.save_generated_content(db, user, request(), "two", "gpt-3.5-turbo", {"generation_time": 4.0, "tokens_used": 30})
+
+    row = analytics(db)
+    assert row.total_generations == 2
+    assert row.total_tokens_used == 40
+    assert row.average_generation_time == pytest.approx(3.0)
+    assert row.last_generation_date is not None
+
+
+def test_save_batch_contents_returns_ids_in_order(db):
+    items = [
+        (request(f"prompt {i}"), {"content": f"result {i}", "model": "gpt-3.5-turbo", "metadata": {"generation_time": 1.0, "tokens_used": i}})
+        for i in range(5)
+    ]
+    db.info["statements"].clear()
+
+    ids = crud.save_batch_contents(db, 1, items)
+
+    assert len(ids) == 5
+    rows = {row.id: row for row in db.query(models.Content).filter(models.Content.id.in_(ids))}
+    assert [rows[content_id].generated_content for content_id in ids] == [f"result {i}" for i in range(5)]
+    updates = [sql for sql in db.info["statements"] if sql.startswith("UPDATE")]
+    assert len(updates) == 1 and "user_analytics" in updates[0]
+    row = analytics(db)
+    assert row.total_generations == 5
+    assert row.total_tokens_used == sum(range(5))
+
+
+def test_save_batch_contents_empty(db):
+    db.info["statements"].clear()
+    assert crud.save_batch_contents(db, 1, []) == []
+    assert db.info["statements"] == []
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app import ai_service
+from app.ai_service import AIService, CachePolicy
+from app.hedging import Hedger
+from app.providers import ProviderError
+
+
+class Stream:
+    """Fake streaming call: each model waits its first-token delay, then streams its deltas"""
+
+    def __init__(self, delays, errors=None):
+        self.delays = delays
+        self.errors = errors or {}
+        self.started = []
+        self.cancelled = []
+
+    async def __call__(self, model, on_delta):
+        self.started.append(model)
+        try:
+            await asyncio.sleep(self.delays[model])
+            if model in self.errors:
+                raise self.errors[model]
+            for delta in (f"{model} ", "answer"):
+                on_delta(delta)
+                await asyncio.sleep(0.01)
+            return f"{model} answer"
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+
+
+def race(run, stream, deadline=0.05, sink=None):
+    hedger = Hedger({"default": deadline * 1000}, {"primary": "backup"}, enabled=True)
+    result = run(hedger.race("primary", "backup", deadline, stream, sink))
+    return result, hedger.stats()
+
+
+def test_fast_primary_is_not_hedged(run):
+    stream = Stream({"primary": 0.0, "backup": 0.0})
+
+    (text, model, hedged), stats = race(run, stream)
+
+    assert (text, model, hedged) == ("primary answer", "primary", False)
+    assert stream.started == ["primary"]
+    assert stats["hedged"] == 0
+
+
+def test_slow_primary_loses_to_backup_and_is_cancelled(run):
+    stream = Stream({"primary": 1.0, "backup": 0.0})
+    sent = []
+
+    (text, model, hedged), stats = race(run, stream, sink=sent.append)
+
+    assert (text, model, hedged) == ("backup answer", "backup", True)
+    assert stream.cancelled == ["primary"]
+    # Only the winner's tokens reach the client
+    assert sent == ["backup ", "answer"]
+    assert stats["backup_wins"] == 1 and stats["cancelled"] == 1
+
+
+def test_primary_first_token_after_hedge_still_wins(run):
+    stream = Stream({"primary": 0.08, "backup": 1.0})
+
+    (text, model, hedged), stats = race(run, stream)
+
+    assert (model, hedged) == ("primary", True)
+    assert stream.cancelled == ["backup"]
+
+
+def test_primary_failing_before_deadline_is_not_hedged(run):
+    stream = Stream({"primary": 0.0, "backup": 0.0}, errors={"primary": ProviderError("openai", "bad request", 400)})
+
+    with pytest.raises(ProviderError):
+        race(run, stream)
+    assert stream.started == ["primary"]
+
+
+def test_backup_answers_when_hedged_primary_fails(run):
+    stream = Stream({"primary": 0.1, "backup": 0.2}, errors={"primary": ProviderError("openai", "upstream error", 502)})
+
+    (text, model, hedged), _ = race(run, stream)
+
+    assert (model, hedged) == ("backup", True)
+
+
+def test_non_hosted_backup_is_not_raced(run, monkeypatch):
+    calls = []
+
+    async def call_provider(model, messages, max_tokens, temperature, on_delta=None):
+        calls.append(model)
+        return "Fresh bread daily"
+
+    monkeypatch.setattr(ai_service, "hedger", Hedger({"default": 10}, {"gpt-3.5-turbo": "local-text"}, enabled=True))
+    monkeypatch.setattr(AIService, "_call_provider", call_provider)
+
+    content, model, metadata = run(AIService._generate_uncached(
+        "key", "id", 0.0, CachePolicy(False, 0, 0), "Write a tagline for a bakery", "text",
+        "gpt-3.5-turbo", 50, 0.7, "en", "professional"
+    ))
+
+    assert content == "Fresh bread daily" and model == "gpt-3.5-turbo"
+    assert calls == ["gpt-3.5-turbo"]
+    assert "hedge" not in metadata
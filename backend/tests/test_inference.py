@@ -0,0 +1,115 @@
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app import ai_service, auth, inference, main, schemas
+from app.inference import InferenceError, InferenceExecutor, InferenceQueueFull, InferenceTimeout
+
+
+class BrokenPool:
+    _broken = True
+
+    def submit(self, *args, **kwargs):
+        raise BrokenProcessPool("A child process terminated abruptly")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+class Manager:
+    def dict(self):
+        return {}
+
+    def Queue(self):
+        raise AssertionError("no streaming in these tests")
+
+    def shutdown(self):
+        pass
+
+
+def broken_executor(max_pending: int = 2) -> InferenceExecutor:
+    executor = InferenceExecutor(1, max_pending, 10, 2**20)
+    executor._pool, executor._manager, executor._cancelled = BrokenPool(), Manager(), {}
+    return executor
+
+
+def test_failed_submit_releases_its_pending_slot(run, monkeypatch):
+    executor = broken_executor()
+    # Keep the broken pool in place to see pending settle after each failure
+    monkeypatch.setattr(executor, "start", lambda: None)
+
+    async def scenario():
+        for _ in range(5):
+            with pytest.raises(InferenceError, match="crashed"):
+                await executor.run("text_generator", "hello")
+
+    run(scenario())
+    assert executor.pending == 0
+
+
+def test_broken_pool_is_replaced_on_next_start(monkeypatch):
+    created = []
+
+    class Pool:
+        _broken = False
+
+        def __init__(self, **kwargs):
+            created.append(self)
+
+    context = SimpleNamespace(Manager=Manager)
+    monkeypatch.setattr(inference, "ProcessPoolExecutor", Pool)
+    monkeypatch.setattr(inference.multiprocessing, "get_context", lambda method: context)
+    executor = broken_executor()
+    assert executor.health().startswith("unhealthy")
+
+    executor.start()
+    assert len(created) == 1 and executor._pool is created[0]
+    executor.start()
+    assert len(created) == 1
+    assert executor.health() == "healthy"
+
+
+def test_full_queue_raises_without_touching_the_pool(run):
+    executor = broken_executor(max_pending=1)
+    executor.pending = 1
+
+    with pytest.raises(InferenceQueueFull):
+        run(executor.run("text_generator", "hello"))
+    assert executor.pending == 1
+
+
+@pytest.mark.parametrize("error, retry_after", [
+    (InferenceQueueFull("Local inference queue is full (16 pending)"), "5"),
+    (InferenceTimeout("Local inference for text_generator timed out"), "30"),
+])
+def test_generate_answers_503_for_local_inference_errors(run, monkeypatch, error, retry_after):
+    async def allow(*args):
+        return SimpleNamespace(limit=50, remaining=49, reset_after=0, retry_after=0, allowed=True)
+
+    async def generate(**kwargs):
+        raise error
+
+    monkeypatch.setattr(auth, "check_rate_limit", allow)
+    monkeypatch.setattr(main, "rate_limit_headers", lambda result: {})
+    monkeypatch.setattr(ai_service.AIService, "generate_content", generate)
+    request = schemas.GenerateRequest(prompt="Write a tagline", content_type="text", model="local")
+
+    with pytest.raises(HTTPException) as raised:
+        run(main.generate_content(request, Response(), None, False, "normal", SimpleNamespace(id=1), None))
+    assert raised.value.status_code == 503
+    assert raised.value.headers["Retry-After"] == retry_after
+
+
+def test_local_inference_errors_keep_their_type(run, monkeypatch):
+    async def generate(*args, **kwargs):
+        raise InferenceQueueFull("Local inference queue is full (16 pending)")
+
+    monkeypatch.setattr(ai_service.AIService, "_generate_for_type", generate)
+    policy = ai_service.CachePolicy(False, 0, 0)
+
+    with pytest.raises(InferenceQueueFull):
+        run(ai_service.AIService._generate_uncached(
+            "key", "id", 0.0, policy, "Write a tagline", "text", "local", 50, 0.7, "en", "professional"
+        ))
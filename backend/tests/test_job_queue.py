@@ -0,0 +1,211 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+from app import main, models, schemas
+from app.job_queue import FAILED, QUEUED, SUCCEEDED, TERMINAL, JobQueue, JobQueueFull, JobWorker
+from app.providers import ProviderError
+from app.worker import is_transient
+
+PRIORITIES = ["high", "normal", "low"]
+
+
+def make_queue(redis, visibility_timeout: float = 30.0, max_attempts: int = 3, max_depth: int = 0) -> JobQueue:
+    return JobQueue(PRIORITIES, visibility_timeout, max_attempts, 600, max_depth, redis_client=redis, prefix="test-jobs")
+
+
+def test_claims_highest_priority_then_oldest_first(run, fake_redis):
+    queue = make_queue(fake_redis)
+
+    async def scenario():
+        ids = {}
+        for name, priority in [("low", "low"), ("normal-1", "normal"), ("high", "high"), ("normal-2", "normal")]:
+            ids[(await queue.enqueue(1, {"name": name}, priority))["id"]] = name
+            await asyncio.sleep(0.002)
+        claimed = [await queue.claim() for _ in range(5)]
+        return [ids[job["id"]] if job else None for job in claimed]
+
+    assert run(scenario()) == ["high", "normal-1", "normal-2", "low", None]
+
+
+def test_depth_cap_rejects_enqueue(run, fake_redis):
+    queue = make_queue(fake_redis, max_depth=2)
+
+    async def scenario():
+        await queue.enqueue(1, {}, "normal")
+        await queue.enqueue(1, {}, "low")
+        with pytest.raises(JobQueueFull):
+            await queue.enqueue(1, {}, "high")
+        # Claimed jobs no longer count towards the depth
+        await queue.claim()
+        await queue.enqueue(1, {}, "high")
+        return await queue.stats()
+
+    stats = run(scenario())
+    assert stats["depth"] == 2 and stats["rejected"] == 1
+
+
+def test_concurrent_enqueues_never_exceed_the_depth_cap(run, fake_redis):
+    pods = [make_queue(fake_redis, max_depth=5) for _ in range(4)]
+
+    async def enqueue(queue):
+        try:
+            return await queue.enqueue(1, {}, "normal")
+        except JobQueueFull:
+            return None
+
+    async def scenario():
+        results = await asyncio.gather(*(enqueue(pods[i % len(pods)]) for i in range(40)))
+        return results, await pods[0].depth()
+
+    results, depth = run(scenario())
+    assert depth == 5
+    assert sum(result is not None for result in results) == 5
+    assert sum(pod.rejected for pod in pods) == 35
+
+
+def test_full_queue_answers_503(run, fake_redis, monkeypatch):
+    monkeypatch.setattr(main, "job_queue", make_queue(fake_redis, max_depth=1))
+    user = SimpleNamespace(id=1, role=models.UserRole.USER)
+    request = schemas.GenerateRequest(prompt="Write a tagline", content_type="text")
+
+    async def scenario():
+        accepted = await main.enqueue_generation(request, "normal", user, {})
+        with pytest.raises(HTTPException) as raised:
+            await main.enqueue_generation(request, "normal", user, {})
+        return accepted, raised.value
+
+    accepted, rejected = run(scenario())
+    assert accepted.status_code == 202
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "30"
+
+
+def test_expired_lease_is_redelivered_up_to_max_attempts(run, fake_redis):
+    queue = make_queue(fake_redis, visibility_timeout=0.1, max_attempts=2)
+
+    async def scenario():
+        job = await queue.enqueue(1, {}, "normal")
+        first = await queue.claim()
+        await asyncio.sleep(0.15)
+        second = await queue.claim()
+        await asyncio.sleep(0.15)
+        third = await queue.claim()
+        return job, first, second, third, await queue.get(job["id"]), await queue.stats()
+
+    job, first, second, third, final, stats = run(scenario())
+    assert first["id"] == second["id"] == job["id"]
+    assert (first["attempts"], second["attempts"]) == (1, 2)
+    assert third is None
+    assert final["status"] == FAILED
+    assert "visibility timeout" in final["error"]
+    assert stats["redelivered"] == 1 and stats["failed"] == 1 and stats["inflight"] == 0
+
+
+def test_stale_lease_holder_cannot_finish(run, fake_redis):
+    queue = make_queue(fake_redis, visibility_timeout=0.1)
+
+    async def scenario():
+        await queue.enqueue(1, {}, "normal")
+        stale = await queue.claim()
+        await asyncio.sleep(0.15)
+        current = await queue.claim()
+        return (
+            await queue.complete(stale, content_id=1),
+            await queue.extend(stale),
+            await queue.fail(stale, "late"),
+            await queue.complete(current, content_id=2),
+            await queue.get(current["id"])
+        )
+
+    stale_complete, stale_extend, stale_fail, current_complete, job = run(scenario())
+    assert (stale_complete, stale_extend, stale_fail) == (False, False, False)
+    assert current_complete is True
+    assert job["status"] == SUCCEEDED and job["content_id"] == 2
+
+
+def test_release_puts_job_back_without_counting_the_attempt(run, fake_redis):
+    queue = make_queue(fake_redis)
+
+    async def scenario():
+        await queue.enqueue(1, {}, "normal")
+        job = await queue.claim()
+        released = await queue.release(job)
+        return released, await queue.get(job["id"]), await queue.claim()
+
+    released, job, again = run(scenario())
+    assert released is True
+    assert job["status"] == QUEUED and job["attempts"] == 0
+    assert again["id"] == job["id"] and again["attempts"] == 1
+
+
+def run_worker(queue: JobQueue, handler, job_count: int = 1):
+    async def scenario():
+        ids = [(await queue.enqueue(1, {}, "normal"))["id"] for _ in range(job_count)]
+        worker = JobWorker(queue, handler, concurrency=2, poll_interval=0.05, retryable=is_transient)
+        task = asyncio.create_task(worker.run())
+        for _ in range(200):
+            jobs = [await queue.get(job_id) for job_id in ids]
+            if all(job["status"] in TERMINAL for job in jobs):
+                break
+            await asyncio.sleep(0.05)
+        worker.stop()
+        await task
+        await worker.drain(1)
+        return jobs, worker.stats()
+    return scenario()
+
+
+def test_worker_retries_transient_provider_errors(run, fake_redis):
+    queue = make_queue(fake_redis, visibility_timeout=5.0)
+    calls = []
+
+    async def handler(job):
+        calls.append(job["attempts"])
+        if len(calls) == 1:
+            raise ProviderError("openai", "rate limited", 429, retry_after=0.1)
+        return {"content_id": 42}
+
+    (job,), stats = run(run_worker(queue, handler))
+    assert calls == [1, 2]
+    assert job["status"] == SUCCEEDED and job["content_id"] == 42
+    assert "error" not in job
+    assert stats["retried"] == 1
+
+
+def test_worker_fails_transient_errors_after_max_attempts(run, fake_redis):
+    queue = make_queue(fake_redis, visibility_timeout=5.0, max_attempts=2)
+
+    async def handler(job):
+        raise ProviderError("openai", "upstream timeout", timed_out=True, retry_after=0.1)
+
+    (job,), stats = run(run_worker(queue, handler))
+    assert job["status"] == FAILED and job["attempts"] == 2
+    assert "upstream timeout" in job["error"]
+    assert stats["retried"] == 1
+
+
+def test_worker_fails_permanent_errors_at_once(run, fake_redis):
+    queue = make_queue(fake_redis, visibility_timeout=5.0)
+
+    async def handler(job):
+        raise ProviderError("openai", "invalid request", 400)
+
+    (job,), stats = run(run_worker(queue, handler))
+    assert job["status"] == FAILED and job["attempts"] == 1
+    assert stats["retried"] == 0
+
+
+@pytest.mark.parametrize("error, transient", [
+    (ProviderError("openai", "rate limited", 429), True),
+    (ProviderError("openai", "overloaded", 503), True),
+    (ProviderError("openai", "bad gateway", 502), True),
+    (ProviderError("openai", "timeout", timed_out=True), True),
+    (ProviderError("openai", "connection reset"), True),
+    (ProviderError("openai", "bad request", 400), False),
+    (ValueError("User 3 no longer exists"), False),
+])
+def test_is_transient(error, transient):
+    assert is_transient(error) is transient
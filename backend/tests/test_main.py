@@ -0,0 +1,184 @@
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import inference, main, models, redis_pool, schemas
+from app.providers import ProviderError
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(models.User(id=1, username="alice", email="alice@example.com"))
+        session.add(models.UserAnalytics(user_id=1, total_generations=0, total_tokens_used=0))
+        session.commit()
+        yield session
+
+
+@pytest.fixture
+def no_rate_limit(monkeypatch):
+    async def check_rate_limit(user_id, endpoint, limit=100, window_minutes=60):
+        return schemas.RateLimitInfo(limit=limit, remaining=limit - 1, reset_time=datetime(2030, 1, 1))
+
+    monkeypatch.setattr(main.auth, "check_rate_limit", check_rate_limit)
+
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+async def read_body(response) -> str:
+    return "".join([chunk async for chunk in response.body_iterator])
+
+
+def test_health_reports_local_inference_without_starting_it(run, fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_pool, "get_redis", lambda: fake_redis)
+    executor = inference.inference_executor
+    assert executor._pool is None
+
+    health = run(main.health_check())
+
+    assert health.redis == "healthy"
+    assert health.ai_service == "healthy"
+    assert executor._pool is None and executor._manager is None
+
+
+def test_health_reports_a_full_local_queue(run, fake_redis, monkeypatch):
+    monkeypatch.setattr(redis_pool, "get_redis", lambda: fake_redis)
+    executor = inference.InferenceExecutor(1, 2, 10, 2**20)
+    monkeypatch.setattr(inference, "inference_executor", executor)
+    executor._pool = object()
+    executor.pending = 2
+
+    health = run(main.health_check())
+
+    assert health.ai_service.startswith("degraded: local inference queue is full")
+    assert health.status == "degraded"
+
+
+def fake_stream(monkeypatch, events, error=None):
+    async def generate_content_stream(**kwargs):
+        for event in events:
+            yield event
+        if error is not None:
+            raise error
+
+    monkeypatch.setattr(main.ai_service.AIService, "generate_content_stream", generate_content_stream)
+
+
+def test_stream_sends_start_tokens_and_the_saved_content(run, db, no_rate_limit, monkeypatch):
+    fake_stream(monkeypatch, [
+        {"event": "token", "text": "Fresh "},
+        {"event": "token", "text": "bread"},
+        {"event": "done", "content": "Fresh bread", "model": "gpt-3.5-turbo", "metadata": {"tokens_used": 2}},
+    ])
+    request = schemas.GenerateRequest(prompt="Write a tagline", content_type="text")
+    user = db.get(models.User, 1)
+
+    async def scenario():
+        response = await main.generate_content_stream(request, user, db)
+        return response, await read_body(response)
+
+    response, body = run(scenario())
+    events = parse_sse(body)
+
+    assert response.media_type == "text/event-stream"
+    assert response.headers["X-RateLimit-Remaining"] == "49"
+    assert [name for name, _ in events] == ["start", "token", "token", "done"]
+    assert events[0][1] == {"model": "gpt-3.5-turbo", "content_type": "text"}
+    assert "".join(data["text"] for name, data in events if name == "token") == "Fresh bread"
+    done = events[-1][1]
+    assert done["generated_content"] == "Fresh bread" and done["user_id"] == 1
+    assert db.get(models.Content, done["id"]).generated_content == "Fresh bread"
+
+
+def test_stream_reports_a_failure_as_an_error_event(run, db, no_rate_limit, monkeypatch):
+    fake_stream(monkeypatch, [{"event": "token", "text": "Fresh "}], ProviderError("openai", "upstream error", 502))
+    request = schemas.GenerateRequest(prompt="Write a tagline", content_type="text")
+
+    async def scenario():
+        return await read_body(await main.generate_content_stream(request, db.get(models.User, 1), db))
+
+    events = parse_sse(run(scenario()))
+
+    assert [name for name, _ in events] == ["start", "token", "error"]
+    assert "upstream error" in events[-1][1]["detail"]
+    assert db.query(models.Content).count() == 0
+
+
+def fake_generations(monkeypatch, delays=None):
+    """generate_content that fails prompts containing "fail" and otherwise echoes them"""
+    async def generate_content(prompt, model="gpt-3.5-turbo", **kwargs):
+        await asyncio.sleep((delays or {}).get(prompt, 0))
+        if "fail" in prompt:
+            raise ProviderError("openai", f"rejected {prompt}", 400)
+        return f"content for {prompt}", model, {"tokens_used": 3}
+
+    monkeypatch.setattr(main.ai_service.AIService, "generate_content", generate_content)
+
+
+def batch(*prompts) -> schemas.BatchGenerateRequest:
+    return schemas.BatchGenerateRequest(requests=[schemas.GenerateRequest(prompt=p, content_type="text") for p in prompts])
+
+
+async def read_lines(request, db):
+    return [json.loads(line) for chunk in [c async for c in main.stream_batch(request, db.get(models.User, 1), db)] for line in chunk.splitlines()]
+
+
+def test_stream_batch_reports_each_item_with_its_own_error(run, db, monkeypatch):
+    fake_generations(monkeypatch)
+    request = batch("first", "please fail", "third")
+
+    lines = sorted(run(read_lines(request, db)), key=lambda line: line["index"])
+
+    assert [line["success"] for line in lines] == [True, False, True]
+    assert "rejected please fail" in lines[1]["error"] and "content_id" not in lines[1]
+    for line in (lines[0], lines[2]):
+        row = db.get(models.Content, line["content_id"])
+        assert row.generated_content == line["content"] == f"content for {request.requests[line['index']].prompt}"
+    assert db.query(models.Content).count() == 2
+
+
+def test_stream_batch_sends_items_in_completion_order_in_groups(run, db, monkeypatch):
+    fake_generations(monkeypatch, delays={"slow": 0.2})
+    monkeypatch.setattr(main.settings, "BATCH_COMMIT_SIZE", 2)
+    monkeypatch.setattr(main.settings, "BATCH_COMMIT_WAIT_MS", 10)
+
+    async def scenario():
+        return [chunk async for chunk in main.stream_batch(batch("slow", "a", "b", "c"), db.get(models.User, 1), db)]
+
+    chunks = run(scenario())
+
+    assert [json.loads(line)["index"] for line in chunks[-1].splitlines()] == [0]
+    assert sorted(json.loads(line)["index"] for chunk in chunks[:-1] for line in chunk.splitlines()) == [1, 2, 3]
+
+
+def test_stream_batch_keeps_going_after_a_failed_commit(run, db, monkeypatch):
+    fake_generations(monkeypatch, delays={"later": 0.2})
+    monkeypatch.setattr(main.settings, "BATCH_COMMIT_WAIT_MS", 10)
+    save = main.crud.save_batch_contents
+    calls = []
+
+    def save_batch_contents(db, user_id, items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return save(db, user_id, items)
+
+    monkeypatch.setattr(main.crud, "save_batch_contents", save_batch_contents)
+
+    lines = {line["index"]: line for line in run(read_lines(batch("first", "later"), db))}
+
+    assert lines[0]["success"] is False
+    assert lines[0]["error"].startswith("Generated but not saved") and lines[0]["content"] == "content for first"
+    assert lines[1]["success"] is True and db.get(models.Content, lines[1]["content_id"]) is not None
@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from app.inference import InferenceError
+from app.microbatch import MicroBatcher
+
+
+class Executor:
+    """Records each batch it runs; answers every input with its echo"""
+
+    def __init__(self, error: Exception = None, delay: float = 0.0):
+        self.batches = []
+        self.error = error
+        self.delay = delay
+
+    async def run(self, name, inputs, **kwargs):
+        self.batches.append((name, list(inputs), kwargs))
+        await asyncio.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if name == "summarizer":
+            return [{"summary_text": f"summary of {text}"} for text in inputs]
+        return [[{"generated_text": f"{text}!"}] for text in inputs]
+
+
+def test_concurrent_calls_share_one_batch_and_get_their_own_results(run):
+    executor = Executor()
+    batcher = MicroBatcher(executor, window_ms=20, max_size=8)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit("text_generator", f"prompt {i}", max_length=20) for i in range(5)))
+
+    results = run(scenario())
+
+    assert results == [[{"generated_text": f"prompt {i}!"}] for i in range(5)]
+    assert len(executor.batches) == 1
+    name, inputs, kwargs = executor.batches[0]
+    assert inputs == [f"prompt {i}" for i in range(5)]
+    assert kwargs == {"batch_size": 5, "max_length": 20}
+
+
+def test_full_batch_is_sent_without_waiting_for_the_window(run):
+    executor = Executor()
+    batcher = MicroBatcher(executor, window_ms=10_000, max_size=3)
+
+    async def scenario():
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit("text_generator", f"prompt {i}") for i in range(3))), timeout=1
+        )
+
+    assert len(run(scenario())) == 3
+    assert [len(inputs) for _, inputs, _ in executor.batches] == [3]
+
+
+def test_more_callers_than_max_size_are_split_into_batches(run):
+    executor = Executor()
+    batcher = MicroBatcher(executor, window_ms=20, max_size=4)
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit("text_generator", f"prompt {i}") for i in range(10)))
+
+    results = run(scenario())
+
+    assert [len(inputs) for _, inputs, _ in executor.batches] == [4, 4, 2]
+    assert [result[0]["generated_text"] for result in results] == [f"prompt {i}!" for i in range(10)]
+    assert (batcher.batches, batcher.items) == (3, 10)
+
+
+def test_different_parameters_are_never_batched_together(run):
+    executor = Executor()
+    batcher = MicroBatcher(executor, window_ms=20, max_size=8)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.submit("text_generator", "a", max_length=20),
+            batcher.submit("text_generator", "b", max_length=50),
+            batcher.submit("summarizer", "c", max_length=20),
+            batcher.submit("text_generator", "d", max_length=20),
+        )
+
+    results = run(scenario())
+
+    assert results[2] == [{"summary_text": "summary of c"}]
+    assert sorted((name, inputs, kwargs["max_length"]) for name, inputs, kwargs in executor.batches) == [
+        ("summarizer", ["c"], 20),
+        ("text_generator", ["a", "d"], 20),
+        ("text_generator", ["b"], 50),
+    ]
+
+
+def test_batch_failure_is_raised_to_every_caller(run):
+    batcher = MicroBatcher(Executor(error=InferenceError("worker crashed")), window_ms=20, max_size=8)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(batcher.submit("text_generator", f"prompt {i}") for i in range(3)), return_exceptions=True
+        )
+
+    results = run(scenario())
+
+    assert len(results) == 3
+    assert all(isinstance(result, InferenceError) for result in results)
+
+
+def test_caller_that_gives_up_is_left_out_of_the_batch(run):
+    executor = Executor()
+    batcher = MicroBatcher(executor, window_ms=50, max_size=8)
+
+    async def scenario():
+        impatient = asyncio.create_task(batcher.submit("text_generator", "impatient"))
+        patient = asyncio.create_task(batcher.submit("text_generator", "patient"))
+        await asyncio.sleep(0.01)
+        impatient.cancel()
+        return await patient
+
+    assert run(scenario()) == [{"generated_text": "patient!"}]
+    assert [inputs for _, inputs, _ in executor.batches] == [["patient"]]
+
+
+def test_caller_cancelled_mid_batch_does_not_disturb_the_others(run):
+    executor = Executor(delay=0.05)
+    batcher = MicroBatcher(executor, window_ms=5, max_size=8)
+
+    async def scenario():
+        first = asyncio.create_task(batcher.submit("text_generator", "first"))
+        second = asyncio.create_task(batcher.submit("text_generator", "second"))
+        await asyncio.sleep(0.02)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert run(scenario()) == [{"generated_text": "second!"}]
+    assert len(executor.batches) == 1
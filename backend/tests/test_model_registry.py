@@ -0,0 +1,141 @@
+import pytest
+
+from app.config import settings
+from app.inference import LOCAL_PIPELINES, size_hints
+from app.model_registry import ModelRegistry, ModelTooLarge
+
+MiB = 2**20
+
+SPECS = {
+    "small": ("text-generation", "small-model"),
+    "medium": ("text-generation", "medium-model"),
+    "large": ("summarization", "large-model"),
+}
+
+
+class Weights:
+    def __init__(self, size: int):
+        self.size = size
+
+    def nelement(self) -> int:
+        return self.size
+
+    def element_size(self) -> int:
+        return 1
+
+
+class FakeModel:
+    def __init__(self, size: int):
+        self._weights = [Weights(size)]
+
+    def parameters(self):
+        return self._weights
+
+    def buffers(self):
+        return []
+
+    def modules(self):
+        return []
+
+
+class FakePipeline:
+    def __init__(self, size: int):
+        self.model = FakeModel(size)
+
+
+class Loader:
+    """Loads fake pipelines of fixed sizes, recording resident bytes at each load"""
+
+    def __init__(self, sizes):
+        self.sizes = sizes
+        self.registry = None
+        self.peaks = []
+
+    def __call__(self, task: str, model: str):
+        size = self.sizes[model]
+        self.peaks.append(self.registry.stats()["resident_bytes"] + size)
+        return FakePipeline(size)
+
+
+def make_registry(budget_mb: int, sizes_mb, hints_mb=None):
+    loader = Loader({SPECS[name][1]: mb * MiB for name, mb in sizes_mb.items()})
+    hints = {name: mb * MiB for name, mb in (hints_mb or sizes_mb).items()}
+    registry = ModelRegistry(SPECS, budget_mb * MiB, loader=loader, size_hints=hints)
+    loader.registry = registry
+    return registry, loader
+
+
+def test_evicts_before_loading_so_peak_stays_within_budget():
+    registry, loader = make_registry(300, {"small": 100, "medium": 150, "large": 250})
+    registry.get("small")
+    registry.get("medium")
+    registry.get("large")
+
+    assert max(loader.peaks) <= 300 * MiB
+    assert list(registry.stats()["models"]) == ["large"]
+    assert registry.evictions == 2
+
+
+def test_evicts_least_recently_used_first():
+    registry, loader = make_registry(300, {"small": 100, "medium": 150, "large": 120})
+    registry.get("small")
+    registry.get("medium")
+    registry.get("small")
+    registry.get("large")
+
+    assert list(registry.stats()["models"]) == ["small", "large"]
+    assert max(loader.peaks) <= 300 * MiB
+
+
+def test_model_larger_than_budget_is_refused_without_loading():
+    registry, loader = make_registry(384, {"small": 100, "large": 1550})
+    registry.get("small")
+
+    with pytest.raises(ModelTooLarge, match="large-model needs about 1550 MiB, more than the 384 MiB"):
+        registry.get("large")
+
+    assert loader.peaks == [100 * MiB]
+    assert list(registry.stats()["models"]) == ["small"]
+    assert registry.stats()["rejected"] == 1
+
+
+def test_recorded_size_replaces_a_low_hint():
+    registry, loader = make_registry(300, {"small": 100, "large": 400}, hints_mb={"small": 100, "large": 200})
+
+    with pytest.raises(ModelTooLarge):
+        registry.get("large")
+    assert "large" not in registry.stats()["models"]
+    assert registry.expected_bytes("large") == 400 * MiB
+
+    # Known to be too large now, so it is not loaded again
+    with pytest.raises(ModelTooLarge):
+        registry.get("large")
+    assert len(loader.peaks) == 1
+
+
+def test_cached_model_is_a_hit():
+    registry, loader = make_registry(300, {"small": 100})
+    first = registry.get("small")
+    assert registry.get("small") is first
+    assert registry.stats()["hits"] == 1 and len(loader.peaks) == 1
+
+
+def test_default_settings_admit_the_text_generator():
+    loaded = []
+    registry = ModelRegistry(
+        LOCAL_PIPELINES,
+        settings.MODEL_MEMORY_BUDGET_MB * MiB,
+        loader=lambda task, model: loaded.append(model) or FakePipeline(MiB),
+        size_hints=size_hints(settings.INFERENCE_BACKEND)
+    )
+
+    assert registry.get("text_generator") is not None
+    assert loaded == ["gpt2"]
+
+
+def test_quantized_backends_expect_half_the_fp32_weights():
+    fp32 = size_hints("fp32")
+    for backend in ("int8", "onnx"):
+        assert size_hints(backend) == {name: size // 2 for name, size in fp32.items()}
+    # Unknown backends are sized as fp32 rather than admitted on a guess
+    assert size_hints("bf16") == fp32
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+from app.prompt_match import (
+    FINGERPRINT_BITS, NearDuplicateIndex, canonical_params, canonicalize_prompt, fingerprint_bands, similarity, simhash
+)
+
+PROMPT = (
+    "Summarize the quarterly report for the board, focusing on revenue growth, churn in the enterprise "
+    "segment, hiring plans for the next two quarters and the risks flagged by the audit committee"
+)
+
+
+@pytest.mark.parametrize("variant", [
+    "Write a tagline for a coffee shop",
+    "  write a   tagline for a coffee shop.",
+    "Write a tagline for a coffee shop!!!",
+    "WRITE A TAGLINE FOR A COFFEE SHOP",
+    "Write a tagline for a coffee\tshop\n",
+])
+def test_formatting_variants_share_a_canonical_prompt(variant):
+    assert canonicalize_prompt(variant, "text") == "write a tagline for a coffee shop"
+
+
+def test_typography_is_normalized_for_prose():
+    assert canonicalize_prompt("Say “hi” — don’t shout", "text") == canonicalize_prompt('Say "hi" - don\'t shout', "text")
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Translate: Hello!", "Translate: Hello"),
+    ("Translate: Hello!!", "Translate: Hello!"),
+    ("Translate: Bonjour !", "Translate: Bonjour!"),
+    ("Translate: Hello", "Translate: hello"),
+    ("Translate: “Hello”", 'Translate: "Hello"'),
+])
+def test_translation_keeps_punctuation_and_case(a, b):
+    assert canonicalize_prompt(a, "translation") != canonicalize_prompt(b, "translation")
+
+
+def test_translation_still_collapses_whitespace():
+    assert canonicalize_prompt("  Translate:\n Hello! ", "translation") == "Translate: Hello!"
+
+
+def test_code_keeps_indentation_and_punctuation():
+    prompt = "def add(a, b):   \n    return a + b!!\n\n"
+    assert canonicalize_prompt(prompt, "code") == "def add(a, b):\n    return a + b!!"
+    assert canonicalize_prompt("Print 'Hi'", "code") != canonicalize_prompt("print 'hi'", "code")
+
+
+def test_canonical_params_ignore_order_and_unset_values():
+    assert canonical_params({"temperature": 0.2, "style": None, "language": "en"}) == \
+        canonical_params({"language": "en", "temperature": 0.2})
+
+
+def test_simhash_similarity_tracks_edit_size():
+    base = simhash(PROMPT)
+    one_word = simhash(PROMPT.replace("board", "directors"))
+    unrelated = simhash("Write a limerick about a cat who learns to play the trumpet in a jazz band downtown")
+
+    assert similarity(base, simhash(PROMPT)) == 1.0
+    assert similarity(base, one_word) > similarity(base, unrelated)
+    assert similarity(base, one_word) >= 0.75
+
+
+def test_exact_simhash_sees_punctuation_and_case():
+    assert simhash("Translate: Hello!") == simhash("Translate: Hello")
+    assert simhash("Translate: Hello!", exact=True) != simhash("Translate: Hello", exact=True)
+    assert simhash("Translate: Hello", exact=True) != simhash("Translate: hello", exact=True)
+
+
+def test_fingerprints_within_seven_bits_share_a_band():
+    rng = random.Random(0)
+    for _ in range(200):
+        fingerprint = rng.getrandbits(FINGERPRINT_BITS)
+        near = fingerprint
+        for bit in rng.sample(range(FINGERPRINT_BITS), 7):
+            near ^= 1 << bit
+        assert set(enumerate(fingerprint_bands(fingerprint))) & set(enumerate(fingerprint_bands(near)))
+
+
+def make_index(redis) -> NearDuplicateIndex:
+    return NearDuplicateIndex({"summary": 0.95, "default": 0.97}, 0.3, enabled=True, redis_client=redis)
+
+
+def test_index_finds_closest_prompt_in_scope(run, fake_redis):
+    index = make_index(fake_redis)
+    fingerprint = simhash(PROMPT)
+    near = fingerprint ^ 0b101  # 2 of 64 bits differ
+
+    async def scenario():
+        await index.add("scope-a", fingerprint, "key-1", 60)
+        await index.add("scope-a", fingerprint ^ (0xFF << 8), "key-2", 60)
+        return (
+            await index.lookup("scope-a", near, 0.95),
+            await index.lookup("scope-b", near, 0.95),
+            await index.lookup("scope-a", fingerprint ^ ((1 << 10) - 1), 0.95),
+        )
+
+    found, other_scope, too_far = run(scenario())
+    assert found == ("key-1", pytest.approx(62 / 64))
+    assert other_scope is None
+    assert too_far is None
+
+
+def test_threshold_for_respects_type_and_temperature():
+    index = make_index(None)
+    assert index.threshold_for("summary", 0.9) == 0.95
+    assert index.threshold_for("translation", 0.9) == 0.97
+    assert index.threshold_for("text", 0.2) == 0.97
+    assert index.threshold_for("text", 0.7) is None
+    assert NearDuplicateIndex({"default": 0.97}, 0.3).threshold_for("summary", 0.0) is None
@@ -0,0 +1,164 @@
+import json
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+from app import providers
+from app.providers import AnthropicProvider, OpenAIProvider, ProviderError, parse_retry_after
+
+MESSAGES = [
+    {"role": "system", "content": "You are a copywriter."},
+    {"role": "user", "content": "Write a tagline for a bakery"},
+]
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Routes provider calls to a handler set by the test; records the requests"""
+    class Transport:
+        handler = None
+        requests = []
+
+    def handle(request: httpx.Request) -> httpx.Response:
+        Transport.requests.append(request)
+        return Transport.handler(request)
+
+    monkeypatch.setattr(providers, "_http_client", httpx.AsyncClient(transport=httpx.MockTransport(handle)))
+    Transport.requests = []
+    return Transport
+
+
+def sse(*events) -> bytes:
+    return "".join(f"data: {event if isinstance(event, str) else json.dumps(event)}\n\n" for event in events).encode()
+
+
+async def collect(stream):
+    return [delta async for delta in stream]
+
+
+@pytest.mark.parametrize("value, expected", [(None, None), ("", None), ("3", 3.0), ("1.5", 1.5), ("-2", 0.0), ("soon", None)])
+def test_parse_retry_after_seconds(value, expected):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_http_date():
+    assert 25 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+def test_shared_client_is_reused_and_recreated_after_close(run, monkeypatch):
+    monkeypatch.setattr(providers, "_http_client", None)
+
+    async def scenario():
+        first = providers.get_http_client()
+        same = providers.get_http_client()
+        await providers.close_http_client()
+        fresh = providers.get_http_client()
+        await providers.close_http_client()
+        return first, same, fresh
+
+    first, same, fresh = run(scenario())
+    assert first is same and fresh is not first
+    assert first.is_closed
+
+
+def test_openai_chat_completion(run, transport):
+    transport.handler = lambda request: httpx.Response(200, json={"choices": [{"message": {"content": "Fresh bread"}}]})
+    provider = OpenAIProvider("https://api.example.com/v1/", "key")
+
+    text = run(provider.chat_completion("gpt-3.5-turbo", MESSAGES, 50, 0.7))
+
+    request = transport.requests[0]
+    assert text == "Fresh bread"
+    assert str(request.url) == "https://api.example.com/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer key"
+    assert json.loads(request.content) == {"model": "gpt-3.5-turbo", "messages": MESSAGES, "max_tokens": 50, "temperature": 0.7}
+
+
+def test_openai_stream_yields_deltas_until_done(run, transport):
+    transport.handler = lambda request: httpx.Response(200, content=sse(
+        {"choices": [{"delta": {"role": "assistant"}}]},
+        {"choices": [{"delta": {"content": "Fresh "}}]},
+        {"choices": [{"delta": {"content": "bread"}}]},
+        "[DONE]",
+        {"choices": [{"delta": {"content": "ignored"}}]},
+    ))
+    provider = OpenAIProvider("https://api.example.com/v1", "key")
+
+    deltas = run(collect(provider.stream_chat_completion("gpt-3.5-turbo", MESSAGES, 50, 0.7)))
+
+    assert deltas == ["Fresh ", "bread"]
+    assert json.loads(transport.requests[0].content)["stream"] is True
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_error_responses_keep_status_and_retry_after(run, transport, stream):
+    transport.handler = lambda request: httpx.Response(429, headers={"Retry-After": "7"}, text="rate limited")
+    provider = OpenAIProvider("https://api.example.com/v1", "key")
+
+    with pytest.raises(ProviderError) as raised:
+        if stream:
+            run(collect(provider.stream_chat_completion("gpt-3.5-turbo", MESSAGES, 50, 0.7)))
+        else:
+            run(provider.chat_completion("gpt-3.5-turbo", MESSAGES, 50, 0.7))
+
+    error = raised.value
+    assert (error.provider, error.status_code, error.retry_after) == ("openai", 429, 7.0)
+    assert error.throttled and "rate limited" in str(error)
+
+
+def test_transport_errors_are_provider_errors(run, transport):
+    def timeout(request):
+        raise httpx.ReadTimeout("read timed out", request=request)
+
+    def refused(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    provider = OpenAIProvider("https://api.example.com/v1", "key")
+    errors = []
+    for handler in (timeout, refused):
+        transport.handler = handler
+        with pytest.raises(ProviderError) as raised:
+            run(provider.chat_completion("gpt-3.5-turbo", MESSAGES, 50, 0.7))
+        errors.append(raised.value)
+
+    assert errors[0].timed_out and errors[0].status_code is None
+    assert not errors[1].timed_out and "ConnectError" in str(errors[1])
+
+
+def test_anthropic_moves_the_system_prompt_and_caps_temperature(run, transport):
+    transport.handler = lambda request: httpx.Response(200, json={"content": [
+        {"type": "text", "text": "Fresh "}, {"type": "tool_use", "id": "x"}, {"type": "text", "text": "bread"}
+    ]})
+    provider = AnthropicProvider("https://api.anthropic.example/v1", "key")
+
+    text = run(provider.chat_completion("claude-3-haiku", MESSAGES, 50, 1.5))
+
+    request = transport.requests[0]
+    payload = json.loads(request.content)
+    assert text == "Fresh bread"
+    assert str(request.url) == "https://api.anthropic.example/v1/messages"
+    assert request.headers["x-api-key"] == "key" and request.headers["anthropic-version"] == AnthropicProvider.version
+    assert payload["system"] == "You are a copywriter."
+    assert payload["messages"] == MESSAGES[1:]
+    assert payload["temperature"] == 1.0
+
+
+def test_anthropic_stream_yields_text_deltas_and_raises_stream_errors(run, transport):
+    provider = AnthropicProvider("https://api.anthropic.example/v1", "key")
+    transport.handler = lambda request: httpx.Response(200, content=sse(
+        {"type": "message_start"},
+        {"type": "content_block_delta", "delta": {"text": "Fresh "}},
+        {"type": "content_block_delta", "delta": {"text": "bread"}},
+        {"type": "message_stop"},
+    ))
+    assert run(collect(provider.stream_chat_completion("claude-3-haiku", MESSAGES, 50, 0.7))) == ["Fresh ", "bread"]
+
+    transport.handler = lambda request: httpx.Response(200, content=sse(
+        {"type": "content_block_delta", "delta": {"text": "Fresh "}},
+        {"type": "error", "error": {"message": "overloaded"}},
+    ))
+    with pytest.raises(ProviderError, match="overloaded"):
+        run(collect(provider.stream_chat_completion("claude-3-haiku", MESSAGES, 50, 0.7)))
@@ -0,0 +1,66 @@
+import pytest
+from fastapi import HTTPException
+
+from app import auth
+from app.rate_limit import RedisRateLimiter
+
+
+class BrokenRedis:
+    async def eval(self, *args):
+        raise ConnectionError("Redis is down")
+
+
+def test_allows_limit_then_rejects(run, fake_redis):
+    limiter = RedisRateLimiter(fake_redis)
+
+    async def scenario():
+        return [await limiter.hit(1, "login", 5, 15) for _ in range(6)]
+
+    results = run(scenario())
+    assert [allowed for allowed, _, _ in results] == [True] * 5 + [False]
+    assert [info.remaining for _, info, _ in results[:5]] == [4, 3, 2, 1, 0]
+    # One request is let through every window/limit = 180 s
+    assert 175 <= results[5][2] <= 180
+    assert limiter.stats() == {"allowed": 5, "rejected": 1, "errors": 0}
+
+
+def test_limits_are_per_user_and_endpoint(run, fake_redis):
+    limiter = RedisRateLimiter(fake_redis)
+
+    async def scenario():
+        await limiter.hit(1, "generate", 1, 60)
+        return [
+            (await limiter.hit(1, "generate", 1, 60))[0],
+            (await limiter.hit(2, "generate", 1, 60))[0],
+            (await limiter.hit(1, "batch_generate", 1, 60))[0],
+        ]
+
+    assert run(scenario()) == [False, True, True]
+
+
+def test_rejection_raises_429_with_headers(run, fake_redis, monkeypatch):
+    monkeypatch.setattr(auth, "rate_limiter", RedisRateLimiter(fake_redis))
+
+    async def scenario():
+        for _ in range(2):
+            await auth.check_rate_limit(7, "generate", 2, 60)
+        await auth.check_rate_limit(7, "generate", 2, 60)
+
+    with pytest.raises(HTTPException) as raised:
+        run(scenario())
+    assert raised.value.status_code == 429
+    headers = raised.value.headers
+    assert headers["X-RateLimit-Limit"] == "2"
+    assert headers["X-RateLimit-Remaining"] == "0"
+    assert int(headers["X-RateLimit-Reset"]) > 0
+    assert 1795 <= int(headers["Retry-After"]) <= 1800
+
+
+def test_fails_open_when_redis_raises(run, monkeypatch):
+    limiter = RedisRateLimiter(BrokenRedis())
+    monkeypatch.setattr(auth, "rate_limiter", limiter)
+
+    info = run(auth.check_rate_limit(1, "generate", 50, 60))
+
+    assert info.limit == 50 and info.remaining == 50
+    assert limiter.stats() == {"allowed": 0, "rejected": 0, "errors": 1}
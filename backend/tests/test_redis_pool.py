@@ -0,0 +1,71 @@
+import pytest
+
+from app import redis_pool
+from app.cache import GenerationCache
+from app.config import settings
+from app.rate_limit import RedisRateLimiter
+from app.redis_pool import close_redis, get_redis, pipelined
+
+
+@pytest.fixture
+def shared_client(monkeypatch):
+    monkeypatch.setattr(redis_pool, "_redis_client", None)
+    yield
+    monkeypatch.setattr(redis_pool, "_redis_client", None)
+
+
+def test_one_client_is_shared_until_closed(run, shared_client):
+    async def scenario():
+        first = get_redis()
+        same = get_redis()
+        await close_redis()
+        fresh = get_redis()
+        await close_redis()
+        return first, same, fresh
+
+    first, same, fresh = run(scenario())
+    assert first is same and fresh is not first
+
+
+def test_pool_is_configured_from_settings_without_connecting(shared_client):
+    pool = get_redis().connection_pool
+    assert pool.max_connections == settings.REDIS_MAX_CONNECTIONS
+    assert pool.connection_kwargs["socket_timeout"] == settings.REDIS_SOCKET_TIMEOUT
+    assert pool.connection_kwargs["socket_connect_timeout"] == settings.REDIS_CONNECT_TIMEOUT
+    # Created lazily: nothing is connected until the first command
+    assert not pool._in_use_connections and not pool._available_connections
+
+
+def test_components_default_to_the_shared_client(shared_client):
+    client = get_redis()
+    assert GenerationCache(2**20, "test-invalidations").redis is client
+    assert RedisRateLimiter().redis is client
+
+
+def test_pipelined_returns_replies_in_order(run, fake_redis):
+    def build(pipe):
+        pipe.set("a", 1)
+        pipe.incr("a")
+        pipe.get("missing")
+        pipe.get("a")
+
+    assert run(pipelined(build, fake_redis)) == [True, 2, None, b"2"]
+
+
+def test_pipelined_sends_one_round_trip(run, fake_redis, monkeypatch):
+    sent = []
+
+    async def scenario():
+        connection = await fake_redis.connection_pool.get_connection("_")
+        await fake_redis.connection_pool.release(connection)
+        original = type(connection).send_packed_command
+
+        async def spy(self, command, check_health=True):
+            sent.append(command)
+            return await original(self, command, check_health)
+
+        monkeypatch.setattr(type(connection), "send_packed_command", spy)
+        return await pipelined(lambda pipe: [pipe.set(f"key:{i}", i) for i in range(10)], fake_redis)
+
+    assert run(scenario()) == [True] * 10
+    assert len(sent) == 1
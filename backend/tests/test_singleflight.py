@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+import pytest
+
+from app.singleflight import SingleFlight
+
+
+class Provider:
+    """Counts calls; stores its result where followers on other pods look for it"""
+
+    def __init__(self, delay: float = 0.05, fail: bool = False):
+        self.calls = 0
+        self.delay = delay
+        self.fail = fail
+        self.cache = {}
+
+    async def generate(self, key: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("provider error")
+        self.cache[key] = f"result for {key}"
+        return self.cache[key]
+
+    async def read(self, key: str):
+        return self.cache.get(key)
+
+
+def pods(redis, count: int, wait_timeout: float = 5.0):
+    return [SingleFlight(lock_ttl_ms=5000, wait_timeout=wait_timeout, poll_interval=0.01, redis_client=redis) for _ in range(count)]
+
+
+def call(flight: SingleFlight, provider: Provider, key: str):
+    return flight.run(key, lambda: provider.generate(key), lambda: provider.read(key))
+
+
+def test_concurrent_callers_in_one_worker_share_one_call(run, fake_redis):
+    provider = Provider()
+    flight = pods(fake_redis, 1)[0]
+
+    async def scenario():
+        return await asyncio.gather(*(call(flight, provider, "k") for _ in range(20)))
+
+    assert run(scenario()) == ["result for k"] * 20
+    assert provider.calls == 1
+    assert flight.stats()["coalesced_local"] == 19
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_concurrent_callers_across_pods_share_one_call(run, fake_redis):
+    provider = Provider(delay=0.1)
+    flights = pods(fake_redis, 5)
+
+    async def scenario():
+        return await asyncio.gather(*(call(flight, provider, "k") for flight in flights for _ in range(4)))
+
+    assert run(scenario()) == ["result for k"] * 20
+    assert provider.calls == 1
+    assert sum(flight.leaders for flight in flights) == 1
+    assert sum(flight.remote_followers for flight in flights) == 4
+    assert sum(flight.remote_fallbacks for flight in flights) == 0
+
+
+def test_followers_recover_when_the_leader_fails(run, fake_redis):
+    failing, healthy = Provider(fail=True), Provider()
+    leader, follower = pods(fake_redis, 2)
+
+    async def scenario():
+        leading = asyncio.create_task(call(leader, failing, "k"))
+        await asyncio.sleep(0.01)
+        start = time.monotonic()
+        result = await call(follower, healthy, "k")
+        with pytest.raises(RuntimeError):
+            await leading
+        return result, time.monotonic() - start
+
+    result, waited = run(scenario())
+    assert result == "result for k"
+    assert healthy.calls == 1
+    assert follower.remote_fallbacks == 1
+    # Picked up as soon as the leader released its lock, not at wait_timeout
+    assert waited < 1.0
+
+
+def test_followers_recover_when_the_lock_expires(run, fake_redis):
+    provider = Provider()
+    follower = pods(fake_redis, 1, wait_timeout=10.0)[0]
+
+    async def scenario():
+        # A leader that died mid-generation: its lock is left to expire
+        await fake_redis.set("singleflight:k", "dead-leader", px=200)
+        start = time.monotonic()
+        result = await call(follower, provider, "k")
+        return result, time.monotonic() - start
+
+    result, waited = run(scenario())
+    assert result == "result for k"
+    assert provider.calls == 1
+    assert follower.remote_fallbacks == 1
+    assert 0.15 < waited < 2.0
+
+
+def test_local_followers_share_the_leaders_error_and_the_key_is_retried(run, fake_redis):
+    provider = Provider(fail=True)
+    flight = pods(fake_redis, 1)[0]
+
+    async def scenario():
+        results = await asyncio.gather(*(call(flight, provider, "k") for _ in range(5)), return_exceptions=True)
+        provider.fail = False
+        return results, await call(flight, provider, "k")
+
+    results, retried = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "result for k"
+    assert provider.calls == 2
@@ -0,0 +1,148 @@
+import asyncio
+
+from app.summarize import MapReduceSummarizer, split_structural, _group
+
+
+def count(text: str) -> int:
+    return len(text.split())
+
+
+class Cache:
+    """In-memory stand-in for the generation cache"""
+
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ttl):
+        self.data[key] = value
+
+
+class Leaf:
+    """Summarizes to the first few words of the text and records every call"""
+
+    def __init__(self, words: int = 3, tag: str = ""):
+        self.words = words
+        self.tag = tag
+        self.calls = []
+
+    async def __call__(self, text: str, limit: int) -> str:
+        self.calls.append(text)
+        await asyncio.sleep(0)
+        return self.tag + " ".join(text.split()[:self.words])
+
+
+def document(paragraphs: int, words: int = 10) -> str:
+    return "\n\n".join(" ".join(f"p{i}w{j}" for j in range(words)) for i in range(paragraphs))
+
+
+def summarizer(cache=None, concurrency: int = 4) -> MapReduceSummarizer:
+    return MapReduceSummarizer(chunk_tokens=25, chunk_summary_tokens=5, concurrency=concurrency, cache_ttl=60, cache=cache)
+
+
+def test_split_structural_keeps_chunks_within_budget_and_text_intact():
+    text = document(12)
+    chunks = split_structural(text, 25, count)
+    assert len(chunks) > 1
+    assert all(count(chunk) <= 25 for chunk in chunks)
+    assert "\n\n".join(chunks).split() == text.split()
+
+
+def test_split_structural_starts_a_chunk_at_each_heading():
+    text = "# Intro\n\nshort body\n\n# Details\n\nmore body"
+    chunks = split_structural(text, 100, count)
+    assert chunks == ["# Intro\n\nshort body", "# Details\n\nmore body"]
+
+
+def test_split_structural_cuts_long_paragraphs_by_sentence_then_word():
+    sentences = "One two three four. Five six seven eight."
+    assert split_structural(sentences, 5, count) == ["One two three four.", "Five six seven eight."]
+
+    run_on = " ".join(f"w{i}" for i in range(40))
+    chunks = split_structural(run_on, 10, count)
+    assert all(count(chunk) <= 10 for chunk in chunks)
+    assert " ".join(chunks).split() == run_on.split()
+
+
+def test_split_structural_is_stable_away_from_an_edit():
+    text = document(30)
+    edited = text.replace("p2w3", "changed", 1)
+    before, after = split_structural(text, 25, count), split_structural(edited, 25, count)
+    assert before[-3:] == after[-3:]
+
+
+def test_group_packs_summaries_up_to_the_budget():
+    summaries = ["a b c", "d e f", "g h i", "j k"]
+    assert _group(summaries, 6, count) == ["a b c\n\nd e f", "g h i\n\nj k"]
+
+
+def test_short_text_goes_straight_to_the_leaf(run):
+    leaf = Leaf()
+    summary = run(summarizer().summarize("a short text", "model", 50, leaf, count))
+    assert summary == "a short text"
+    assert leaf.calls == ["a short text"]
+
+
+def test_long_text_is_mapped_then_reduced(run):
+    leaf, chunk_leaf = Leaf(tag="final: "), Leaf()
+    s = summarizer()
+    summary = run(s.summarize(document(6), "model", 50, leaf, count, chunk_leaf=chunk_leaf))
+    assert summary.startswith("final: ")
+    assert len(leaf.calls) == 1
+    assert len(chunk_leaf.calls) == s.stats()["chunks"] > 1
+    assert s.stats()["combine_levels"] == 0
+
+
+def test_partial_summaries_that_do_not_fit_are_combined_in_levels(run):
+    # 60 chunks x 3-word summaries = 180 tokens, so they need a combine round
+    leaf, chunk_leaf = Leaf(), Leaf()
+    s = summarizer()
+    run(s.summarize(document(60, words=20), "model", 50, leaf, count, chunk_leaf=chunk_leaf))
+    stats = s.stats()
+    assert stats["combine_levels"] >= 1
+    assert len(chunk_leaf.calls) > stats["chunks"]
+    assert count(leaf.calls[0]) <= 25
+
+
+def test_unchanged_chunks_are_served_from_the_cache(run):
+    cache, chunk_leaf = Cache(), Leaf()
+    s = summarizer(cache)
+    text = document(12)
+    run(s.summarize(text, "model", 50, Leaf(), count, chunk_leaf=chunk_leaf))
+    first = len(chunk_leaf.calls)
+
+    run(s.summarize(text, "model", 50, Leaf(), count, chunk_leaf=chunk_leaf))
+    assert len(chunk_leaf.calls) == first
+    assert s.stats()["chunk_cache_hits"] == first
+
+
+def test_sampling_params_are_part_of_the_chunk_cache_key(run):
+    cache = Cache()
+    s = summarizer(cache)
+    text = document(12)
+    cold, hot = Leaf(tag="cold "), Leaf(tag="hot ")
+    run(s.summarize(text, "model", 50, Leaf(), count, chunk_leaf=cold, params={"temperature": 0.0}))
+    run(s.summarize(text, "model", 50, Leaf(), count, chunk_leaf=hot, params={"temperature": 0.9}))
+    assert hot.calls == cold.calls
+    assert s.stats()["chunk_cache_hits"] == 0
+
+    again = Leaf(tag="again ")
+    run(s.summarize(text, "model", 50, Leaf(), count, chunk_leaf=again, params={"temperature": 0.9}))
+    assert again.calls == []
+
+
+def test_concurrency_limits_chunk_calls_in_flight(run):
+    in_flight = peak = 0
+
+    async def chunk_leaf(text: str, limit: int) -> str:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return text.split()[0]
+
+    run(summarizer(concurrency=2).summarize(document(20), "model", 50, Leaf(), count, chunk_leaf=chunk_leaf))
+    assert peak == 2
@@ -0,0 +1,99 @@
+import pytest
+
+from app import ai_service, tokenizer
+from app.ai_service import AIService, CachePolicy
+from app.tokenizer import ContextLengthExceeded, count_message_tokens, count_tokens, fit_to_context
+
+MODEL = "local-text"  # 1024-token context
+
+
+def chat(user_words: int, system: str = "You are a helpful assistant."):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": " ".join(f"word{i}" for i in range(user_words))},
+    ]
+
+
+def test_request_that_fits_is_unchanged():
+    messages = chat(20)
+
+    fitted, max_tokens, prompt_tokens = fit_to_context(messages, MODEL, 200, 64, trim=False)
+
+    assert fitted is messages and max_tokens == 200
+    assert prompt_tokens == count_message_tokens(messages, MODEL)
+
+
+def test_oversize_request_is_rejected_without_trim():
+    messages = chat(2000)
+
+    with pytest.raises(ContextLengthExceeded) as raised:
+        fit_to_context(messages, MODEL, 200, 64, trim=False)
+    assert raised.value.context_window == 1024
+    assert raised.value.prompt_tokens == count_message_tokens(messages, MODEL)
+
+
+def test_trim_shrinks_the_completion_budget_first():
+    messages = chat(1)
+    prompt_tokens = count_message_tokens(messages, MODEL)
+    max_tokens = 1024 - prompt_tokens + 50
+
+    fitted, budget, _ = fit_to_context(messages, MODEL, max_tokens, 64, trim=True)
+
+    assert fitted is messages
+    assert budget == 1024 - prompt_tokens
+
+
+def test_trim_cuts_the_end_of_the_last_message():
+    messages = chat(2000)
+
+    fitted, budget, prompt_tokens = fit_to_context(messages, MODEL, 200, 64, trim=True)
+
+    assert fitted[0] == messages[0]
+    assert messages[1]["content"].startswith(fitted[1]["content"])
+    assert len(fitted[1]["content"]) < len(messages[1]["content"])
+    assert prompt_tokens == count_message_tokens(fitted, MODEL)
+    assert 64 <= budget <= 200
+    assert prompt_tokens + budget <= 1024
+
+
+def test_trim_cannot_save_an_oversize_system_prompt():
+    messages = chat(1, system=" ".join(["policy"] * 3000))
+
+    with pytest.raises(ContextLengthExceeded):
+        fit_to_context(messages, MODEL, 200, 64, trim=True)
+
+
+def test_long_text_is_counted_in_slices_without_splitting_words():
+    text = " ".join(f"token{i}" for i in range(10000))
+
+    chunks = list(tokenizer._chunks(text))
+
+    assert len(chunks) > 1 and "".join(chunks) == text
+    assert all(chunk.startswith(" ") for chunk in chunks[1:])
+    assert count_tokens(text, MODEL) == sum(count_tokens(chunk, MODEL) for chunk in chunks)
+
+
+def test_completion_tokens_are_counted_once(run, monkeypatch):
+    class Provider:
+        name = "openai"
+        api_key = "test"
+
+        async def chat_completion(self, model, messages, max_tokens, temperature):
+            return "Fresh bread, baked before sunrise"
+
+    counted = []
+
+    def spy(text, model):
+        counted.append(text)
+        return count_tokens(text, model)
+
+    monkeypatch.setitem(ai_service.hosted_providers, "openai", Provider())
+    monkeypatch.setattr(tokenizer, "count_tokens", spy)
+
+    _, _, metadata = run(AIService._generate_uncached(
+        "key", "id", 0.0, CachePolicy(False, 0, 0), "Write a tagline for a bakery", "text",
+        "gpt-3.5-turbo", 50, 0.7, "en", "professional"
+    ))
+
+    assert counted.count("Fresh bread, baked before sunrise") == 1
+    assert metadata["completion_tokens"] == count_tokens("Fresh bread, baked before sunrise", "gpt-3.5-turbo")